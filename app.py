@@ -1,12 +1,27 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, make_response
+from flask import Flask, Request, Response, current_app, render_template, request, jsonify, session, redirect, url_for, make_response, stream_with_context
+from flask.json.provider import JSONProvider
+from flask_caching import Cache
 from pymongo import MongoClient
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
+import orjson
 import pandas as pd
 import numpy as np
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import atexit
+import csv
+import decimal
+import io
+import itertools
 import json
+import logging
+import logging.handlers
+import queue
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from bson import ObjectId
 from config import config
 from services.data_processor import DataProcessor
@@ -14,19 +29,142 @@ from services.ai_analyzer import AIAnalyzer
 from services.network_analyzer import NetworkAnalyzer
 from services.risk_calculator import RiskCalculator
 
+class OrjsonProvider(JSONProvider):
+    """Serialize API responses with orjson instead of the stdlib json module"""
+    
+    # Stored datetimes are naive UTC; mark them as such so browsers don't read them as local time
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+    
+    @staticmethod
+    def _default(obj):
+        """Encode types orjson doesn't handle natively"""
+        if isinstance(obj, ObjectId):
+            return str(obj)
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, (set, frozenset)):
+            return list(obj)
+        if isinstance(obj, decimal.Decimal):
+            return str(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    
+    def dumps(self, obj, **kwargs):
+        option = self.options
+        if kwargs.pop('sort_keys', False):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.pop('indent', None):
+            option |= orjson.OPT_INDENT_2
+        default = kwargs.pop('default', None) or self._default
+        if kwargs:
+            # Options orjson has no equivalent for (separators, ensure_ascii, ...) go to the stdlib
+            return json.dumps(obj, default=default, **kwargs)
+        return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self._default, option=self.options),
+            mimetype='application/json'
+        )
+
+class SpooledUploadRequest(Request):
+    """Keep uploaded files in memory up to UPLOAD_SPOOL_MAX_SIZE before spilling to disk"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=current_app.config['UPLOAD_SPOOL_MAX_SIZE'], mode='rb+')
+
 app = Flask(__name__)
+app.request_class = SpooledUploadRequest
+app.json = OrjsonProvider(app)
 app.config.from_object(config['development'])
 
+cache = Cache(app)
+
+def cacheable_response(rv):
+    """Cache only successful view results; (body, status) error tuples are never stored"""
+    return not isinstance(rv, tuple) and getattr(rv, 'status_code', 200) < 400
+
+# Logging: handlers emit from a background listener so request threads only enqueue records
+logger = logging.getLogger(__name__)
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(), respect_handler_level=True)
+for queued_logger in (logger, logging.getLogger('services')):
+    queued_logger.setLevel(logging.DEBUG if app.debug else logging.INFO)
+    queued_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    queued_logger.propagate = False
+log_listener.start()
+atexit.register(log_listener.stop)
+
 # MongoDB connection
-client = MongoClient(app.config['MONGO_URI'])
+client = MongoClient(
+    app.config['MONGO_URI'],
+    maxPoolSize=app.config['MONGO_MAX_POOL_SIZE'],
+    minPoolSize=app.config['MONGO_MIN_POOL_SIZE'],
+    maxIdleTimeMS=app.config['MONGO_MAX_IDLE_TIME_MS'],
+    waitQueueTimeoutMS=app.config['MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+    compressors=app.config['MONGO_COMPRESSORS'],
+    retryReads=True,
+    retryWrites=True,
+    readPreference=app.config['MONGO_READ_PREFERENCE']
+)
 db = client[app.config['MONGO_DBNAME']]
 
+# Shared pool for overlapping independent MongoDB round-trips within a request
+io_executor = ThreadPoolExecutor(max_workers=app.config['IO_WORKERS'])
+
 # Initialize services
-data_processor = DataProcessor(db)
+data_processor = DataProcessor(db, executor=io_executor)
 ai_analyzer = AIAnalyzer()
 network_analyzer = NetworkAnalyzer(db)
 risk_calculator = RiskCalculator()
 
+data_processor.ensure_indexes()
+data_processor.warm_country_coordinates()
+
+# Background AI analysis for uploads that opt out of waiting on the result
+analysis_executor = ThreadPoolExecutor(max_workers=app.config['ANALYSIS_WORKERS'])
+# Job records live in MongoDB so any worker process can answer a status poll;
+# the TTL index drops them once they are no longer worth polling
+analysis_jobs = db.analysis_jobs
+try:
+    analysis_jobs.create_index('created_at', expireAfterSeconds=app.config['ANALYSIS_JOB_TTL'])
+except Exception as e:
+    logger.error(f"Error creating analysis job TTL index: {e}")
+
+def update_analysis_job(job_id, fields):
+    """Record progress on a background analysis job"""
+    try:
+        analysis_jobs.update_one({'_id': job_id}, {'$set': fields})
+    except Exception as e:
+        logger.error(f"Error updating analysis job {job_id}: {e}")
+
+def run_analysis_job(job_id, transaction_ids):
+    """Run AI analysis in the background and record the outcome"""
+    update_analysis_job(job_id, {'status': 'running'})
+    try:
+        result = ai_analyzer.analyze_transactions(transaction_ids, db)
+        invalidate_cached_views()
+        update_analysis_job(job_id, {
+            'status': 'failed' if 'error' in result else 'completed',
+            'result': result,
+            'finished_at': datetime.now()
+        })
+    except Exception as e:
+        logger.error(f"AI Analysis job {job_id} error: {e}")
+        update_analysis_job(job_id, {'status': 'failed', 'result': {'error': str(e)}, 'finished_at': datetime.now()})
+
+def invalidate_cached_views():
+    """Drop cached API responses after the underlying data changes"""
+    try:
+        cache.clear()
+    except Exception as e:
+        logger.error(f"Error clearing response cache: {e}")
+
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -82,6 +220,7 @@ def reports():
 
 # Account API endpoints
 @app.route('/api/accounts/recent-high-risk')
+@cache.cached(query_string=True, response_filter=cacheable_response)
 def get_recent_high_risk_accounts():
     """Get recent high-risk accounts"""
     try:
@@ -89,17 +228,18 @@ def get_recent_high_risk_accounts():
         accounts = data_processor.get_recent_high_risk_accounts(limit)
         return jsonify(accounts)
     except Exception as e:
-        print(f"Error getting recent high-risk accounts: {e}")
+        logger.error(f"Error getting recent high-risk accounts: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/accounts/summary')
+@cache.cached(query_string=True, response_filter=cacheable_response)
 def get_accounts_summary():
     """Get accounts summary statistics"""
     try:
         summary = data_processor.get_accounts_summary()
         return jsonify(summary)
     except Exception as e:
-        print(f"Error getting accounts summary: {e}")
+        logger.error(f"Error getting accounts summary: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/accounts/search')
@@ -116,52 +256,54 @@ def search_accounts():
         accounts = data_processor.search_accounts(filters)
         return jsonify(accounts)
     except Exception as e:
-        print(f"Error searching accounts: {e}")
+        logger.error(f"Error searching accounts: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/accounts/<account_id>/details')
 def get_account_details(account_id):
     """Get detailed account information"""
     try:
-        # Use the same approach as search_accounts to get account data
-        filters = {'query': account_id}
-        accounts = data_processor.search_accounts(filters)
+        # Recent transactions don't depend on the account lookup, so fetch
+        # them concurrently instead of waiting on two sequential round-trips
+        pipeline = [
+            {'$match': {
+                '$or': [
+                    {'from_account': account_id},
+                    {'to_account': account_id}
+                ]
+            }},
+            {'$sort': {'timestamp': -1}},
+            {'$limit': 10},
+            {'$project': {
+                '_id': 0,
+                'transaction_id': {'$toString': '$_id'},
+                'timestamp': 1,
+                'amount': {'$ifNull': ['$amount_received', 0]},
+                'from_account': 1,
+                'to_account': 1,
+                'currency': '$receiving_currency',
+                'risk_score': {'$ifNull': ['$risk_score', 0]}
+            }}
+        ]
+        transactions_future = io_executor.submit(
+            lambda: list(db.transactions.aggregate(pipeline))
+        )
         
-        # Find the specific account
-        account = None
-        for acc in accounts:
-            if acc['account_id'] == account_id:
-                account = acc
-                break
+        account = data_processor.get_account(account_id)
         
         if not account:
+            transactions_future.cancel()
             return jsonify({'error': 'Account not found'}), 404
         
-        # Get additional details by querying transactions directly
-        transactions = list(db.transactions.find({
-            '$or': [
-                {'from_account': account_id},
-                {'to_account': account_id}
-            ]
-        }).sort('timestamp', -1).limit(10))
+        transactions = transactions_future.result()
         
         # Enhance account data with recent transactions
-        account['recent_transactions'] = [
-            {
-                'transaction_id': str(t.get('_id')),
-                'timestamp': t.get('timestamp'),
-                'amount': t.get('amount_received', 0),
-                'from_account': t.get('from_account'),
-                'to_account': t.get('to_account'),
-                'currency': t.get('receiving_currency'),
-                'risk_score': t.get('risk_score', 0)
-            } for t in transactions
-        ]
+        account['recent_transactions'] = transactions
         
         return jsonify(account)
         
     except Exception as e:
-        print(f"Error getting account details: {e}")
+        logger.error(f"Error getting account details: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/accounts/<account_id>/analyze', methods=['POST'])
@@ -171,7 +313,7 @@ def analyze_account(account_id):
         analysis = data_processor.analyze_account(account_id)
         return jsonify(analysis)
     except Exception as e:
-        print(f"Error analyzing account: {e}")
+        logger.error(f"Error analyzing account: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/accounts/<account_id>/flag', methods=['POST'])
@@ -187,7 +329,7 @@ def flag_account(account_id):
             'message': 'Account flagged for review'
         })
     except Exception as e:
-        print(f"Error flagging account: {e}")
+        logger.error(f"Error flagging account: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/accounts/<account_id>/report', methods=['POST'])
@@ -197,16 +339,23 @@ def generate_account_report(account_id):
         report_data = data_processor.generate_account_report(account_id)
         return jsonify(report_data)
     except Exception as e:
-        print(f"Error generating report for account {account_id}: {e}")
+        logger.error(f"Error generating report for account {account_id}: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/debug/accounts')
 def debug_accounts():
     """Debug endpoint to check actual account data"""
     try:
-        # Get some sample transactions to see actual field names
-        sample_transactions = list(db.transactions.find({}).limit(10))
-        accounts = list(set([t.get('from_account') for t in sample_transactions if t.get('from_account')]))
+        # Sample transactions for field names and server-deduped accounts in one round trip
+        result = next(db.transactions.aggregate([
+            {'$limit': 10},
+            {'$facet': {
+                'sample': [{'$limit': 3}],
+                'accounts': [{'$group': {'_id': '$from_account'}}]
+            }}
+        ]))
+        sample_transactions = result['sample']
+        accounts = [group['_id'] for group in result['accounts'] if group['_id']]
         
         return jsonify({
             'sample_transactions': [
@@ -215,7 +364,7 @@ def debug_accounts():
                     'to_account': t.get('to_account'),
                     'amount': t.get('amount_received'),
                     'keys': list(t.keys())
-                } for t in sample_transactions[:3]
+                } for t in sample_transactions
             ],
             'unique_accounts': accounts[:10]
         })
@@ -224,6 +373,7 @@ def debug_accounts():
 
 # API Routes
 @app.route('/api/dashboard/stats')
+@cache.cached(query_string=True, response_filter=cacheable_response)
 def dashboard_stats():
     """Get dashboard statistics"""
     try:
@@ -233,6 +383,7 @@ def dashboard_stats():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/dashboard/volume-trends')
+@cache.cached(query_string=True, response_filter=cacheable_response)
 def get_volume_trends():
     """Get transaction volume trends over time"""
     try:
@@ -253,8 +404,40 @@ def get_transactions():
             'risk_level': request.args.get('risk_level'),
             'limit': int(request.args.get('limit', 100))
         }
-        transactions = data_processor.get_transactions(filters)
-        return jsonify(transactions)
+        
+        def dump(transaction):
+            return orjson.dumps(transaction, default=OrjsonProvider._default, option=OrjsonProvider.options)
+        
+        # Pull the first document now so query errors still get a 500 response
+        transactions = data_processor.iter_transactions(filters)
+        first = next(transactions, None)
+        if first is not None:
+            transactions = itertools.chain([first], transactions)
+        
+        # Stream one JSON document per line when the client asks for NDJSON
+        if request.args.get('format') == 'ndjson' or \
+                request.accept_mimetypes.best == 'application/x-ndjson':
+            def generate():
+                try:
+                    for transaction in transactions:
+                        yield dump(transaction) + b'\n'
+                except Exception as e:
+                    # Headers are already sent, so end the stream with an error record
+                    logger.error(f"Error streaming transactions: {e}")
+                    yield dump({'error': str(e)}) + b'\n'
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        # Otherwise write the JSON array incrementally straight off the cursor;
+        # a mid-stream error aborts the response rather than closing the array
+        def generate_array():
+            separator = b'['
+            for transaction in transactions:
+                yield separator + dump(transaction)
+                separator = b','
+            yield b'[]' if separator == b'[' else b']'
+        
+        return Response(stream_with_context(generate_array()), mimetype='application/json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -262,7 +445,7 @@ def get_transactions():
 def get_transaction_details(transaction_id):
     """Get single transaction details"""
     try:
-        print(f"Getting transaction details for ID: {transaction_id}")
+        logger.debug(f"Getting transaction details for ID: {transaction_id}")
         transaction = data_processor.get_transaction_by_id(transaction_id)
         
         if transaction:
@@ -271,23 +454,24 @@ def get_transaction_details(transaction_id):
             return jsonify({'error': 'Transaction not found'}), 404
             
     except Exception as e:
-        print(f"Error getting transaction details: {e}")
+        logger.error(f"Error getting transaction details: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/transactions/<transaction_id>/flag', methods=['POST'])
 def flag_transaction(transaction_id):
     """Flag a transaction as suspicious"""
     try:
-        print(f"Flagging transaction ID: {transaction_id}")
+        logger.debug(f"Flagging transaction ID: {transaction_id}")
         result = data_processor.flag_transaction(transaction_id)
         
         if result:
+            invalidate_cached_views()
             return jsonify({'message': 'Transaction flagged successfully'})
         else:
             return jsonify({'error': 'Failed to flag transaction'}), 400
             
     except Exception as e:
-        print(f"Error flagging transaction: {e}")
+        logger.error(f"Error flagging transaction: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/network/graph')
@@ -302,6 +486,7 @@ def network_graph_data():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/cash-flow/map')
+@cache.cached(query_string=True, response_filter=cacheable_response)
 def cash_flow_map():
     """Get geographic cash flow data for map with enhanced filtering"""
     try:
@@ -311,7 +496,7 @@ def cash_flow_map():
         min_amount = float(request.args.get('min_amount', 0))
         risk_level = request.args.get('risk_level', 'all')
         
-        print(f"Map API called with filters: currency={currency}, period={time_period}, min_amount={min_amount}, risk={risk_level}")
+        logger.debug(f"Map API called with filters: currency={currency}, period={time_period}, min_amount={min_amount}, risk={risk_level}")
         
         # Get map data with filters
         map_data = data_processor.get_geographic_flow_data(
@@ -323,10 +508,11 @@ def cash_flow_map():
         
         return jsonify(map_data)
     except Exception as e:
-        print(f"Error in cash_flow_map: {e}")
+        logger.error(f"Error in cash_flow_map: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/cash-flow/overview')
+@cache.cached(query_string=True, response_filter=cacheable_response)
 def cash_flow_overview():
     """Get cash flow overview data"""
     try:
@@ -337,10 +523,11 @@ def cash_flow_overview():
         overview_data = data_processor.get_cash_flow_overview(currency, date_range)
         return jsonify(overview_data)
     except Exception as e:
-        print(f"Error in cash_flow_overview: {e}")
+        logger.error(f"Error in cash_flow_overview: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/cash-flow/multi-currency')
+@cache.cached(query_string=True, response_filter=cacheable_response)
 def multi_currency_flow():
     """Get multi-currency cash flow data"""
     try:
@@ -371,37 +558,14 @@ def get_alerts():
         if priority == 'all':
             priority = None
             
-        alerts = data_processor.get_alerts(status, priority)
-        
-        # Filter by type if specified
-        if alert_type and alert_type != 'all':
-            alerts = [alert for alert in alerts if alert.get('type') == alert_type]
-        
-        # Filter by search term if specified
-        if search:
-            search_lower = search.lower()
-            alerts = [alert for alert in alerts if 
-                     search_lower in alert.get('description', '').lower() or
-                     search_lower in alert.get('title', '').lower() or
-                     search_lower in alert.get('account_id', '').lower()]
-        
-        # Filter by date if specified
-        if date_filter:
-            try:
-                filter_date = datetime.strptime(date_filter, '%Y-%m-%d')
-                next_day = filter_date + timedelta(days=1)
-                alerts = [alert for alert in alerts if 
-                         filter_date <= datetime.fromisoformat(alert.get('created_at', '').replace('Z', '+00:00')) < next_day]
-            except (ValueError, TypeError):
-                pass  # Invalid date format, skip filtering
-        
-        # Apply pagination
-        total_alerts = len(alerts)
-        paginated_alerts = alerts[offset:offset + limit]
+        page = data_processor.get_alerts_page(status, priority, alert_type, search, date_filter,
+                                              offset=offset, limit=limit)
+        alerts = page['alerts']
+        total_alerts = page['total']
         has_more = offset + limit < total_alerts
         
         return jsonify({
-            'alerts': paginated_alerts,
+            'alerts': alerts,
             'has_more': has_more,
             'total': total_alerts,
             'offset': offset,
@@ -433,6 +597,7 @@ def update_alert(alert_id):
         success = data_processor.update_alert_status(alert_id, status, notes)
         
         if success:
+            invalidate_cached_views()
             return jsonify({'success': True, 'message': 'Alert updated successfully'})
         else:
             return jsonify({'success': False, 'message': 'Alert not found'}), 404
@@ -449,6 +614,7 @@ def resolve_alert(alert_id):
         success = data_processor.update_alert_status(alert_id, 'resolved', notes)
         
         if success:
+            invalidate_cached_views()
             return jsonify({'success': True, 'message': 'Alert resolved successfully'})
         else:
             return jsonify({'success': False, 'message': 'Alert not found'}), 404
@@ -465,6 +631,7 @@ def investigate_alert(alert_id):
         success = data_processor.update_alert_status(alert_id, 'investigating', notes)
         
         if success:
+            invalidate_cached_views()
             return jsonify({'success': True, 'message': 'Investigation started successfully'})
         else:
             return jsonify({'success': False, 'message': 'Alert not found'}), 404
@@ -481,6 +648,7 @@ def dismiss_alert(alert_id):
         success = data_processor.update_alert_status(alert_id, 'dismissed', notes)
         
         if success:
+            invalidate_cached_views()
             return jsonify({'success': True, 'message': 'Alert dismissed successfully'})
         else:
             return jsonify({'success': False, 'message': 'Alert not found'}), 404
@@ -505,6 +673,7 @@ def generate_alerts():
     """Manually trigger alert generation"""
     try:
         data_processor.generate_alerts_from_transactions()
+        invalidate_cached_views()
         return jsonify({'success': True, 'message': 'Alerts generated successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -532,16 +701,9 @@ def upload_dataset():
         if not file or not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type. Please upload CSV, XLSX, or XLS files.'}), 400
         
-        # Create uploads directory if it doesn't exist
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        
-        # Save the uploaded file
+        # Parse straight from the request stream instead of saving to disk first
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        # Process the uploaded file
-        result = data_processor.process_uploaded_file(filepath)
+        result = data_processor.process_uploaded_stream(file.stream, file.filename)
         
         if not result.get('success', False):
             return jsonify({
@@ -552,25 +714,44 @@ def upload_dataset():
         # Get options from request
         run_analysis = request.form.get('run_analysis', 'false').lower() == 'true'
         generate_alerts = request.form.get('generate_alerts', 'false').lower() == 'true'
+        async_analysis = request.form.get('async_analysis', 'false').lower() == 'true'
         
         ai_result = {'suspicious_count': 0, 'alerts_generated': 0}
         
+        # Hand long-running analysis to the background pool and answer 202 right away
+        if run_analysis and async_analysis and result.get('transaction_ids'):
+            job_id = uuid.uuid4().hex
+            analysis_jobs.insert_one({
+                '_id': job_id, 'job_id': job_id, 'status': 'queued', 'filename': filename, 'created_at': datetime.now()
+            })
+            analysis_executor.submit(run_analysis_job, job_id, result['transaction_ids'])
+            invalidate_cached_views()
+            
+            return jsonify({
+                'success': True,
+                'message': 'File uploaded and processed; AI analysis queued',
+                'filename': filename,
+                'records_processed': result.get('processed_records', 0),
+                'transaction_ids': result.get('transaction_ids', []),
+                'errors': result.get('errors', []),
+                'average_risk': result.get('average_risk', 0),
+                'total_volume': result.get('total_volume', 0),
+                'currencies_found': result.get('currencies_found', []),
+                'ai_analysis_enabled': run_analysis,
+                'alert_generation_enabled': generate_alerts,
+                'job_id': job_id,
+                'status_url': url_for('get_analysis_job', job_id=job_id)
+            }), 202
+        
         # Run AI analysis if requested
         if run_analysis and result.get('transaction_ids'):
             try:
                 ai_result = ai_analyzer.analyze_transactions(result['transaction_ids'], db)
             except Exception as ai_error:
-                print(f"AI Analysis error: {ai_error}")
+                logger.error(f"AI Analysis error: {ai_error}")
                 ai_result = {'suspicious_count': 0, 'alerts_generated': 0, 'error': str(ai_error)}
         
-        # Calculate statistics
-        stats = data_processor.get_dashboard_stats()
-        
-        # Clean up uploaded file after processing
-        try:
-            os.remove(filepath)
-        except Exception as cleanup_error:
-            print(f"Warning: Could not remove uploaded file: {cleanup_error}")
+        invalidate_cached_views()
         
         return jsonify({
             'success': True,
@@ -589,7 +770,7 @@ def upload_dataset():
         })
     
     except Exception as e:
-        print(f"Upload error: {e}")
+        logger.error(f"Upload error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/uploads/recent')
@@ -633,11 +814,24 @@ def run_ai_analysis():
             transaction_ids = data_processor.get_recent_transaction_ids()
         
         result = ai_analyzer.analyze_transactions(transaction_ids, db)
+        invalidate_cached_views()
         return jsonify(result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/analyze/jobs/<job_id>')
+def get_analysis_job(job_id):
+    """Get the status of a background AI analysis job"""
+    try:
+        job = analysis_jobs.find_one({'_id': job_id}, {'_id': 0})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job)
+
 @app.route('/api/risk/calculate', methods=['POST'])
 def calculate_risk():
     """Calculate risk score for a transaction or account"""
@@ -646,7 +840,9 @@ def calculate_risk():
         transaction_data = data.get('transaction_data')
         account_id = data.get('account_id')
         
-        if transaction_data:
+        if isinstance(transaction_data, list):
+            return jsonify({'risk_scores': risk_calculator.calculate_batch_risk_scores(transaction_data)})
+        elif transaction_data:
             risk_score = risk_calculator.calculate_transaction_risk(transaction_data)
         elif account_id:
             risk_score = risk_calculator.calculate_account_risk(account_id)
@@ -658,6 +854,22 @@ def calculate_risk():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/risk/calculate_batch', methods=['POST'])
+def calculate_risk_batch():
+    """Calculate risk scores for a list of transactions in one call"""
+    try:
+        data = request.get_json()
+        transactions = data.get('transactions') if isinstance(data, dict) else data
+        
+        if not isinstance(transactions, list):
+            return jsonify({'error': 'Expected a list of transactions'}), 400
+        
+        risk_scores = risk_calculator.calculate_batch_risk_scores(transactions)
+        return jsonify({'risk_scores': risk_scores})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/network/data')
 def get_network_data():
     """Get network analysis data"""
@@ -678,7 +890,7 @@ def get_network_data():
         return jsonify(network_data)
     
     except Exception as e:
-        print(f"Error getting network data: {e}")
+        logger.error(f"Error getting network data: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/network/patterns', methods=['POST'])
@@ -695,7 +907,7 @@ def analyze_patterns():
         min_amount = float(data.get('min_amount', 1000))
         risk_level = data.get('risk_level', 'all')
         
-        print(f"Pattern analysis request with filters: {data}")
+        logger.debug(f"Pattern analysis request with filters: {data}")
         
         # Get transactions based on filters
         filters = {
@@ -706,29 +918,32 @@ def analyze_patterns():
         }
         
         # Get transactions from database
-        transactions = data_processor.get_transactions_for_analysis(filters)
+        # Columnar frame so the analyzer works on contiguous arrays instead of per-row dicts
+        transactions = data_processor.get_transactions_for_analysis(filters, as_frame=True)
         
-        if not transactions:
-            return jsonify({
+        if transactions.empty:
+            response = {
                 'results': [],
                 'summary': {
                     'total_patterns': 0,
                     'message': 'No transactions found matching the criteria'
-                },
-                'debug_info': {
+                }
+            }
+            if app.debug:
+                response['debug_info'] = {
                     'database_query': filters,
                     'total_transactions_in_db': data_processor.transactions.count_documents({})
                 }
-            })
+            return jsonify(response)
         
-        print(f"Analyzing {len(transactions)} transactions for patterns")
+        logger.debug(f"Analyzing {len(transactions)} transactions for patterns")
         
         # Debug: Show sample transaction data
-        if transactions:
-            sample_tx = transactions[0]
-            print(f"Sample transaction fields: {list(sample_tx.keys())}")
-            print(f"Sample source: '{sample_tx.get('source', 'MISSING')}'")
-            print(f"Sample target: '{sample_tx.get('target', 'MISSING')}'")
+        if logger.isEnabledFor(logging.DEBUG):
+            sample_tx = transactions.iloc[0]
+            logger.debug(f"Sample transaction fields: {list(transactions.columns)}")
+            logger.debug(f"Sample source: '{sample_tx.get('source', 'MISSING')}'")
+            logger.debug(f"Sample target: '{sample_tx.get('target', 'MISSING')}'")
         
         # Create pattern analyzer and run analysis
         analyzer = create_pattern_analyzer()
@@ -752,32 +967,41 @@ def analyze_patterns():
         # Get summary
         summary = analyzer.get_pattern_summary(patterns)
         
-        print(f"Pattern analysis completed. Found {len(pattern_results)} patterns")
+        logger.debug(f"Pattern analysis completed. Found {len(pattern_results)} patterns")
         
-        return jsonify({
+        response = {
             'results': pattern_results,
             'summary': summary,
             'analysis_info': {
                 'transactions_analyzed': len(transactions),
                 'filters_applied': filters,
                 'analysis_timestamp': datetime.now().isoformat()
-            },
-            'debug_info': {
-                'sample_transaction_keys': list(transactions[0].keys()) if transactions else [],
-                'sample_source': transactions[0].get('source', 'MISSING') if transactions else 'NO_TRANSACTIONS',
-                'sample_target': transactions[0].get('target', 'MISSING') if transactions else 'NO_TRANSACTIONS',
-                'empty_sources': sum(1 for tx in transactions if not tx.get('source') or tx.get('source') == ''),
-                'empty_targets': sum(1 for tx in transactions if not tx.get('target') or tx.get('target') == '')
             }
-        })
+        }
+        if app.debug:
+            response['debug_info'] = pattern_debug_info(transactions)
+        
+        return jsonify(response)
     
     except ImportError as e:
-        print(f"Import error: {e}")
+        logger.error(f"Import error: {e}")
         return jsonify({'error': 'Pattern analysis module not available'}), 500
     except Exception as e:
-        print(f"Error analyzing patterns: {e}")
+        logger.error(f"Error analyzing patterns: {e}")
         return jsonify({'error': str(e)}), 500
 
+def pattern_debug_info(transactions):
+    """Summarize the analyzed transaction frame for debugging"""
+    sample_tx = transactions.iloc[0]
+    
+    return {
+        'sample_transaction_keys': list(transactions.columns),
+        'sample_source': sample_tx.get('source', 'MISSING'),
+        'sample_target': sample_tx.get('target', 'MISSING'),
+        'empty_sources': int((transactions['source'] == '').sum()),
+        'empty_targets': int((transactions['target'] == '').sum())
+    }
+
 @app.route('/api/cash-flow/transactions')
 def get_cash_flow_transactions():
     """Get cash flow transactions"""
@@ -788,71 +1012,89 @@ def get_cash_flow_transactions():
             'date_range': request.args.get('date_range', '30d'),
             'search': request.args.get('search', ''),
             'page': int(request.args.get('page', 1)),
-            'per_page': int(request.args.get('per_page', 50))
+            'per_page': int(request.args.get('per_page', 50)),
+            'after_id': request.args.get('after_id', '')
         }
         
-        print(f"Cash flow transactions request with filters: {filters}")
+        # Cursor (after_id) requests skip the total unless asked; page requests keep it
+        include_count = request.args.get('include_count', 'false' if filters['after_id'] else 'true').lower() == 'true'
+        
+        logger.debug(f"Cash flow transactions request with filters: {filters}")
+        
+        # One cached total serves every page of the same filters
+        count_key = 'cash_flow_count:' + repr(sorted(
+            (key, value) for key, value in filters.items() if key not in ('page', 'per_page', 'after_id')
+        ))
+        total_count = cache.get(count_key) if include_count else None
+        if include_count:
+            logger.debug(f"Cash flow count cache {'hit' if total_count is not None else 'miss'} for {count_key}")
         
         # Get transactions with pagination and total count
-        result = data_processor.get_transactions_with_count(filters)
+        result = data_processor.get_transactions_with_count(filters, total_count=total_count, include_count=include_count)
         
-        return jsonify({
+        if total_count is None and include_count and result['total_count'] >= app.config['COUNT_CACHE_MIN']:
+            cache.set(count_key, result['total_count'], timeout=app.config['COUNT_CACHE_TIMEOUT'])
+        
+        response = {
             'transactions': result['transactions'],
-            'total_count': result['total_count'],
             'page': filters['page'],
             'per_page': filters['per_page'],
-            'total_pages': (result['total_count'] + filters['per_page'] - 1) // filters['per_page']
-        })
+            'next_cursor': result['next_cursor']
+        }
+        if include_count:
+            response['total_count'] = result['total_count']
+            response['total_pages'] = (result['total_count'] + filters['per_page'] - 1) // filters['per_page']
+        
+        return jsonify(response)
     
     except Exception as e:
-        print(f"Error getting cash flow transactions: {e}")
+        logger.error(f"Error getting cash flow transactions: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Polled by every open dashboard; concurrent misses wait for one computation
+alert_stats_lock = threading.Lock()
+
+def build_alerts_stats():
+    """Compute the alerts statistics payload"""
+    # get_alerts regenerates the alert collection first (delete + rebuild),
+    # so the counts must only be taken once it has finished
+    recent_alerts = data_processor.get_alerts('active', None, limit=10)
+    stats = data_processor.get_alert_statistics()
+    
+    return {
+        'active_alerts': stats['active_alerts'],
+        'high_priority': stats['high_priority'],
+        'resolved_today': stats['resolved_today'],
+        'avg_response_time': f"{stats['avg_response_time']}h",
+        'alerts': [
+            {
+                '_id': alert['_id'],
+                'type': alert.get('type', 'SUSPICIOUS TRANSACTION'),
+                'description': alert.get('description', ''),
+                'priority': alert.get('priority', 'medium'),
+                'status': alert.get('status', 'active'),
+                'timestamp': alert.get('created_at', datetime.now().isoformat())
+            }
+            for alert in recent_alerts
+        ]
+    }
+
 @app.route('/api/alerts/stats')
 def get_alerts_stats():
     """Get alerts statistics"""
     try:
-        # Get recent alerts
-        alerts = list(db.alerts.find().sort('timestamp', -1).limit(100))
-        
-        # Calculate stats
-        active_alerts = len([alert for alert in alerts if alert.get('status') == 'active'])
-        high_priority = len([alert for alert in alerts if alert.get('priority') == 'high'])
-        
-        # Calculate resolved today
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        resolved_today = len([
-            alert for alert in alerts 
-            if alert.get('status') == 'resolved' and 
-            alert.get('updated_at', datetime.min) >= today
-        ])
-        
-        # Use data processor for comprehensive stats
-        stats = data_processor.get_alert_statistics()
-        
-        # Get recent alerts for display
-        recent_alerts = data_processor.get_alerts('active', None)
-        
-        return jsonify({
-            'active_alerts': stats['active_alerts'],
-            'high_priority': stats['high_priority'],
-            'resolved_today': stats['resolved_today'],
-            'avg_response_time': f"{stats['avg_response_time']}h",
-            'alerts': [
-                {
-                    '_id': alert['_id'],
-                    'type': alert.get('type', 'SUSPICIOUS TRANSACTION'),
-                    'description': alert.get('description', ''),
-                    'priority': alert.get('priority', 'medium'),
-                    'status': alert.get('status', 'active'),
-                    'timestamp': alert.get('created_at', datetime.now().isoformat())
-                }
-                for alert in recent_alerts[:10]  # Return only first 10
-            ]
-        })
+        payload = cache.get('alerts_stats')
+        if payload is None:
+            with alert_stats_lock:
+                payload = cache.get('alerts_stats')
+                if payload is None:
+                    payload = build_alerts_stats()
+                    cache.set('alerts_stats', payload, timeout=app.config['ALERT_STATS_CACHE_TIMEOUT'])
+        
+        return jsonify(payload)
     
     except Exception as e:
-        print(f"Error getting alerts stats: {e}")
+        logger.error(f"Error getting alerts stats: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/alerts/mark-all-read', methods=['POST'])
@@ -877,9 +1119,15 @@ def mark_all_alerts_read():
         })
         
     except Exception as e:
-        print(f"Error marking all alerts as read: {e}")
+        logger.error(f"Error marking all alerts as read: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Only the fields written to the export CSV
+ALERT_EXPORT_PROJECTION = {
+    '_id': 1, 'type': 1, 'description': 1, 'priority': 1, 'status': 1, 'account_id': 1,
+    'amount': 1, 'currency': 1, 'risk_score': 1, 'created_at': 1, 'updated_at': 1, 'read': 1
+}
+
 @app.route('/api/alerts/export', methods=['GET'])
 def export_alerts():
     """Export alerts to CSV"""
@@ -891,86 +1139,64 @@ def export_alerts():
         search = request.args.get('search', '')
         date_filter = request.args.get('date', '')
         
-        # Build query filters
-        query = {}
-        
-        if status != 'all':
-            query['status'] = status
-            
-        if priority != 'all':
-            query['priority'] = priority
-            
-        if alert_type != 'all':
-            query['type'] = alert_type
-            
-        if search:
-            query['$or'] = [
-                {'description': {'$regex': search, '$options': 'i'}},
-                {'account_id': {'$regex': search, '$options': 'i'}},
-                {'type': {'$regex': search, '$options': 'i'}}
-            ]
-            
-        if date_filter:
-            try:
-                filter_date = datetime.strptime(date_filter, '%Y-%m-%d')
-                next_day = filter_date + timedelta(days=1)
-                query['created_at'] = {
-                    '$gte': filter_date,
-                    '$lt': next_day
-                }
-            except ValueError:
-                pass
+        # Same filters as the alert list
+        query = data_processor.build_alert_query(status, priority, alert_type, search, date_filter)
         
-        # Get alerts from database
-        alerts = list(db.alerts.find(query).sort('created_at', -1))
+        # Iterate the cursor lazily; rows are streamed as they arrive
+        alerts = db.alerts.find(query, projection=ALERT_EXPORT_PROJECTION).sort('created_at', -1).batch_size(1000)
         
         # Create CSV content
-        import io
-        import csv
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            'ID', 'Type', 'Description', 'Priority', 'Status', 
-            'Account ID', 'Amount', 'Currency', 'Risk Score',
-            'Created At', 'Updated At', 'Read Status'
-        ])
-        
-        # Write data rows
-        for alert in alerts:
+        def generate():
+            output = io.StringIO()
+            writer = csv.writer(output)
+            
+            # Write header
             writer.writerow([
-                str(alert.get('_id', '')),
-                alert.get('type', ''),
-                alert.get('description', ''),
-                alert.get('priority', ''),
-                alert.get('status', ''),
-                alert.get('account_id', ''),
-                alert.get('amount', ''),
-                alert.get('currency', ''),
-                alert.get('risk_score', ''),
-                alert.get('created_at', ''),
-                alert.get('updated_at', ''),
-                'Read' if alert.get('read') else 'Unread'
+                'ID', 'Type', 'Description', 'Priority', 'Status', 
+                'Account ID', 'Amount', 'Currency', 'Risk Score',
+                'Created At', 'Updated At', 'Read Status'
             ])
-        
-        # Create response
-        output.seek(0)
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = 'attachment; filename=alerts_export.csv'
-        
-        return response
+            yield output.getvalue()
+            
+            # Write data rows
+            for alert in alerts:
+                output.seek(0)
+                output.truncate(0)
+                created_at = alert.get('created_at')
+                updated_at = alert.get('updated_at')
+                writer.writerow([
+                    alert.get('_id', ''),
+                    alert.get('type', ''),
+                    alert.get('description', ''),
+                    alert.get('priority', ''),
+                    alert.get('status', ''),
+                    alert.get('account_id', ''),
+                    alert.get('amount', ''),
+                    alert.get('currency', ''),
+                    alert.get('risk_score', ''),
+                    created_at.isoformat() if created_at else '',
+                    updated_at.isoformat() if updated_at else '',
+                    'Read' if alert.get('read') else 'Unread'
+                ])
+                yield output.getvalue()
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/csv',
+            headers={'Content-Disposition': 'attachment; filename=alerts_export.csv'}
+        )
         
     except Exception as e:
-        print(f"Error exporting alerts: {e}")
+        logger.error(f"Error exporting alerts: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Lowercased once at import instead of looked up in app.config per upload
+ALLOWED_EXTENSIONS = frozenset(ext.lower() for ext in app.config['ALLOWED_EXTENSIONS'])
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    dot = filename.rfind('.')
+    return dot >= 0 and filename[dot + 1:].lower() in ALLOWED_EXTENSIONS
 
 @app.errorhandler(404)
 def not_found(error):
@@ -981,4 +1207,4 @@ def internal_error(error):
     return render_template('500.html'), 500
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=app.config.get('DEBUG', False), host='0.0.0.0', port=5000)
\ No newline at end of file
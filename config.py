@@ -8,6 +8,15 @@ class Config:
     # MongoDB Configuration
     MONGO_URI = os.environ.get('MONGO_URI') or 'mongodb://10.234.22.151:27017/aml_detection2024'
     MONGO_DBNAME = 'aml_detection2024'
+    IO_WORKERS = int(os.environ.get('IO_WORKERS', 8))  # Threads for concurrent DB round-trips
+    ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', 2))  # Background AI analysis jobs
+    ANALYSIS_JOB_TTL = int(os.environ.get('ANALYSIS_JOB_TTL', 24 * 3600))  # Seconds a job record stays pollable
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 200))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 20))
+    MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 300000))  # Recycle sockets idle for 5 minutes
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000))  # Fail fast when the pool is exhausted
+    MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS') or 'zstd,snappy,zlib'  # zstd/snappy need zstandard/python-snappy
+    MONGO_READ_PREFERENCE = os.environ.get('MONGO_READ_PREFERENCE') or 'primaryPreferred'
     
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-aml-2024'
@@ -16,8 +25,19 @@ class Config:
     # Upload Configuration
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    UPLOAD_SPOOL_MAX_SIZE = int(os.environ.get('UPLOAD_SPOOL_MAX_SIZE', 4 * 1024 * 1024))  # Uploads up to this size stay in memory, larger ones spill to disk
     ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
     
+    # Cache Configuration (read-only dashboard/API responses)
+    # CACHE_TYPE=RedisCache shares cached responses across worker processes
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or 'SimpleCache'
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or 'redis://localhost:6379/0'
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 60))  # seconds
+    CACHE_KEY_PREFIX = 'aml_'
+    COUNT_CACHE_TIMEOUT = 60  # seconds a cached pagination total stays valid
+    COUNT_CACHE_MIN = 1000  # only totals at least this large are worth caching
+    ALERT_STATS_CACHE_TIMEOUT = 10  # seconds; the dashboard polls alert stats frequently
+    
     # Security Configuration
     BCRYPT_LOG_ROUNDS = 12
     
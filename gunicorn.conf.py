@@ -0,0 +1,9 @@
+import os
+
+# Gunicorn settings for production: several processes, each with a thread pool.
+# Handlers mostly wait on MongoDB and release the GIL while they do, so threads
+# give each process concurrency; every process opens its own connection pool.
+bind = os.environ.get('GUNICORN_BIND') or '0.0.0.0:5000'
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
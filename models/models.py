@@ -8,6 +8,10 @@ from bson import ObjectId
 class Transaction:
     """Transaction model"""
     
+    __slots__ = ('id', 'timestamp', 'from_bank', 'from_account', 'to_bank', 'to_account',
+                 'amount_received', 'receiving_currency', 'amount_paid', 'payment_currency',
+                 'payment_format', 'risk_score', 'status', 'created_at', 'updated_at')
+    
     def __init__(self, data):
         self.id = data.get('_id')
         self.timestamp = data.get('timestamp')
@@ -47,6 +51,9 @@ class Transaction:
 class Account:
     """Account model"""
     
+    __slots__ = ('id', 'account_id', 'name', 'type', 'bank_id', 'country', 'status',
+                 'monitoring', 'risk_score', 'created_at', 'updated_at')
+    
     def __init__(self, data):
         self.id = data.get('_id')
         self.account_id = data.get('account_id')
@@ -78,6 +85,9 @@ class Account:
 class Alert:
     """Alert model"""
     
+    __slots__ = ('id', 'transaction_id', 'alert_type', 'priority', 'status', 'description',
+                 'risk_score', 'assigned_to', 'created_at', 'updated_at')
+    
     def __init__(self, data):
         self.id = data.get('_id')
         self.transaction_id = data.get('transaction_id')
@@ -107,6 +117,9 @@ class Alert:
 class Bank:
     """Bank model"""
     
+    __slots__ = ('id', 'bank_code', 'name', 'country', 'city', 'latitude', 'longitude',
+                 'risk_level', 'created_at')
+    
     def __init__(self, data):
         self.id = data.get('_id')
         self.bank_code = data.get('bank_code')
@@ -2,13 +2,14 @@
 import os
 import json
 import numpy as np
+import pandas as pd
 from typing import List, Dict
 
 # Spark
+from pyspark import StorageLevel
 from pyspark.sql import SparkSession, functions as F, types as T
 from pyspark.ml import Pipeline
-from pyspark.ml.feature import StringIndexer, VectorAssembler, StandardScaler
-from pyspark.ml.functions import vector_to_array
+from pyspark.ml.feature import StringIndexer
 
 # Torch + PyG
 import torch
@@ -16,7 +17,7 @@ import torch.nn as nn
 import torch.nn.functional as F_torch
 from torch_geometric.data import Data
 from torch_geometric.nn import GATConv, Linear
-from torch_geometric.loader import NeighborLoader
+from torch_geometric.loader import NeighborLoader, PrefetchLoader
 
 # sklearn
 from sklearn.model_selection import train_test_split
@@ -27,6 +28,7 @@ from sklearn.metrics import roc_auc_score, f1_score
 # ---------------------------
 CSV_PATH = "/kaggle/input/synthetic-transaction-monitoring-dataset-aml"   # <<< عدّل هنا
 PIPELINE_DIR = "./spark_pipeline_model"
+SCALER_STATS_PATH = "./feature_scaler_stats.json"
 MODEL_PATH = "./best_gat_neighbor_gpu.pth"
 MAPPING_PATH = "./account2idx.json"
 NUM_EPOCHS = 50        # عدد الإبوكات الثابت
@@ -36,8 +38,26 @@ TEST_BATCH_SIZE = 2048
 NUM_NEIGHBORS = [20, 20]  # sampling neighbors per hop
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 PIN_MEMORY = True  # لتحسين نسخ الذاكرة لو الجهاز يدعم
+NUM_WORKERS = min(4, (os.cpu_count() or 2) // 2)  # sampler worker processes per loader
+USE_AMP = DEVICE.type == "cuda" and torch.cuda.is_bf16_supported()  # bf16 autocast, no GradScaler needed
+COMPILE_MODEL = DEVICE.type == "cuda"  # torch.compile the GAT forward (fused kernels)
 # ---------------------------
 
+def account_node_features(feat_df, dim):
+    """Per-account node features: (mean as sender + mean as receiver) / 2, missing side counted as 0.
+
+    Sender and receiver rows are unioned with a role flag so both averages come out of one shuffle.
+    """
+    f_cols = [f"f_{i}" for i in range(dim)]
+    role_rows = feat_df.select(F.col("Sender_account").alias("account"), F.lit(True).alias("is_sender"), *f_cols) \
+        .union(feat_df.select(F.col("Receiver_account").alias("account"), F.lit(False).alias("is_sender"), *f_cols))
+    return role_rows.groupBy("account").agg(*[
+        ((F.coalesce(F.avg(F.when(F.col("is_sender"), F.col(c))), F.lit(0.0)) +
+          F.coalesce(F.avg(F.when(~F.col("is_sender"), F.col(c))), F.lit(0.0))) / 2.0).alias(f"node_f_{i}")
+        for i, c in enumerate(f_cols)
+    ]).na.fill(0.0)
+
+
 def main():
     # ---------------------------
     # 1) Spark session
@@ -46,6 +66,7 @@ def main():
         .appName("AML-NeighborLoader-GPU-Full") \
         .config("spark.driver.memory", "16g") \
         .config("spark.executor.memory", "8g") \
+        .config("spark.sql.execution.arrow.pyspark.enabled", "true") \
         .getOrCreate()
     spark.sparkContext.setLogLevel("WARN")
 
@@ -76,12 +97,16 @@ def main():
     df = df.withColumn("weekday", F.dayofweek("timestamp").cast("int"))
     df = df.withColumn("amount_log", F.log1p(F.col("Amount")))
 
+    # both aggregations and the joins below read the parsed CSV; scan it once
+    df = df.persist(StorageLevel.MEMORY_AND_DISK)
+    base_df = df
+
     # sender/receiver aggregated features
     sender_aggs = df.groupBy("Sender_account").agg(
         F.count("*").alias("sender_tx_count"),
         F.mean("Amount").alias("sender_amt_mean"),
         F.stddev("Amount").alias("sender_amt_std"),
-        F.countDistinct("Receiver_account").alias("sender_unique_receivers"),
+        F.approx_count_distinct("Receiver_account", rsd=0.05).alias("sender_unique_receivers"),
         F.mean("hour").alias("sender_avg_hour")
     )
 
@@ -89,7 +114,7 @@ def main():
         F.count("*").alias("receiver_tx_count"),
         F.mean("Amount").alias("receiver_amt_mean"),
         F.stddev("Amount").alias("receiver_amt_std"),
-        F.countDistinct("Sender_account").alias("receiver_unique_senders"),
+        F.approx_count_distinct("Sender_account", rsd=0.05).alias("receiver_unique_senders"),
         F.mean("hour").alias("receiver_avg_hour")
     ).withColumnRenamed("Receiver_account", "Receiver_acc_for_join")
 
@@ -97,22 +122,24 @@ def main():
            .join(receiver_aggs, df["Receiver_account"] == F.col("Receiver_acc_for_join"), how="left") \
            .drop("Receiver_acc_for_join")
 
+    # the pipeline fit, the scaler stats and all later steps reuse the joined rows
+    df = df.persist(StorageLevel.MEMORY_AND_DISK)
+
     # ---------------------------
-    # 4) Encoding + assemble + scale (Spark pipeline)
+    # 4) Encoding (Spark pipeline) + column-wise standardization
     # ---------------------------
     cat_cols = ["Payment_currency", "Received_currency", "Sender_bank_location", "Receiver_bank_location", "Payment_type", "Laundering_type"]
     num_cols = ["Amount", "amount_log", "hour", "weekday",
                 "sender_tx_count","sender_amt_mean","sender_amt_std","sender_unique_receivers","sender_avg_hour",
                 "receiver_tx_count","receiver_amt_mean","receiver_amt_std","receiver_unique_senders","receiver_avg_hour"]
 
-    indexers = [StringIndexer(inputCol=c, outputCol=f"{c}_idx", handleInvalid="keep") for c in cat_cols]
     indexed_cols = [f"{c}_idx" for c in cat_cols]
+    # multi-column form fits every categorical vocabulary in one job instead of one per column
+    indexer = StringIndexer(inputCols=cat_cols, outputCols=indexed_cols, handleInvalid="keep")
 
-    assembler = VectorAssembler(inputCols=indexed_cols + num_cols, outputCol="features_vec", handleInvalid="keep")
-    scaler = StandardScaler(inputCol="features_vec", outputCol="features_scaled", withMean=True, withStd=True)
-
-    pipeline = Pipeline(stages=indexers + [assembler, scaler])
+    pipeline = Pipeline(stages=[indexer])
     pipeline_model = pipeline.fit(df)
+    base_df.unpersist()
 
     # save pipeline
     try:
@@ -126,39 +153,34 @@ def main():
     df_feat = pipeline_model.transform(df)
 
     # ---------------------------
-    # 5) vector -> array and explode features (dynamic dim)
+    # 5) standardize features column-wise (same result as StandardScaler withMean/withStd,
+    #    without the assembled vector -> array -> column round trip)
     # ---------------------------
-    df_feat = df_feat.withColumn("features_array", vector_to_array("features_scaled"))
-    dim = int(df_feat.select(F.size("features_array").alias("dim")).first()["dim"])
+    feature_cols = indexed_cols + num_cols
+    dim = len(feature_cols)
     print(f"Feature dimension = {dim}")
 
-    for i in range(dim):
-        df_feat = df_feat.withColumn(f"f_{i}", F.col("features_array").getItem(i))
+    stats_row = df_feat.agg(*[F.mean(c).alias(f"{c}_mean") for c in feature_cols],
+                            *[F.stddev(c).alias(f"{c}_std") for c in feature_cols]).first()
+    scaler_stats = {c: {"mean": stats_row[f"{c}_mean"] or 0.0, "std": stats_row[f"{c}_std"] or 0.0} for c in feature_cols}
+    with open(SCALER_STATS_PATH, "w") as f:
+        json.dump(scaler_stats, f)
+
+    # zero-variance columns scale to 0, matching StandardScaler
+    scaled_feature_cols = [
+        ((F.col(c) - F.lit(scaler_stats[c]["mean"])) *
+         F.lit(1.0 / scaler_stats[c]["std"] if scaler_stats[c]["std"] else 0.0)).alias(f"f_{i}")
+        for i, c in enumerate(feature_cols)
+    ]
+    df_feat = df_feat.select("*", *scaled_feature_cols)
 
     # fill nulls for edge attrs and indexed cols
-    df_feat = df_feat.fillna({"amount_log": 0.0})
-    for c in indexed_cols:
-        df_feat = df_feat.fillna({c: -1.0})
+    df_feat = df_feat.fillna({"amount_log": 0.0, **{c: -1.0 for c in indexed_cols}})
 
     # ---------------------------
     # 6) per-account node features (sender & receiver averaged)
     # ---------------------------
-    sender_exprs = [F.avg(f"f_{i}").alias(f"sender_f_{i}") for i in range(dim)]
-    receiver_exprs = [F.avg(f"f_{i}").alias(f"receiver_f_{i}") for i in range(dim)]
-
-    sender_feats = df_feat.groupBy("Sender_account").agg(*sender_exprs).na.fill(0.0).withColumnRenamed("Sender_account", "account_sender")
-    receiver_feats = df_feat.groupBy("Receiver_account").agg(*receiver_exprs).na.fill(0.0).withColumnRenamed("Receiver_account", "account_receiver")
-
-    accounts_df = df_feat.select("Sender_account").union(df_feat.select("Receiver_account")).distinct().withColumnRenamed("Sender_account", "account")
-    joined = accounts_df.join(sender_feats.withColumnRenamed("account_sender","account"), on="account", how="left") \
-                        .join(receiver_feats.withColumnRenamed("account_receiver","account"), on="account", how="left")
-
-    for i in range(dim):
-        joined = joined.withColumn(f"sender_f_{i}", F.coalesce(F.col(f"sender_f_{i}"), F.lit(0.0)))
-        joined = joined.withColumn(f"receiver_f_{i}", F.coalesce(F.col(f"receiver_f_{i}"), F.lit(0.0)))
-        joined = joined.withColumn(f"node_f_{i}", ((F.col(f"sender_f_{i}") + F.col(f"receiver_f_{i}")) / 2.0))
-
-    node_features_df = joined.select("account", *[f"node_f_{i}" for i in range(dim)]).na.fill(0.0)
+    node_features_df = account_node_features(df_feat, dim)
 
     # ---------------------------
     # 7) edges RDD with attributes
@@ -168,14 +190,21 @@ def main():
         if c not in df_feat.columns:
             df_feat = df_feat.withColumn(c, F.lit(0.0))
 
-    edges_rdd = df_feat.select("Sender_account","Receiver_account", *edge_cols).distinct().rdd \
-        .map(lambda r: (r["Sender_account"], r["Receiver_account"], [float(r[c]) if r[c] is not None else 0.0 for c in edge_cols]))
+    # one edge per (sender, receiver) pair: mean log-amount, lowest categorical codes
+    # (min rather than first so edge_attr doesn't depend on partition order)
+    edges_df = df_feat.groupBy("Sender_account","Receiver_account").agg(
+        F.mean("amount_log").alias("amount_log"),
+        *[F.min(c).alias(c) for c in indexed_cols]
+    )
 
     # ---------------------------
     # 8) collect accounts & mapping
     # ---------------------------
-    accounts = node_features_df.select("account").rdd.map(lambda r: r["account"]).collect()
+    # Arrow-backed toPandas: accounts and their feature rows arrive together, columnar
+    node_pdf = node_features_df.toPandas()
+    accounts = node_pdf["account"].tolist()
     account2idx = {acc: i for i, acc in enumerate(accounts)}
+    account_index = pd.Index(accounts)  # vectorized account -> idx lookups (get_indexer)
     n_nodes = len(accounts)
     print(f"Number of nodes (accounts): {n_nodes}")
     with open(MAPPING_PATH, "w") as f:
@@ -184,33 +213,47 @@ def main():
     # ---------------------------
     # 9) build edge_index & edge_attr
     # ---------------------------
-    edge_tuples = edges_rdd.map(lambda t: (account2idx.get(t[0], None), account2idx.get(t[1], None), t[2])) \
-                           .filter(lambda x: x[0] is not None and x[1] is not None).collect()
+    # remap both endpoints on the executors by joining a (account, idx) lookup table;
+    # inner joins drop unknown accounts, and only numeric columns reach the driver
+    lut = spark.createDataFrame(pd.DataFrame({"account": accounts, "idx": np.arange(n_nodes, dtype=np.int64)}))
+    edges_idx_df = edges_df \
+        .join(lut.withColumnRenamed("account", "Sender_account").withColumnRenamed("idx", "src"), on="Sender_account") \
+        .join(lut.withColumnRenamed("account", "Receiver_account").withColumnRenamed("idx", "dst"), on="Receiver_account") \
+        .select("src", "dst", *edge_cols)
+    edges_pdf = edges_idx_df.toPandas()
 
-    if len(edge_tuples) == 0:
+    if edges_pdf.empty:
         raise RuntimeError("No edges found after mapping to account indices. Check account mapping.")
 
-    edge_src = [int(e[0]) for e in edge_tuples]
-    edge_dst = [int(e[1]) for e in edge_tuples]
-    edge_attrs = [e[2] for e in edge_tuples]
+    # fill preallocated arrays in place; torch.from_numpy then wraps them without copying
+    edge_index_np = np.empty((2, len(edges_pdf)), dtype=np.int64)
+    edge_index_np[0] = edges_pdf["src"].to_numpy()
+    edge_index_np[1] = edges_pdf["dst"].to_numpy()
+    edge_attr_np = edges_pdf[edge_cols].to_numpy(dtype=np.float32)
+    edge_attr_np[np.isnan(edge_attr_np)] = 0.0
+    del edges_pdf
 
-    edge_index = torch.tensor([edge_src, edge_dst], dtype=torch.long)
-    edge_attr = torch.tensor(np.array(edge_attrs, dtype=np.float32), dtype=torch.float) if len(edge_attrs)>0 else None
+    # sort by destination (CSC order) so NeighborLoader can skip its per-loader conversion
+    perm = np.argsort(edge_index_np[1], kind="stable")
+    edge_index_np = edge_index_np[:, perm]
+    edge_attr_np = edge_attr_np[perm]
+    edge_index = torch.from_numpy(edge_index_np)
+    edge_attr = torch.from_numpy(edge_attr_np)
 
     # ---------------------------
     # 10) build node feature tensor x
     # ---------------------------
-    node_feat_map = node_features_df.rdd.map(lambda r: (r["account"], [float(r[f"node_f_{i}"]) for i in range(dim)])).collectAsMap()
-    X_list = [node_feat_map.get(acc, [0.0]*dim) for acc in accounts]
-    x = torch.tensor(np.array(X_list, dtype=np.float32), dtype=torch.float)
+    x = torch.from_numpy(node_pdf[[f"node_f_{i}" for i in range(dim)]].to_numpy(dtype=np.float32))
 
     # ---------------------------
     # 11) build label tensor y (account-level)
     # ---------------------------
-    labels_map = df_feat.filter(F.col("Is_laundering")==1).select("Sender_account","Receiver_account").rdd \
-                .flatMap(lambda r: [r["Sender_account"], r["Receiver_account"]]).map(lambda a: (a,1)).collectAsMap()
-    y_list = [int(labels_map.get(acc, 0)) for acc in accounts]
-    y = torch.tensor(np.array(y_list, dtype=np.int64), dtype=torch.long)
+    # dedupe both endpoints in the JVM; only the distinct account ids cross over via Arrow
+    laundering_accounts = df_feat.filter(F.col("Is_laundering")==1) \
+        .select(F.explode(F.array("Sender_account", "Receiver_account")).alias("account")) \
+        .distinct().toPandas()["account"].to_numpy()
+    y_list = node_pdf["account"].isin(laundering_accounts).to_numpy(dtype=np.int64)
+    y = torch.from_numpy(y_list)
 
     # ---------------------------
     # 12) create PyG Data (on CPU for NeighborLoader sampling)
@@ -221,7 +264,7 @@ def main():
     node_idx = np.arange(n_nodes)
     if len(np.unique(y_list)) > 1:
         train_idx, test_idx = train_test_split(node_idx, test_size=0.2, stratify=y_list, random_state=42)
-        train_idx, val_idx = train_test_split(train_idx, test_size=0.125, stratify=[y_list[i] for i in train_idx], random_state=42)
+        train_idx, val_idx = train_test_split(train_idx, test_size=0.125, stratify=y_list[train_idx], random_state=42)
     else:
         train_idx = node_idx[:int(0.7*n_nodes)]
         val_idx = node_idx[int(0.7*n_nodes):int(0.8*n_nodes)]
@@ -255,16 +298,35 @@ def main():
     # ### تعديل لتحسين الدقة: تمرير edge_dim إلى النموذج
     edge_dim = edge_attr.size(1) if edge_attr is not None else None
     model = GATNet(in_channels=x.size(1), edge_dim=edge_dim, hidden_channels=128).to(DEVICE)
-
-    # ---------------------------
-    # 14) NeighborLoader (sampling on CPU)
-    # ---------------------------
-    train_loader = NeighborLoader(data, input_nodes=data.train_mask, num_neighbors=NUM_NEIGHBORS,
-                                  batch_size=BATCH_SIZE, shuffle=True)
-    val_loader   = NeighborLoader(data, input_nodes=data.val_mask, num_neighbors=NUM_NEIGHBORS,
-                                  batch_size=VAL_BATCH_SIZE, shuffle=False)
-    test_loader  = NeighborLoader(data, input_nodes=data.test_mask, num_neighbors=NUM_NEIGHBORS,
-                                  batch_size=TEST_BATCH_SIZE, shuffle=False)
+    # sampled subgraph sizes vary per batch, so compile with dynamic shapes;
+    # state_dict is always saved/loaded through the original `model`
+    model_fwd = torch.compile(model, dynamic=True) if COMPILE_MODEL else model
+
+    # ---------------------------
+    # 14) NeighborLoader (sampling on CPU, pinned batches copied to DEVICE on a side stream)
+    # ---------------------------
+    # node features/labels stay resident on DEVICE and are gathered by batch.n_id,
+    # so the loaders only slice topology and ship indices + edge_attr per batch
+    x_dev = data.x.to(DEVICE)
+    y_dev = data.y.to(DEVICE)
+    # under bf16 autocast the per-batch edge_attr copies are shipped as bf16 (half the H2D bytes)
+    sample_edge_attr = data.edge_attr.to(torch.bfloat16) if USE_AMP and data.edge_attr is not None else data.edge_attr
+    sample_graph = Data(edge_index=data.edge_index, edge_attr=sample_edge_attr, num_nodes=n_nodes)
+    # sampling + edge_attr slicing run in persistent worker processes (filter_per_worker)
+    loader_kwargs = dict(num_neighbors=NUM_NEIGHBORS, pin_memory=PIN_MEMORY, is_sorted=True,
+                         num_workers=NUM_WORKERS, persistent_workers=NUM_WORKERS > 0, filter_per_worker=True)
+    train_loader = PrefetchLoader(NeighborLoader(sample_graph, input_nodes=data.train_mask, batch_size=BATCH_SIZE,
+                                                 shuffle=True, **loader_kwargs), device=DEVICE)
+    val_loader   = PrefetchLoader(NeighborLoader(sample_graph, input_nodes=data.val_mask, batch_size=VAL_BATCH_SIZE,
+                                                 shuffle=False, **loader_kwargs), device=DEVICE)
+    test_loader  = PrefetchLoader(NeighborLoader(sample_graph, input_nodes=data.test_mask, batch_size=TEST_BATCH_SIZE,
+                                                 shuffle=False, **loader_kwargs), device=DEVICE)
+
+    # per-split prediction buffers on DEVICE: filled batch by batch, copied to host once
+    val_ys_buf = torch.empty(int(data.val_mask.sum()), dtype=torch.long, device=DEVICE)
+    val_ps_buf = torch.empty(val_ys_buf.size(0), dtype=torch.float32, device=DEVICE)
+    test_ys_buf = torch.empty(int(data.test_mask.sum()), dtype=torch.long, device=DEVICE)
+    test_ps_buf = torch.empty(test_ys_buf.size(0), dtype=torch.float32, device=DEVICE)
 
     # ---------------------------
     # 15) Training loop (WITH early stopping) with GPU compute  ### تعديل لتحسين الدقة: إضافة early stopping
@@ -281,54 +343,52 @@ def main():
 
     for epoch in range(1, NUM_EPOCHS + 1):
         model.train()
-        total_loss = 0.0
+        total_loss = torch.zeros((), device=DEVICE)  # accumulated on device, synced once per epoch
         total_examples = 0
 
         for batch in train_loader:
-            # keep batch.n_id on CPU, move batch.x and batch.edge_index to GPU
-            batch_n_id = batch.n_id  # CPU tensor of global node indices
+            # PrefetchLoader already moved the batch to DEVICE
+            batch_n_id = batch.n_id  # global node indices
             seed_num = batch.batch_size if hasattr(batch, "batch_size") else batch.n_id.size(0)
 
-            batch_x = batch.x.to(DEVICE, non_blocking=PIN_MEMORY)
-            batch_edge_index = batch.edge_index.to(DEVICE, non_blocking=PIN_MEMORY)
-            batch_edge_attr = batch.edge_attr.to(DEVICE, non_blocking=PIN_MEMORY) if hasattr(batch, "edge_attr") and batch.edge_attr is not None else None
+            batch_x = x_dev.index_select(0, batch_n_id)
+            batch_edge_index = batch.edge_index
+            batch_edge_attr = getattr(batch, "edge_attr", None)
 
             optimizer.zero_grad()
-            logits = model(batch_x, batch_edge_index, batch_edge_attr)
-
-            seed_nid = batch_n_id[:seed_num].cpu()  # ensure CPU indices
-            labels = data.y[seed_nid].to(DEVICE).float()
-            preds = logits[:seed_num]
-            loss = criterion(preds, labels)
+            labels = y_dev.index_select(0, batch_n_id[:seed_num]).float()
+            with torch.autocast(device_type=DEVICE.type, dtype=torch.bfloat16, enabled=USE_AMP):
+                logits = model_fwd(batch_x, batch_edge_index, batch_edge_attr)
+                preds = logits[:seed_num]
+                loss = criterion(preds, labels)
             loss.backward()
             optimizer.step()
 
-            total_loss += loss.item() * seed_num
+            total_loss += loss.detach() * seed_num
             total_examples += int(seed_num)
 
-        train_loss = total_loss / max(1, total_examples)
+        train_loss = total_loss.item() / max(1, total_examples)
 
         # validation
         model.eval()
-        ys, ps = [], []
-        with torch.no_grad():
+        offset = 0
+        with torch.no_grad(), torch.autocast(device_type=DEVICE.type, dtype=torch.bfloat16, enabled=USE_AMP):
             for batch in val_loader:
                 batch_n_id = batch.n_id
                 seed_num = batch.batch_size if hasattr(batch, "batch_size") else batch.n_id.size(0)
 
-                batch_x = batch.x.to(DEVICE, non_blocking=PIN_MEMORY)
-                batch_edge_index = batch.edge_index.to(DEVICE, non_blocking=PIN_MEMORY)
-                batch_edge_attr = batch.edge_attr.to(DEVICE, non_blocking=PIN_MEMORY) if hasattr(batch, "edge_attr") and batch.edge_attr is not None else None
-
-                logits = model(batch_x, batch_edge_index, batch_edge_attr)
-                seed_nid = batch_n_id[:seed_num].cpu()
-                labels = data.y[seed_nid].cpu().numpy()
-                prob = torch.sigmoid(logits[:seed_num]).cpu().numpy()
+                batch_x = x_dev.index_select(0, batch_n_id)
+                batch_edge_index = batch.edge_index
+                batch_edge_attr = getattr(batch, "edge_attr", None)
 
-                ys.append(labels); ps.append(prob)
+                logits = model_fwd(batch_x, batch_edge_index, batch_edge_attr)
+                seed_nid = batch_n_id[:seed_num]
+                val_ys_buf[offset:offset + seed_num] = y_dev.index_select(0, seed_nid)
+                val_ps_buf[offset:offset + seed_num] = torch.sigmoid(logits[:seed_num].float())
+                offset += seed_num
 
-        if len(ys) > 0:
-            ys = np.concatenate(ys); ps = np.concatenate(ps)
+        if offset > 0:
+            ys = val_ys_buf[:offset].cpu().numpy(); ps = val_ps_buf[:offset].cpu().numpy()
             val_auc = roc_auc_score(ys, ps) if len(np.unique(ys)) > 1 else 0.0
             val_f1 = f1_score(ys, (ps > 0.5).astype(int), zero_division=0)
         else:
@@ -355,25 +415,24 @@ def main():
         model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
     model.eval()
 
-    ys, ps = [], []
-    with torch.no_grad():
+    offset = 0
+    with torch.no_grad(), torch.autocast(device_type=DEVICE.type, dtype=torch.bfloat16, enabled=USE_AMP):
         for batch in test_loader:
             batch_n_id = batch.n_id
             seed_num = batch.batch_size if hasattr(batch, "batch_size") else batch.n_id.size(0)
 
-            batch_x = batch.x.to(DEVICE, non_blocking=PIN_MEMORY)
-            batch_edge_index = batch.edge_index.to(DEVICE, non_blocking=PIN_MEMORY)
-            batch_edge_attr = batch.edge_attr.to(DEVICE, non_blocking=PIN_MEMORY) if hasattr(batch, "edge_attr") and batch.edge_attr is not None else None
+            batch_x = x_dev.index_select(0, batch_n_id)
+            batch_edge_index = batch.edge_index
+            batch_edge_attr = getattr(batch, "edge_attr", None)
 
-            logits = model(batch_x, batch_edge_index, batch_edge_attr)
-            seed_nid = batch_n_id[:seed_num].cpu()
-            labels = data.y[seed_nid].cpu().numpy()
-            prob = torch.sigmoid(logits[:seed_num]).cpu().numpy()
+            logits = model_fwd(batch_x, batch_edge_index, batch_edge_attr)
+            seed_nid = batch_n_id[:seed_num]
+            test_ys_buf[offset:offset + seed_num] = y_dev.index_select(0, seed_nid)
+            test_ps_buf[offset:offset + seed_num] = torch.sigmoid(logits[:seed_num].float())
+            offset += seed_num
 
-            ys.append(labels); ps.append(prob)
-
-    if len(ys) > 0:
-        ys = np.concatenate(ys); ps = np.concatenate(ps)
+    if offset > 0:
+        ys = test_ys_buf[:offset].cpu().numpy(); ps = test_ps_buf[:offset].cpu().numpy()
         test_auc = roc_auc_score(ys, ps) if len(np.unique(ys)) > 1 else 0.0
         test_f1 = f1_score(ys, (ps > 0.5).astype(int), zero_division=0)
     else:
@@ -386,88 +445,64 @@ def main():
     # ---------------------------
     with open(MAPPING_PATH, "w") as f:
         json.dump(account2idx, f)
-    print(f"Saved model -> {MODEL_PATH}, mapping -> {MAPPING_PATH}, pipeline -> {PIPELINE_DIR}")
+    print(f"Saved model -> {MODEL_PATH}, mapping -> {MAPPING_PATH}, pipeline -> {PIPELINE_DIR}, scaler stats -> {SCALER_STATS_PATH}")
 
     # ---------------------------
     # 18) Prediction helpers (GPU inference)
     # ---------------------------
+    # full-graph tensors are moved to DEVICE once and reused by every helper call
+    edge_index_dev = data.edge_index.to(DEVICE)
+    edge_attr_dev = data.edge_attr.to(DEVICE) if data.edge_attr is not None else None
+
     def predict_existing_accounts(account_list: List[str]) -> Dict[str, float]:
         model.eval()
         with torch.no_grad():
-            logits = model(data.x.to(DEVICE), data.edge_index.to(DEVICE), data.edge_attr.to(DEVICE) if data.edge_attr is not None else None)
+            logits = model(x_dev, edge_index_dev, edge_attr_dev)
             probs = torch.sigmoid(logits).cpu().numpy()
-        out = {}
-        for acc in account_list:
-            idx = account2idx.get(acc, None)
-            out[acc] = float(probs[idx]) if idx is not None else None
-        return out
+        idx = account_index.get_indexer(account_list)
+        scores = probs[idx].tolist()
+        return {acc: (score if i >= 0 else None) for acc, i, score in zip(account_list, idx.tolist(), scores)}
 
     def predict_with_new_transactions(new_df_spark) -> Dict[str, float]:
         # transform and aggregate same as training; then append nodes & edges temporarily to run inference
-        new_feat = pipeline_model.transform(new_df_spark)
-        new_feat = new_feat.withColumn("features_array", vector_to_array("features_scaled"))
-        for i in range(dim):
-            new_feat = new_feat.withColumn(f"f_{i}", F.col("features_array").getItem(i))
-
-        sender_new = new_feat.groupBy("Sender_account").agg(*[F.avg(f"f_{i}").alias(f"sender_f_{i}") for i in range(dim)]).na.fill(0.0)
-        receiver_new = new_feat.groupBy("Receiver_account").agg(*[F.avg(f"f_{i}").alias(f"receiver_f_{i}") for i in range(dim)]).na.fill(0.0).withColumnRenamed("Receiver_account","account")
-        new_accounts_df = new_feat.select("Sender_account").union(new_feat.select("Receiver_account")).distinct().withColumnRenamed("Sender_account","account")
-        joined_new = new_accounts_df.join(sender_new.withColumnRenamed("Sender_account","account"), on="account", how="left") \
-                                    .join(receiver_new.withColumnRenamed("account","account"), on="account", how="left")
-
-        for i in range(dim):
-            joined_new = joined_new.withColumn(f"sender_f_{i}", F.coalesce(F.col(f"sender_f_{i}"), F.lit(0.0)))
-            joined_new = joined_new.withColumn(f"receiver_f_{i}", F.coalesce(F.col(f"receiver_f_{i}"), F.lit(0.0)))
-
-        node_new_df = joined_new.select("account", *[((F.col(f"sender_f_{i}") + F.col(f"receiver_f_{i}"))/2.0).alias(f"node_f_{i}") for i in range(dim)]).na.fill(0.0)
-        new_map = node_new_df.rdd.map(lambda r: (r["account"], [float(r[f"node_f_{i}"]) for i in range(dim)])).collectAsMap()
-
-        existing_accounts = set(accounts)
-        appended_accounts = [acc for acc in new_map.keys() if acc not in existing_accounts]
-
-        new_X_list = [new_map[acc] for acc in appended_accounts] if len(appended_accounts) > 0 else []
-        if len(new_X_list) > 0:
-            new_X_arr = np.array(new_X_list, dtype=np.float32)
-            x_combined = torch.cat([data.x.cpu(), torch.tensor(new_X_arr, dtype=torch.float)], dim=0).to(DEVICE)
+        new_feat = pipeline_model.transform(new_df_spark).select("*", *scaled_feature_cols)
+
+        node_new_df = account_node_features(new_feat, dim)
+        new_pdf = node_new_df.toPandas()
+        new_accounts = new_pdf["account"].tolist()
+
+        is_appended = account_index.get_indexer(new_pdf["account"]) < 0
+        appended_accounts = new_pdf["account"][is_appended].tolist()
+
+        if len(appended_accounts) > 0:
+            new_X_arr = new_pdf.loc[is_appended, [f"node_f_{i}" for i in range(dim)]].to_numpy(dtype=np.float32)
+            x_combined = torch.cat([x_dev, torch.from_numpy(new_X_arr).to(DEVICE)], dim=0)
         else:
-            x_combined = data.x.to(DEVICE)
-
-        base_count = len(accounts)
-        appended_index_map = {acc: base_count + i for i, acc in enumerate(appended_accounts)}
-        def map_idx(a):
-            if a in account2idx:
-                return account2idx[a]
-            elif a in appended_index_map:
-                return appended_index_map[a]
-            else:
-                return None
-
-        new_edges = new_feat.select("Sender_account","Receiver_account").distinct().rdd \
-                    .map(lambda r: (map_idx(r["Sender_account"]), map_idx(r["Receiver_account"]))) \
-                    .filter(lambda x: x[0] is not None and x[1] is not None).collect()
-
-        if len(new_edges) > 0:
-            new_src = [int(e[0]) for e in new_edges]
-            new_dst = [int(e[1]) for e in new_edges]
-            edge_src_comb = torch.cat([data.edge_index[0].cpu(), torch.tensor(new_src, dtype=torch.long)], dim=0).to(DEVICE)
-            edge_dst_comb = torch.cat([data.edge_index[1].cpu(), torch.tensor(new_dst, dtype=torch.long)], dim=0).to(DEVICE)
-            edge_index_comb = torch.stack([edge_src_comb, edge_dst_comb], dim=0).to(DEVICE)
+            x_combined = x_dev
+
+        combined_index = account_index.append(pd.Index(appended_accounts))
+
+        new_edges_pdf = new_feat.select("Sender_account","Receiver_account").distinct().toPandas()
+        new_src = combined_index.get_indexer(new_edges_pdf["Sender_account"])
+        new_dst = combined_index.get_indexer(new_edges_pdf["Receiver_account"])
+        new_mask = (new_src >= 0) & (new_dst >= 0)
+
+        edge_attr_comb = edge_attr_dev
+        if new_mask.any():
+            new_edge_index = torch.from_numpy(np.stack([new_src[new_mask], new_dst[new_mask]]).astype(np.int64)).to(DEVICE)
+            edge_index_comb = torch.cat([edge_index_dev, new_edge_index], dim=1)
+            if edge_attr_dev is not None:
+                # new edges carry no training-time attributes; pad with zeros so shapes line up
+                edge_attr_comb = torch.cat([edge_attr_dev, edge_attr_dev.new_zeros((new_edge_index.size(1), edge_attr_dev.size(1)))], dim=0)
         else:
-            edge_index_comb = data.edge_index.to(DEVICE)
+            edge_index_comb = edge_index_dev
 
         model.eval()
         with torch.no_grad():
-            logits_comb = model(x_combined, edge_index_comb, data.edge_attr.to(DEVICE) if data.edge_attr is not None else None)
+            logits_comb = model(x_combined, edge_index_comb, edge_attr_comb)
             probs_comb = torch.sigmoid(logits_comb).cpu().numpy()
 
-        out = {}
-        for acc in new_map.keys():
-            if acc in account2idx:
-                out[acc] = float(probs_comb[account2idx[acc]])
-            else:
-                idx = appended_index_map[acc]
-                out[acc] = float(probs_comb[idx])
-        return out
+        return dict(zip(new_accounts, probs_comb[combined_index.get_indexer(new_accounts)].tolist()))
 
     # return helpers so user can import them if running from main
     return {
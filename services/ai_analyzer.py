@@ -4,58 +4,131 @@ from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import DBSCAN
 from datetime import datetime, timedelta
-import pickle
+from collections import defaultdict
+import joblib
+from joblib import Parallel, delayed
 import os
+import threading
+
+# Write-back batch size for risk-score updates and generated alerts
+ANALYSIS_WRITE_BATCH_SIZE = 1000
+
+# Currency risk (simplified mapping); unknown currencies score 0.5
+CURRENCY_RISK_MAP = {
+    'USD': 0.1, 'EUR': 0.1, 'GBP': 0.1, 'CHF': 0.1,
+    'JPY': 0.2, 'CAD': 0.2, 'AUD': 0.2,
+    'BTC': 0.9, 'ETH': 0.8, 'XMR': 0.95
+}
+DEFAULT_CURRENCY_RISK = 0.5
+
+# Transaction fields read by feature extraction and alert generation
+ANALYSIS_PROJECTION = {
+    'timestamp': 1, 'amount_received': 1, 'amount_paid': 1,
+    'from_bank': 1, 'to_bank': 1, 'receiving_currency': 1,
+    'from_account': 1, 'to_account': 1
+}
+
+# Stored risk scores are rounded to this many decimals so equal scores share one updateMany
+RISK_SCORE_DECIMALS = 3
+
+# Weight kept by the running 95th-percentile amount threshold on each batch update
+AMOUNT_P95_DECAY = 0.9
+
+# Warm-start retraining: trees added per extra training batch, and the forest size cap
+WARM_START_ESTIMATORS = 10
+MAX_ESTIMATORS = 300
 
 class AIAnalyzer:
     """AI-powered transaction analysis for AML detection"""
     
     def __init__(self):
-        self.isolation_forest = IsolationForest(contamination=0.1, random_state=42)
+        self.isolation_forest = self._new_forest()
         self.scaler = StandardScaler()
         self.is_trained = False
         self.feature_columns = [
             'amount_received', 'amount_paid', 'hour', 'day_of_week',
             'amount_ratio', 'bank_distance', 'currency_risk'
         ]
+        # Sorted code table for the searchsorted currency-risk lookup in extract_features
+        self._currency_codes = np.array(sorted(CURRENCY_RISK_MAP))
+        self._currency_risk = np.array([CURRENCY_RISK_MAP[code] for code in self._currency_codes])
+        # Running high-amount threshold, smoothed across analyze_transactions batches
+        self._amount_p95 = None
+        # Request threads and background jobs share one analyzer; fitting, scoring and the
+        # running threshold all mutate model state, so they run one at a time
+        self._lock = threading.RLock()
+    
+    def _new_forest(self):
+        """Unfitted isolation forest at its initial size"""
+        # n_jobs=-1 spreads tree fitting and scoring across all cores;
+        # warm_start lets later training batches add trees instead of refitting all
+        return IsolationForest(contamination=0.1, random_state=42, n_jobs=-1, warm_start=True)
+    
+    def _feature_arrays(self, columns):
+        """Compute per-transaction features as NumPy arrays from a column mapping (dict of lists or DataFrame)"""
+        n_rows = len(columns['amount_received'])
+        amount_received = np.asarray(columns['amount_received'], dtype=np.float64)
+        amount_paid = np.asarray(columns['amount_paid'], dtype=np.float64)
+        arrays = {}
+        
+        # Convert timestamp: datetime values pass straight through, ISO strings take the fixed-format path
+        if 'timestamp' in columns:
+            timestamps = pd.DatetimeIndex(pd.to_datetime(columns['timestamp'], format='ISO8601', cache=True))
+            arrays['timestamp'] = timestamps
+            arrays['hour'] = timestamps.hour.to_numpy()
+            arrays['day_of_week'] = timestamps.dayofweek.to_numpy()
+        else:
+            arrays['hour'] = np.full(n_rows, 12)  # Default values
+            arrays['day_of_week'] = np.full(n_rows, 1)
+        
+        # Amount-based features
+        arrays['amount_ratio'] = amount_paid / (amount_received + 1e-6)
+        
+        # Bank distance (simplified - using bank codes)
+        from_bank = pd.to_numeric(pd.Series(columns['from_bank']), errors='coerce').fillna(0).to_numpy(np.int64)
+        to_bank = pd.to_numeric(pd.Series(columns['to_bank']), errors='coerce').fillna(0).to_numpy(np.int64)
+        arrays['bank_distance'] = np.abs(from_bank - to_bank)
+        
+        # Currency risk: binary search in the sorted code table; misses (incl. None/NaN) get the default
+        currencies = np.asarray(columns['receiving_currency'], dtype=str)
+        positions = np.minimum(np.searchsorted(self._currency_codes, currencies), len(self._currency_codes) - 1)
+        known = self._currency_codes[positions] == currencies
+        arrays['currency_risk'] = np.where(known, self._currency_risk[positions], DEFAULT_CURRENCY_RISK)
+        
+        # Round-number detection
+        arrays['is_round_number'] = ((amount_received % 1000) == 0).astype(int)
+        
+        # Weekend/night transactions (higher risk)
+        arrays['is_weekend'] = (arrays['day_of_week'] >= 5).astype(int)
+        arrays['is_night'] = ((arrays['hour'] < 6) | (arrays['hour'] > 22)).astype(int)
+        
+        arrays['amount_received'] = amount_received
+        arrays['amount_paid'] = amount_paid
+        return arrays
+    
+    def _feature_matrix(self, arrays):
+        """Stack feature arrays into the C-contiguous float32 model input, NaN -> 0"""
+        feature_input = np.empty((len(arrays['amount_received']), len(self.feature_columns)), dtype=np.float32)
+        for i, col in enumerate(self.feature_columns):
+            feature_input[:, i] = arrays[col]
+        feature_input[np.isnan(feature_input)] = 0
+        return feature_input
     
     def extract_features(self, transactions):
         """Extract features from transactions for ML analysis"""
         try:
             df = pd.DataFrame(transactions)
+            arrays = self._feature_arrays(df)
             
-            # Convert timestamp if it's a string
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                df['hour'] = df['timestamp'].dt.hour
-                df['day_of_week'] = df['timestamp'].dt.dayofweek
-            else:
-                df['hour'] = 12  # Default values
-                df['day_of_week'] = 1
-            
-            # Amount-based features
-            df['amount_ratio'] = df['amount_paid'] / (df['amount_received'] + 1e-6)
+            if 'timestamp' in arrays:
+                df['timestamp'] = arrays['timestamp']
+            df['hour'] = arrays['hour']
+            df['day_of_week'] = arrays['day_of_week']
+            df['amount_ratio'] = arrays['amount_ratio']
             df['log_amount_received'] = np.log1p(df['amount_received'])
             df['log_amount_paid'] = np.log1p(df['amount_paid'])
-            
-            # Bank distance (simplified - using bank codes)
-            df['bank_distance'] = abs(df['from_bank'].astype(int, errors='ignore').fillna(0) - 
-                                    df['to_bank'].astype(int, errors='ignore').fillna(0))
-            
-            # Currency risk (simplified mapping)
-            currency_risk_map = {
-                'USD': 0.1, 'EUR': 0.1, 'GBP': 0.1, 'CHF': 0.1,
-                'JPY': 0.2, 'CAD': 0.2, 'AUD': 0.2,
-                'BTC': 0.9, 'ETH': 0.8, 'XMR': 0.95
-            }
-            df['currency_risk'] = df['receiving_currency'].map(currency_risk_map).fillna(0.5)
-            
-            # Round-number detection
-            df['is_round_number'] = ((df['amount_received'] % 1000) == 0).astype(int)
-            
-            # Weekend/night transactions (higher risk)
-            df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
-            df['is_night'] = ((df['hour'] < 6) | (df['hour'] > 22)).astype(int)
+            for col in ('bank_distance', 'currency_risk', 'is_round_number', 'is_weekend', 'is_night'):
+                df[col] = arrays[col]
             
             # Select feature columns that exist
             available_features = [col for col in self.feature_columns if col in df.columns]
@@ -67,95 +140,166 @@ class AIAnalyzer:
             print(f"Error extracting features: {e}")
             return pd.DataFrame(), pd.DataFrame()
     
+    def _model_input(self, features):
+        """C-contiguous float32 matrix, the layout the forest uses internally"""
+        return np.ascontiguousarray(features.to_numpy(dtype=np.float32))
+    
+    def _scale(self, feature_input):
+        """Scale with the fitted scaler, keeping float32 even for scalers fitted on float64"""
+        return np.ascontiguousarray(self.scaler.transform(feature_input), dtype=np.float32)
+    
+    def _fit_scaled(self, feature_input):
+        """Fit scaler and isolation forest; returns the scaled matrix for reuse"""
+        features_scaled = self.scaler.fit_transform(feature_input)
+        self.isolation_forest.fit(features_scaled)
+        self.is_trained = True
+        return features_scaled
+    
     def train_model(self, transactions):
         """Train the AI model on transaction data"""
-        try:
-            features, _ = self.extract_features(transactions)
+        with self._lock:
+            try:
+                features, _ = self.extract_features(transactions)
+                
+                if features.empty:
+                    print("No features extracted for training")
+                    return False
+                
+                feature_input = self._model_input(features)
+                if self.is_trained and self.isolation_forest.n_estimators < MAX_ESTIMATORS:
+                    # Keep the fitted scaler so transforms stay consistent; grow the forest on this batch
+                    self.isolation_forest.n_estimators += WARM_START_ESTIMATORS
+                    self.isolation_forest.fit(self._scale(feature_input))
+                    print(f"Model updated with {len(features)} transactions")
+                    return True
+                
+                if self.is_trained:
+                    # At the size cap: refit a fresh forest (and scaler) on this batch rather
+                    # than stop learning or keep stacking trees fitted to older batches
+                    self.isolation_forest = self._new_forest()
+                
+                self._fit_scaled(feature_input)
+                
+                print(f"Model trained on {len(features)} transactions")
+                return True
             
-            if features.empty:
-                print("No features extracted for training")
+            except Exception as e:
+                print(f"Error training model: {e}")
                 return False
-            
-            # Scale features
-            features_scaled = self.scaler.fit_transform(features)
-            
-            # Train isolation forest
-            self.isolation_forest.fit(features_scaled)
-            self.is_trained = True
-            
-            print(f"Model trained on {len(features)} transactions")
-            return True
-        
-        except Exception as e:
-            print(f"Error training model: {e}")
-            return False
+    
+    def _smoothed_amount_threshold(self, amounts):
+        """Fold this batch's 95th-percentile amount into the running threshold and return it"""
+        with self._lock:
+            batch_p95 = np.nanquantile(amounts, 0.95) if len(amounts) else np.nan
+            if not np.isnan(batch_p95):
+                if self._amount_p95 is None:
+                    self._amount_p95 = batch_p95
+                else:
+                    self._amount_p95 = AMOUNT_P95_DECAY * self._amount_p95 + (1 - AMOUNT_P95_DECAY) * batch_p95
+            return self._amount_p95
     
     def predict_anomalies(self, transactions):
         """Predict anomalies in transactions"""
         try:
-            if not self.is_trained:
-                # Train on the provided data first
-                self.train_model(transactions)
-            
             features, df = self.extract_features(transactions)
             
             if features.empty:
                 return []
             
-            # Scale features
-            features_scaled = self.scaler.transform(features)
-            
-            # Predict anomalies (-1 for anomaly, 1 for normal)
-            anomaly_predictions = self.isolation_forest.predict(features_scaled)
-            anomaly_scores = self.isolation_forest.decision_function(features_scaled)
-            
-            # Convert to risk scores (0-1, where 1 is highest risk)
-            risk_scores = 1 - (anomaly_scores - anomaly_scores.min()) / (anomaly_scores.max() - anomaly_scores.min() + 1e-6)
-            
-            # Apply additional rule-based risk factors
-            risk_scores = self.apply_rule_based_risk(df, risk_scores)
-            
-            return risk_scores.tolist()
+            return self._score(self._model_input(features), df).tolist()
         
         except Exception as e:
             print(f"Error predicting anomalies: {e}")
             return []
     
-    def apply_rule_based_risk(self, df, base_risk_scores):
-        """Apply rule-based risk adjustments"""
+    def _predict_from_columns(self, columns, amount_threshold=None):
+        """predict_anomalies for column-oriented input, without building a DataFrame"""
         try:
-            risk_scores = base_risk_scores.copy()
-            
-            # High amount transactions
-            high_amount_threshold = df['amount_received'].quantile(0.95)
-            high_amount_mask = df['amount_received'] > high_amount_threshold
-            risk_scores[high_amount_mask] = np.minimum(risk_scores[high_amount_mask] + 0.2, 1.0)
-            
-            # Round number transactions
-            if 'is_round_number' in df.columns:
-                round_number_mask = df['is_round_number'] == 1
-                risk_scores[round_number_mask] = np.minimum(risk_scores[round_number_mask] + 0.1, 1.0)
-            
-            # Weekend/night transactions
-            if 'is_weekend' in df.columns and 'is_night' in df.columns:
-                unusual_time_mask = (df['is_weekend'] == 1) | (df['is_night'] == 1)
-                risk_scores[unusual_time_mask] = np.minimum(risk_scores[unusual_time_mask] + 0.05, 1.0)
-            
-            # High currency risk
-            if 'currency_risk' in df.columns:
-                high_currency_risk_mask = df['currency_risk'] > 0.7
-                risk_scores[high_currency_risk_mask] = np.minimum(risk_scores[high_currency_risk_mask] + 0.15, 1.0)
-            
-            # Unusual amount ratios
-            if 'amount_ratio' in df.columns:
-                unusual_ratio_mask = (df['amount_ratio'] < 0.5) | (df['amount_ratio'] > 2.0)
-                risk_scores[unusual_ratio_mask] = np.minimum(risk_scores[unusual_ratio_mask] + 0.1, 1.0)
-            
-            return risk_scores
+            arrays = self._feature_arrays(columns)
+            feature_input = self._feature_matrix(arrays)
+            
+            if len(feature_input) == 0:
+                return []
+            
+            return self._score(feature_input, arrays, amount_threshold).tolist()
         
         except Exception as e:
-            print(f"Error applying rule-based risk: {e}")
-            return base_risk_scores
+            print(f"Error predicting anomalies: {e}")
+            return []
+    
+    def _score(self, feature_input, rule_inputs, amount_threshold=None):
+        """Model + rule-based risk for a float32 feature matrix; returns an ndarray"""
+        with self._lock:
+            if not self.is_trained:
+                # Train on the provided data first, reusing its features and scaled matrix
+                features_scaled = self._fit_scaled(feature_input)
+                print(f"Model trained on {len(feature_input)} transactions")
+            else:
+                features_scaled = self._scale(feature_input)
+            
+            # One pass over the forest: predict() would re-run decision_function
+            # (anomaly where score < 0), and only the scores feed the risk below
+            anomaly_scores = self.isolation_forest.decision_function(features_scaled)
+            
+            # Convert to risk scores (0-1, where 1 is highest risk)
+            # computed in place on the fresh decision_function output
+            risk_scores = anomaly_scores
+            score_min = risk_scores.min()
+            score_span = risk_scores.max() - score_min + 1e-6
+            np.subtract(risk_scores, score_min, out=risk_scores)
+            np.divide(risk_scores, score_span, out=risk_scores)
+            np.subtract(1, risk_scores, out=risk_scores)
+            
+            # Apply additional rule-based risk factors
+            return self.apply_rule_based_risk(rule_inputs, risk_scores, inplace=True,
+                                              amount_threshold=amount_threshold)
+    
+    def apply_rule_based_risk(self, df, base_risk_scores, inplace=False, amount_threshold=None):
+        """Apply rule-based risk adjustments (df: DataFrame or dict of feature arrays).
+        
+        High amounts are those above amount_threshold, or above the batch's own
+        95th percentile when no threshold is given.
+        """
+        with self._lock:
+            try:
+                # All adjustments are non-negative, so summing them and clamping once
+                # equals clamping after each one; each rule adds into bonus in place under its mask
+                # inplace=True lets the caller hand over a float64 ndarray it owns
+                risk_scores = np.asarray(base_risk_scores, dtype=np.float64) if inplace else np.array(base_risk_scores, dtype=np.float64)
+                bonus = np.zeros_like(risk_scores)
+                
+                # High amount transactions
+                amounts = np.asarray(df['amount_received'], dtype=np.float64)
+                if amount_threshold is None and len(amounts):
+                    amount_threshold = np.nanquantile(amounts, 0.95)
+                if amount_threshold is not None and not np.isnan(amount_threshold):
+                    np.add(bonus, 0.2, out=bonus, where=amounts > amount_threshold)
+                
+                # Round number transactions
+                if 'is_round_number' in df:
+                    np.add(bonus, 0.1, out=bonus, where=np.asarray(df['is_round_number']) == 1)
+                
+                # Weekend/night transactions
+                if 'is_weekend' in df and 'is_night' in df:
+                    unusual_time_mask = (np.asarray(df['is_weekend']) == 1) | (np.asarray(df['is_night']) == 1)
+                    np.add(bonus, 0.05, out=bonus, where=unusual_time_mask)
+                
+                # High currency risk
+                if 'currency_risk' in df:
+                    np.add(bonus, 0.15, out=bonus, where=np.asarray(df['currency_risk']) > 0.7)
+                
+                # Unusual amount ratios
+                if 'amount_ratio' in df:
+                    ratios = np.asarray(df['amount_ratio'])
+                    np.add(bonus, 0.1, out=bonus, where=(ratios < 0.5) | (ratios > 2.0))
+                
+                np.add(risk_scores, bonus, out=risk_scores)
+                np.minimum(risk_scores, 1.0, out=risk_scores)
+                return risk_scores
+            
+            except Exception as e:
+                print(f"Error applying rule-based risk: {e}")
+                return base_risk_scores
     
     def analyze_transactions(self, transaction_ids, database=None):
         """Analyze transactions and generate alerts"""
@@ -166,63 +310,98 @@ class AIAnalyzer:
             
             # Fetch transactions from database
             from bson import ObjectId
-            object_ids = [ObjectId(tid) for tid in transaction_ids if ObjectId.is_valid(tid)]
-            
-            transactions_cursor = database.transactions.find({'_id': {'$in': object_ids}})
-            transactions = list(transactions_cursor)
-            
-            if not transactions:
+            from bson.errors import InvalidId
+            from pymongo import UpdateMany
+            
+            # Parse each id once; invalid ids are skipped
+            object_ids = []
+            for tid in transaction_ids:
+                try:
+                    object_ids.append(ObjectId(tid))
+                except (InvalidId, TypeError):
+                    continue
+            
+            transactions_cursor = database.transactions.find({'_id': {'$in': object_ids}}, ANALYSIS_PROJECTION)
+            
+            # Accumulate one list per field while streaming the cursor (no list of row dicts or DataFrame)
+            columns = {field: [] for field in ('_id', *ANALYSIS_PROJECTION)}
+            present_fields = set()
+            for doc in transactions_cursor:
+                for field, values in columns.items():
+                    values.append(doc.get(field))
+                present_fields.update(doc)
+            
+            transaction_ids = columns['_id']
+            if not transaction_ids:
                 return {'message': 'No transactions found for analysis'}
             
-            # Convert datetime objects to strings for processing
-            for t in transactions:
-                if 'timestamp' in t and hasattr(t['timestamp'], 'isoformat'):
-                    t['timestamp'] = t['timestamp'].isoformat()
+            # Only stored-transaction analysis moves the running high-amount threshold
+            amount_threshold = self._smoothed_amount_threshold(
+                np.asarray(columns['amount_received'], dtype=np.float64)
+            )
             
-            # Predict risk scores
-            risk_scores = self.predict_anomalies(transactions)
+            # Fields missing from every document stay absent, as with a list of dicts
+            risk_scores = self._predict_from_columns(
+                {field: values for field, values in columns.items() if field in present_fields},
+                amount_threshold
+            )
             
             # Update transactions with risk scores
-            suspicious_count = 0
             alerts_generated = 0
-            
-            for i, (transaction, risk_score) in enumerate(zip(transactions, risk_scores)):
-                # Update transaction in database
-                database.transactions.update_one(
-                    {'_id': transaction['_id']},
+            analyzed_at = datetime.now()
+            
+            # Quantize, then group rows by score: one updateMany per distinct score instead of one update per row
+            scores = np.round(np.asarray(risk_scores, dtype=np.float64), RISK_SCORE_DECIMALS)
+            risk_scores = scores.tolist()
+            order = np.argsort(scores, kind='stable')
+            score_groups = np.split(order, np.flatnonzero(np.diff(scores[order])) + 1) if len(order) else []
+            updates = [
+                UpdateMany(
+                    {'_id': {'$in': [transaction_ids[i] for i in group.tolist()]}},
                     {
                         '$set': {
-                            'risk_score': risk_score,
-                            'analyzed_at': datetime.now(),
+                            'risk_score': float(scores[group[0]]),
+                            'analyzed_at': analyzed_at,
                             'status': 'analyzed'
                         }
                     }
                 )
-                
-                # Generate alert for high-risk transactions
-                if risk_score > 0.7:
-                    suspicious_count += 1
-                    
-                    alert = {
-                        'transaction_id': str(transaction['_id']),
-                        'alert_type': 'suspicious_transaction',
-                        'risk_score': risk_score,
-                        'priority': 'high' if risk_score > 0.9 else 'medium',
-                        'description': f"High-risk transaction detected (Risk Score: {risk_score:.3f})",
-                        'from_account': transaction.get('from_account'),
-                        'to_account': transaction.get('to_account'),
-                        'amount': transaction.get('amount_received'),
-                        'currency': transaction.get('receiving_currency'),
-                        'status': 'active',
-                        'created_at': datetime.now(),
-                        'assigned_to': None
-                    }
-                    
-                    database.alerts.insert_one(alert)
-                    alerts_generated += 1
+                for group in score_groups
+            ]
+            
+            # Generate alerts for high-risk transactions; the subset is picked in one vectorized pass
+            high_risk_rows = np.flatnonzero(scores > 0.7).tolist()
+            suspicious_count = len(high_risk_rows)
+            alerts = []
+            
+            for i in high_risk_rows:
+                transaction_id = transaction_ids[i]
+                risk_score = risk_scores[i]
+                alerts.append({
+                    'transaction_id': str(transaction_id),
+                    'alert_type': 'suspicious_transaction',
+                    'risk_score': risk_score,
+                    'priority': 'high' if risk_score > 0.9 else 'medium',
+                    'description': f"High-risk transaction detected (Risk Score: {risk_score:.3f})",
+                    'from_account': columns['from_account'][i],
+                    'to_account': columns['to_account'][i],
+                    'amount': columns['amount_received'][i],
+                    'currency': columns['receiving_currency'][i],
+                    'status': 'active',
+                    'created_at': analyzed_at,
+                    'assigned_to': None
+                })
+            
+            # One round trip per batch of score groups instead of one per transaction
+            for start in range(0, len(updates), ANALYSIS_WRITE_BATCH_SIZE):
+                database.transactions.bulk_write(updates[start:start + ANALYSIS_WRITE_BATCH_SIZE], ordered=False)
+            
+            for start in range(0, len(alerts), ANALYSIS_WRITE_BATCH_SIZE):
+                result = database.alerts.insert_many(alerts[start:start + ANALYSIS_WRITE_BATCH_SIZE], ordered=False)
+                alerts_generated += len(result.inserted_ids)
             
             return {
-                'analyzed_transactions': len(transactions),
+                'analyzed_transactions': len(transaction_ids),
                 'suspicious_count': suspicious_count,
                 'alerts_generated': alerts_generated,
                 'avg_risk_score': np.mean(risk_scores) if risk_scores else 0
@@ -232,6 +411,72 @@ class AIAnalyzer:
             print(f"Error analyzing transactions: {e}")
             return {'error': str(e)}
     
+    def _detect_rapid_fire(self, df):
+        """Pattern 1: Rapid fire transactions"""
+        if 'timestamp' not in df.columns:
+            return []
+        
+        patterns = []
+        df_sorted = df.sort_values('timestamp')
+        
+        # Per-account gaps in one groupby pass; reindexed to first-seen account order
+        by_account = df_sorted.groupby('from_account', sort=False)
+        time_diffs = by_account['timestamp'].diff().dt.total_seconds()
+        per_account = pd.DataFrame({
+            'txn_count': by_account.size(),
+            'rapid_fire': (time_diffs < 300).groupby(df_sorted['from_account'], sort=False).sum()  # Less than 5 minutes
+        }).reindex(df['from_account'].unique())
+        flagged = per_account[(per_account['txn_count'] > 5) & (per_account['rapid_fire'] > 3)]
+        
+        for account, rapid_fire in flagged['rapid_fire'].astype(int).items():
+            patterns.append({
+                'type': 'rapid_fire',
+                'account': account,
+                'description': f"Account made {rapid_fire} transactions within 5 minutes",
+                'risk_level': 'high'
+            })
+        return patterns
+    
+    def _detect_circular(self, df):
+        """Pattern 2: Circular transactions (a -> b and b -> a), one pass over the edge set"""
+        patterns = []
+        edges = set(zip(df['from_account'], df['to_account']))
+        partners = defaultdict(set)
+        for sender, receiver in edges:
+            if (receiver, sender) in edges:
+                partners[sender].add(receiver)
+        
+        for account in df['from_account'].unique():
+            circular = partners.get(account)
+            if circular:
+                patterns.append({
+                    'type': 'circular',
+                    'account': account,
+                    'description': f"Circular transactions detected with {len(circular)} accounts",
+                    'risk_level': 'medium'
+                })
+        return patterns
+    
+    def _detect_structuring(self, df):
+        """Pattern 3: Structuring (amounts just below reporting threshold)"""
+        patterns = []
+        threshold = 10000  # Common AML reporting threshold
+        structuring_amounts = df[
+            (df['amount_received'] > threshold * 0.8) & 
+            (df['amount_received'] < threshold)
+        ]
+        
+        structuring_counts = structuring_amounts.groupby('from_account', sort=False).size()
+        
+        for account, count in structuring_counts[structuring_counts > 2].items():
+            patterns.append({
+                'type': 'structuring',
+                'account': account,
+                'description': f"Potential structuring: {count} transactions near threshold",
+                'risk_level': 'high'
+            })
+        return patterns
+    
     def detect_transaction_patterns(self, transactions):
         """Detect suspicious patterns in transaction networks"""
         try:
@@ -240,67 +485,23 @@ class AIAnalyzer:
             if df.empty:
                 return []
             
-            patterns = []
-            
-            # Pattern 1: Rapid fire transactions
             if 'timestamp' in df.columns:
                 df['timestamp'] = pd.to_datetime(df['timestamp'])
-                df_sorted = df.sort_values('timestamp')
-                
-                for account in df['from_account'].unique():
-                    account_txns = df_sorted[df_sorted['from_account'] == account]
-                    
-                    if len(account_txns) > 5:
-                        time_diffs = account_txns['timestamp'].diff().dt.total_seconds()
-                        rapid_fire = (time_diffs < 300).sum()  # Less than 5 minutes
-                        
-                        if rapid_fire > 3:
-                            patterns.append({
-                                'type': 'rapid_fire',
-                                'account': account,
-                                'description': f"Account made {rapid_fire} transactions within 5 minutes",
-                                'risk_level': 'high'
-                            })
-            
-            # Pattern 2: Circular transactions
-            for account in df['from_account'].unique():
-                sent_to = df[df['from_account'] == account]['to_account'].tolist()
-                received_from = df[df['to_account'] == account]['from_account'].tolist()
-                
-                circular = set(sent_to).intersection(set(received_from))
-                if circular:
-                    patterns.append({
-                        'type': 'circular',
-                        'account': account,
-                        'description': f"Circular transactions detected with {len(circular)} accounts",
-                        'risk_level': 'medium'
-                    })
-            
-            # Pattern 3: Structuring (amounts just below reporting threshold)
-            threshold = 10000  # Common AML reporting threshold
-            structuring_amounts = df[
-                (df['amount_received'] > threshold * 0.8) & 
-                (df['amount_received'] < threshold)
-            ]
             
-            for account in structuring_amounts['from_account'].unique():
-                account_structuring = structuring_amounts[structuring_amounts['from_account'] == account]
-                if len(account_structuring) > 2:
-                    patterns.append({
-                        'type': 'structuring',
-                        'account': account,
-                        'description': f"Potential structuring: {len(account_structuring)} transactions near threshold",
-                        'risk_level': 'high'
-                    })
-            
-            return patterns
+            # The three detectors only read df; run them side by side on threads
+            detectors = (self._detect_rapid_fire, self._detect_circular, self._detect_structuring)
+            results = Parallel(n_jobs=len(detectors), prefer='threads')(
+                delayed(detector)(df) for detector in detectors
+            )
+            
+            return [pattern for detected in results for pattern in detected]
         
         except Exception as e:
             print(f"Error detecting patterns: {e}")
             return []
     
-    def save_model(self, filepath):
-        """Save trained model to file"""
+    def save_model(self, filepath, compress=0):
+        """Save trained model to file (uncompressed by default so it can be memory-mapped on load)"""
         try:
             model_data = {
                 'isolation_forest': self.isolation_forest,
@@ -309,8 +510,7 @@ class AIAnalyzer:
                 'feature_columns': self.feature_columns
             }
             
-            with open(filepath, 'wb') as f:
-                pickle.dump(model_data, f)
+            joblib.dump(model_data, filepath, compress=compress)
             
             print(f"Model saved to {filepath}")
             return True
@@ -321,22 +521,24 @@ class AIAnalyzer:
     
     def load_model(self, filepath):
         """Load trained model from file"""
-        try:
-            if not os.path.exists(filepath):
-                print(f"Model file not found: {filepath}")
-                return False
-            
-            with open(filepath, 'rb') as f:
-                model_data = pickle.load(f)
-            
-            self.isolation_forest = model_data['isolation_forest']
-            self.scaler = model_data['scaler']
-            self.is_trained = model_data['is_trained']
-            self.feature_columns = model_data['feature_columns']
+        with self._lock:
+            try:
+                if not os.path.exists(filepath):
+                    print(f"Model file not found: {filepath}")
+                    return False
+                
+                # Tree arrays are memory-mapped instead of copied into the heap;
+                # compressed files and older pickle files load normally
+                model_data = joblib.load(filepath, mmap_mode='r')
+                
+                self.isolation_forest = model_data['isolation_forest']
+                self.scaler = model_data['scaler']
+                self.is_trained = model_data['is_trained']
+                self.feature_columns = model_data['feature_columns']
+                
+                print(f"Model loaded from {filepath}")
+                return True
             
-            print(f"Model loaded from {filepath}")
-            return True
-        
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            return False
\ No newline at end of file
+            except Exception as e:
+                print(f"Error loading model: {e}")
+                return False
@@ -3,39 +3,129 @@ import numpy as np
 from datetime import datetime, timedelta
 from bson import ObjectId
 import json
+import io
+import logging
+import codecs
 import requests
 import re
+import tempfile
+from itertools import chain
+from types import MappingProxyType
+from concurrent.futures import Future, ThreadPoolExecutor
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Rows read, validated and inserted per round-trip when processing uploads
+UPLOAD_BATCH_SIZE = 10000
+
+# Bytes decoded per step when checking whether a CSV upload is valid UTF-8
+CSV_ENCODING_CHECK_BLOCK = 1 << 20
+
+# Documents per round-trip when reading transactions for pattern analysis
+ANALYSIS_FETCH_BATCH_SIZE = 500
+
+# Seconds fetched country coordinates stay in the shared collection before refetching
+COUNTRY_COORDINATES_TTL = 30 * 24 * 3600
+
+# Concurrent REST Countries requests when prefetching a map's unknown countries
+COUNTRY_FETCH_WORKERS = 10
+
+# Bank location strings (upper-cased) to ISO country codes; read-only and shared
+COUNTRY_CODE_MAPPINGS = MappingProxyType({
+    'US': 'US', 'USA': 'US', 'UNITED STATES': 'US',
+    'UK': 'GB', 'UNITED KINGDOM': 'GB', 'BRITAIN': 'GB', 'ENGLAND': 'GB',
+    'CANADA': 'CA', 'CA': 'CA',
+    'GERMANY': 'DE', 'DE': 'DE', 'DEUTSCHLAND': 'DE',
+    'FRANCE': 'FR', 'FR': 'FR',
+    'SWITZERLAND': 'CH', 'CH': 'CH',
+    'SPAIN': 'ES', 'ES': 'ES',
+    'ITALY': 'IT', 'IT': 'IT',
+    'NETHERLANDS': 'NL', 'NL': 'NL',
+    'JAPAN': 'JP', 'JP': 'JP',
+    'CHINA': 'CN', 'CN': 'CN',
+    'INDIA': 'IN', 'IN': 'IN',
+    'AUSTRALIA': 'AU', 'AU': 'AU'
+})
+
+# YYYY-MM-DD alert date filters, parsed without going through strptime
+DATE_FILTER_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+
+class _SpooledUploadReader(io.RawIOBase):
+    """Raw, seekable view of a SpooledTemporaryFile, which is only a full io object from Python 3.11"""
+    
+    def __init__(self, spool):
+        self._spool = spool
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def readinto(self, buffer):
+        data = self._spool.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._spool.seek(offset, whence)
+        return self._spool.tell()
+    
+    def tell(self):
+        return self._spool.tell()
 
 class DataProcessor:
     """Handles data processing and database operations"""
     
-    def __init__(self, db):
+    def __init__(self, db, executor=None):
         self.db = db
+        self.executor = executor  # Optional thread pool for overlapping independent queries
         self.transactions = db.transactions
         self.accounts = db.accounts
         self.alerts = db.alerts
         self.banks = db.banks
         self.bank_countries = db.bank_countries  # New collection for bank country mappings
+        self.country_coordinates = db.country_coordinates  # REST Countries lookups shared across workers
         self.country_cache = {}  # Cache for country coordinates
         self._country_cache = {}  # Cache for country coordinates
         self._bank_country_cache = {}  # Cache for bank-to-country mapping
+    
+    def ensure_indexes(self):
+        """Create the indexes the API queries rely on"""
+        indexes = [
+            # Per-account recent transactions ($or + sort on timestamp)
+            (self.transactions, [('from_account', 1), ('timestamp', -1)]),
+            (self.transactions, [('to_account', 1), ('timestamp', -1)]),
+            # Pattern analysis focus-account filter
+            (self.transactions, [('sender_account', 1), ('timestamp', -1)]),
+            (self.transactions, [('receiver_account', 1), ('timestamp', -1)]),
+            # Risk-level counts/filters and date-range scans
+            (self.transactions, [('risk_score', -1)]),
+            (self.transactions, [('timestamp', -1)]),
+            # Date-range scans narrowed by a risk level (dashboard, map filters)
+            (self.transactions, [('timestamp', -1), ('risk_score', 1)]),
+            # Bank-to-bank flow grouping and lookups
+            (self.transactions, [('from_bank', 1), ('to_bank', 1)]),
+            # Alert list filters sorted by newest first
+            (self.alerts, [('status', 1), ('priority', 1), ('created_at', -1)]),
+            (self.alerts, [('type', 1), ('created_at', -1)]),
+            (self.alerts, [('created_at', -1)]),
+            # Alert statistics: resolved-today counts
+            (self.alerts, [('status', 1), ('updated_at', -1)]),
+        ]
         
-        # Country code mapping
-        self._country_code_mappings = {
-            'US': 'US', 'USA': 'US', 'UNITED STATES': 'US',
-            'UK': 'GB', 'UNITED KINGDOM': 'GB', 'BRITAIN': 'GB', 'ENGLAND': 'GB',
-            'CANADA': 'CA', 'CA': 'CA',
-            'GERMANY': 'DE', 'DE': 'DE', 'DEUTSCHLAND': 'DE',
-            'FRANCE': 'FR', 'FR': 'FR',
-            'SWITZERLAND': 'CH', 'CH': 'CH',
-            'SPAIN': 'ES', 'ES': 'ES',
-            'ITALY': 'IT', 'IT': 'IT',
-            'NETHERLANDS': 'NL', 'NL': 'NL',
-            'JAPAN': 'JP', 'JP': 'JP',
-            'CHINA': 'CN', 'CN': 'CN',
-            'INDIA': 'IN', 'IN': 'IN',
-            'AUSTRALIA': 'AU', 'AU': 'AU'
-        }
+        for collection, keys in indexes:
+            try:
+                collection.create_index(keys)
+            except Exception as e:
+                print(f"Error creating index {keys} on {collection.name}: {e}")
+        
+        # Expire stored country coordinates so they are eventually refetched
+        try:
+            self.country_coordinates.create_index('fetched_at', expireAfterSeconds=COUNTRY_COORDINATES_TTL)
+        except Exception as e:
+            print(f"Error creating TTL index on {self.country_coordinates.name}: {e}")
     
     def _cache_bank_country(self, bank_name, country_code):
         """Cache bank country mapping in memory"""
@@ -46,11 +136,58 @@ class DataProcessor:
         except Exception as e:
             print(f"Error caching bank country for {bank_name}: {e}")
     
-    def _fetch_country_coordinates(self, country_code):
+    def warm_country_coordinates(self, codes=None):
+        """Load stored coordinates for the given (default: mapped) country codes in one query.
+        
+        Returns True if the stored collection was checked for every uncached code.
+        """
+        try:
+            if codes is None:
+                codes = set(COUNTRY_CODE_MAPPINGS.values())
+            codes = [code for code in codes if code not in self._country_cache]
+            if not codes:
+                return True
+            for doc in self.country_coordinates.find({'_id': {'$in': codes}}):
+                self._country_cache[doc['_id']] = {
+                    'lat': doc['lat'], 'lng': doc['lng'], 'country': doc['country']
+                }
+            return True
+        except Exception as e:
+            print(f"Error loading country coordinates: {e}")
+            return False
+    
+    def prefetch_countries(self, codes):
+        """Resolve coordinates for all uncached country codes concurrently"""
+        stored_checked = self.warm_country_coordinates(codes)
+        missing = [code for code in set(codes) if code not in self._country_cache]
+        if not missing:
+            return
+        
+        # The bulk read above already found these codes missing from the stored
+        # collection; each API lookup blocks on its own HTTP round-trip, so overlap them
+        with ThreadPoolExecutor(max_workers=min(COUNTRY_FETCH_WORKERS, len(missing))) as executor:
+            list(executor.map(
+                lambda code: self._fetch_country_coordinates(code, check_stored=not stored_checked),
+                missing
+            ))
+    
+    def _fetch_country_coordinates(self, country_code, check_stored=True):
         """Fetch country coordinates using REST Countries API with caching"""
         if country_code in self._country_cache:
             return self._country_cache[country_code]
         
+        # Another worker (or an earlier run) may already have fetched it; skipped
+        # when the caller has just bulk-read the stored collection
+        if check_stored:
+            try:
+                doc = self.country_coordinates.find_one({'_id': country_code})
+                if doc:
+                    coordinates = {'lat': doc['lat'], 'lng': doc['lng'], 'country': doc['country']}
+                    self._country_cache[country_code] = coordinates
+                    return coordinates
+            except Exception as e:
+                print(f"Error reading stored coordinates for {country_code}: {e}")
+        
         try:
             # Use REST Countries API
             response = requests.get(
@@ -67,6 +204,11 @@ class DataProcessor:
                         'country': data[0].get('name', {}).get('common', country_code)
                     }
                     self._country_cache[country_code] = coordinates
+                    self.country_coordinates.update_one(
+                        {'_id': country_code},
+                        {'$set': {**coordinates, 'fetched_at': datetime.now()}},
+                        upsert=True
+                    )
                     return coordinates
         
         except Exception as e:
@@ -80,17 +222,18 @@ class DataProcessor:
         self._country_cache[country_code] = coordinates
         return coordinates
     
+    def _bank_country_code(self, bank_name):
+        """Get the country code from a bank location string"""
+        key = bank_name.upper().strip()
+        return COUNTRY_CODE_MAPPINGS.get(key, key if len(key) == 2 else 'Unknown')
+    
     def _get_bank_location(self, bank_name):
         """Get dynamic bank location based on bank location string"""
         if bank_name in self._bank_country_cache:
             return self._bank_country_cache[bank_name]
         
-        bank_name_upper = bank_name.upper().strip()
-        
         # Get country code from the location string
-        country_code = self._country_code_mappings.get(bank_name_upper, bank_name_upper)
-        if country_code == bank_name_upper and len(country_code) != 2:
-            country_code = 'Unknown'
+        country_code = self._bank_country_code(bank_name)
             
         # Get coordinates for the country
         coordinates = self._fetch_country_coordinates(country_code)
@@ -109,6 +252,17 @@ class DataProcessor:
         
         return location
     
+    def _submit(self, fn, *args):
+        """Run fn on the shared I/O pool when one was given, otherwise right away"""
+        if self.executor is not None:
+            return self.executor.submit(fn, *args)
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
     def get_dashboard_stats(self):
         """Get main dashboard statistics"""
         try:
@@ -116,48 +270,58 @@ class DataProcessor:
             today = datetime.now()
             last_30_days = today - timedelta(days=30)
             
-            # Count suspicious transactions
-            suspicious_count = self.transactions.count_documents({
-                'risk_score': {'$gte': 0.7},
-                'timestamp': {'$gte': last_30_days}
-            })
+            today_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
             
-            # Count monitored accounts
-            monitored_accounts = self.accounts.count_documents({
+            # Index-backed counts (risk_score, status/monitoring) run alongside the 30-day pass
+            monitored_future = self._submit(self.accounts.count_documents, {
                 'status': 'active',
                 'monitoring': True
             })
+            risk_futures = {
+                level: self._submit(self.transactions.count_documents, {'risk_score': score_range})
+                for level, score_range in (
+                    ('low', {'$lt': 0.3}),
+                    ('medium', {'$gte': 0.3, '$lt': 0.7}),
+                    ('high', {'$gte': 0.7})
+                )
+            }
             
-            # Calculate daily risk rate
-            today_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
-            today_transactions = self.transactions.count_documents({
-                'timestamp': {'$gte': today_start}
-            })
-            today_suspicious = self.transactions.count_documents({
-                'timestamp': {'$gte': today_start},
-                'risk_score': {'$gte': 0.7}
-            })
+            # Suspicious and today's counts plus the cash flow only look at the last 30 days
+            # (today is inside that window), so facet over one timestamp-indexed $match
+            pipeline = [{'$match': {'timestamp': {'$gte': last_30_days}}}, {
+                '$facet': {
+                    'suspicious': [{'$match': {'risk_score': {'$gte': 0.7}}}, {'$count': 'n'}],
+                    'today_total': [{'$match': {'timestamp': {'$gte': today_start}}}, {'$count': 'n'}],
+                    'today_suspicious': [
+                        {'$match': {'timestamp': {'$gte': today_start}, 'risk_score': {'$gte': 0.7}}},
+                        {'$count': 'n'}
+                    ],
+                    # Cash flow volume per currency
+                    'cash_flow': [{'$group': {
+                        '_id': '$receiving_currency',
+                        'total_volume': {'$sum': '$amount_received'}
+                    }}]
+                }
+            }]
             
-            daily_risk_rate = (today_suspicious / today_transactions * 100) if today_transactions > 0 else 0
+            facets = next(self.transactions.aggregate(pipeline), {})
+            cash_flow_data = facets.get('cash_flow', [])
+            counts = {name: result[0]['n'] if result else 0
+                      for name, result in facets.items() if name != 'cash_flow'}
+            suspicious_count = counts.get('suspicious', 0)
+            today_transactions = counts.get('today_total', 0)
+            today_suspicious = counts.get('today_suspicious', 0)
             
-            # Calculate cash flow volume
-            pipeline = [
-                {'$match': {'timestamp': {'$gte': last_30_days}}},
-                {'$group': {
-                    '_id': '$receiving_currency',
-                    'total_volume': {'$sum': '$amount_received'}
-                }}
-            ]
+            # Count monitored accounts
+            monitored_accounts = monitored_future.result()
+            
+            # Calculate daily risk rate
+            daily_risk_rate = (today_suspicious / today_transactions * 100) if today_transactions > 0 else 0
             
-            cash_flow_data = list(self.transactions.aggregate(pipeline))
             total_volume = sum([item['total_volume'] for item in cash_flow_data])
             
             # Risk distribution
-            risk_distribution = {
-                'low': self.transactions.count_documents({'risk_score': {'$lt': 0.3}}),
-                'medium': self.transactions.count_documents({'risk_score': {'$gte': 0.3, '$lt': 0.7}}),
-                'high': self.transactions.count_documents({'risk_score': {'$gte': 0.7}})
-            }
+            risk_distribution = {level: future.result() for level, future in risk_futures.items()}
             
             return {
                 'suspicious_transactions': suspicious_count,
@@ -170,140 +334,154 @@ class DataProcessor:
         
         except Exception as e:
             print(f"Error getting dashboard stats: {e}")
-            return {}
+            raise
+    
+    def _contains_regex(self, text):
+        """Case-insensitive substring match on user input, with regex metacharacters escaped"""
+        return {'$regex': re.escape(text), '$options': 'i'}
+    
+    def _build_transaction_query(self, filters):
+        """Build the MongoDB query for the transaction list filters"""
+        query = {}
+        
+        # Date range filter
+        if filters.get('date_range'):
+            days = int(filters['date_range'].replace('d', ''))
+            start_date = datetime.now() - timedelta(days=days)
+            query['timestamp'] = {'$gte': start_date}
+            logger.debug(f"Added date filter: from {start_date}")
+        elif filters.get('start_date') and filters.get('end_date'):
+            start_date = datetime.fromisoformat(filters['start_date'])
+            end_date = datetime.fromisoformat(filters['end_date'])
+            query['timestamp'] = {'$gte': start_date, '$lte': end_date}
+        
+        # Currency filter
+        if filters.get('currency') and filters['currency'] != 'all':
+            # Try both possible currency field names
+            query['$or'] = [
+                {'receiving_currency': filters['currency']},
+                {'currency_type': filters['currency']}
+            ]
+            logger.debug(f"Added currency filter: {filters['currency']}")
+        
+        # Account filter
+        if filters.get('account_filter'):
+            account_regex = self._contains_regex(filters['account_filter'])
+            query['$or'] = query.get('$or', []) + [
+                {'sender_account': account_regex},
+                {'receiver_account': account_regex}
+            ]
+            logger.debug(f"Added account filter: {filters['account_filter']}")
+        
+        # Search filter
+        if filters.get('search'):
+            search_regex = self._contains_regex(filters['search'])
+            query['$or'] = query.get('$or', []) + [
+                {'from_bank': search_regex},
+                {'to_bank': search_regex},
+                {'transaction_id': search_regex}
+            ]
+            logger.debug(f"Added search filter: {filters['search']}")
+        
+        # Risk level filter
+        if filters.get('risk_level'):
+            if filters['risk_level'] == 'low':
+                query['risk_score'] = {'$lt': 0.3}
+            elif filters['risk_level'] == 'medium':
+                query['risk_score'] = {'$gte': 0.3, '$lt': 0.7}
+            elif filters['risk_level'] == 'high':
+                query['risk_score'] = {'$gte': 0.7}
+        
+        return query
+    
+    # Fields the transaction list/detail views and exports read; skips upload bookkeeping
+    _TX_PROJECTION = {
+        '_id': 1, 'transaction_id': 1, 'timestamp': 1,
+        'from_bank': 1, 'from_account': 1, 'to_bank': 1, 'to_account': 1,
+        'sender_account': 1, 'receiver_account': 1,
+        'amount_received': 1, 'receiving_currency': 1, 'amount_paid': 1, 'payment_currency': 1,
+        'currency_type': 1, 'payment_format': 1, 'is_laundering': 1,
+        'risk_score': 1, 'status': 1, 'analyzed_at': 1,
+        'flagged': 1, 'flagged_at': 1, 'flag_reason': 1
+    }
+    
+    def _format_transaction(self, transaction):
+        """Convert ObjectId and timestamp to strings for JSON serialization"""
+        transaction['_id'] = str(transaction['_id'])
+        if 'timestamp' in transaction:
+            transaction['timestamp'] = transaction['timestamp'].isoformat()
+        return transaction
     
-    def get_transactions(self, filters):
-        """Get transactions with filters"""
+    def iter_transactions(self, filters, batch_size=500):
+        """Yield formatted transactions straight off the cursor for streaming responses.
+        
+        Cursor errors are logged and re-raised so a partial stream is never
+        mistaken for a complete result.
+        """
         try:
-            query = {}
-            
-            print(f"Getting transactions with filters: {filters}")
-            
-            # Date range filter
-            if filters.get('date_range'):
-                days = int(filters['date_range'].replace('d', ''))
-                start_date = datetime.now() - timedelta(days=days)
-                query['timestamp'] = {'$gte': start_date}
-                print(f"Added date filter: from {start_date}")
-            elif filters.get('start_date') and filters.get('end_date'):
-                start_date = datetime.fromisoformat(filters['start_date'])
-                end_date = datetime.fromisoformat(filters['end_date'])
-                query['timestamp'] = {'$gte': start_date, '$lte': end_date}
-            
-            # Currency filter
-            if filters.get('currency') and filters['currency'] != 'all':
-                # Try both possible currency field names
-                query['$or'] = [
-                    {'receiving_currency': filters['currency']},
-                    {'currency_type': filters['currency']}
-                ]
-                print(f"Added currency filter: {filters['currency']}")
-            
-            # Account filter
-            if filters.get('account_filter'):
-                query['$or'] = query.get('$or', []) + [
-                    {'sender_account': {'$regex': filters['account_filter'], '$options': 'i'}},
-                    {'receiver_account': {'$regex': filters['account_filter'], '$options': 'i'}}
-                ]
-                print(f"Added account filter: {filters['account_filter']}")
-            
-            # Search filter
-            if filters.get('search'):
-                search_regex = {'$regex': filters['search'], '$options': 'i'}
-                query['$or'] = query.get('$or', []) + [
-                    {'from_bank': search_regex},
-                    {'to_bank': search_regex},
-                    {'transaction_id': search_regex}
-                ]
-                print(f"Added search filter: {filters['search']}")
-            
-            # Risk level filter
-            if filters.get('risk_level'):
-                if filters['risk_level'] == 'low':
-                    query['risk_score'] = {'$lt': 0.3}
-                elif filters['risk_level'] == 'medium':
-                    query['risk_score'] = {'$gte': 0.3, '$lt': 0.7}
-                elif filters['risk_level'] == 'high':
-                    query['risk_score'] = {'$gte': 0.7}
-            
-            # Debug: Check total count
-            total_count = self.transactions.count_documents(query)
-            print(f"Query: {query}")
-            print(f"Found {total_count} matching transactions")
+            query = self._build_transaction_query(filters)
             
             # Pagination
             page = filters.get('page', 1)
             per_page = filters.get('per_page', 50)
             skip = (page - 1) * per_page
             
-            transactions = list(self.transactions.find(query).skip(skip).limit(per_page))
-            
-            # Convert ObjectId to string for JSON serialization
-            for transaction in transactions:
-                transaction['_id'] = str(transaction['_id'])
-                if 'timestamp' in transaction:
-                    transaction['timestamp'] = transaction['timestamp'].isoformat()
-            
-            print(f"Returning {len(transactions)} transactions")
-            return transactions
+            cursor = self.transactions.find(query, self._TX_PROJECTION).skip(skip).limit(per_page).batch_size(batch_size)
+            for transaction in cursor:
+                yield self._format_transaction(transaction)
         
         except Exception as e:
-            print(f"Error getting transactions: {e}")
-            return []
+            print(f"Error streaming transactions: {e}")
+            raise
     
-    def get_transactions_with_count(self, filters):
-        """Get transactions with total count for pagination"""
+    def get_transactions_with_count(self, filters, total_count=None, include_count=True):
+        """Get a page of transactions, by after_id cursor or page number, with an optional total count"""
         try:
             query = {}
             
-            print(f"Getting transactions with count for filters: {filters}")
-            
-            # First, let's see what fields exist in sample transaction
-            sample = self.transactions.find_one()
-            if sample:
-                print(f"Sample transaction fields: {list(sample.keys())}")
-            
-            # Get total count without filters first
-            total_all = self.transactions.count_documents({})
-            print(f"Total transactions in database: {total_all}")
+            logger.debug(f"Getting transactions with count for filters: {filters}")
             
             # Date range filter
             if filters.get('date_range'):
                 days = int(filters['date_range'].replace('d', ''))
                 start_date = datetime.now() - timedelta(days=days)
                 query['timestamp'] = {'$gte': start_date}
-                print(f"Added date filter: from {start_date}")
+                logger.debug(f"Added date filter: from {start_date}")
             
             # For now, let's start with no other filters to see if we get data
             
             # Get total count with current filters
-            total_count = self.transactions.count_documents(query)
-            print(f"Query: {query}")
-            print(f"Total matching transactions: {total_count}")
+            if total_count is None and include_count:
+                total_count = self.transactions.count_documents(query)
+            logger.debug(f"Query: {query}")
+            logger.debug(f"Total matching transactions: {total_count}")
             
-            # Pagination
+            # Pagination: seek past the cursor on _id when given, otherwise skip to the page
             page = filters.get('page', 1)
             per_page = filters.get('per_page', 50)
-            skip = (page - 1) * per_page
+            after_id = filters.get('after_id')
+            if after_id and ObjectId.is_valid(after_id):
+                query['_id'] = {'$lt': ObjectId(after_id)}
+                skip = 0
+            else:
+                skip = (page - 1) * per_page
             
-            transactions = list(self.transactions.find(query).skip(skip).limit(per_page))
+            # Convert ObjectId to string for JSON serialization as the page is read, in one batch
+            cursor = self.transactions.find(query, self._TX_PROJECTION).sort('_id', -1).skip(skip).limit(per_page)
+            transactions = [self._format_transaction(transaction) for transaction in cursor.batch_size(per_page)]
+            next_cursor = transactions[-1]['_id'] if len(transactions) == per_page else None
             
-            # Convert ObjectId to string for JSON serialization
-            for transaction in transactions:
-                transaction['_id'] = str(transaction['_id'])
-                if 'timestamp' in transaction:
-                    transaction['timestamp'] = transaction['timestamp'].isoformat()
-            
-            print(f"Returning {len(transactions)} transactions out of {total_count} total")
+            logger.debug(f"Returning {len(transactions)} transactions out of {total_count} total")
             
             return {
                 'transactions': transactions,
-                'total_count': total_count
+                'total_count': total_count,
+                'next_cursor': next_cursor
             }
         
         except Exception as e:
-            print(f"Error getting transactions with count: {e}")
-            return {'transactions': [], 'total_count': 0}
+            logger.error(f"Error getting transactions with count: {e}")
+            return {'transactions': [], 'total_count': 0, 'next_cursor': None}
     
     def get_transaction_by_id(self, transaction_id):
         """Get single transaction by ID"""
@@ -315,10 +493,10 @@ class DataProcessor:
             # Try to convert to ObjectId
             try:
                 object_id = ObjectId(transaction_id)
-                transaction = self.transactions.find_one({'_id': object_id})
+                transaction = self.transactions.find_one({'_id': object_id}, self._TX_PROJECTION)
             except:
                 # If ObjectId conversion fails, try as string
-                transaction = self.transactions.find_one({'_id': transaction_id})
+                transaction = self.transactions.find_one({'_id': transaction_id}, self._TX_PROJECTION)
             
             if transaction:
                 # Convert ObjectId to string for JSON serialization
@@ -385,8 +563,47 @@ class DataProcessor:
             print(f"Error flagging transaction: {e}")
             return False
     
-    def get_transactions_for_analysis(self, filters):
-        """Get transactions formatted for pattern analysis"""
+    # Pattern-analysis column names keyed by their stored field, with defaults for missing values
+    _ANALYSIS_COLUMNS = {
+        '_id': 'transaction_id',
+        'from_account': 'source',
+        'to_account': 'target',
+        'amount_received': 'amount',
+        'receiving_currency': 'currency',
+        'timestamp': 'timestamp',
+        'risk_score': 'risk_score',
+        'from_bank': 'from_bank',
+        'to_bank': 'to_bank',
+        'payment_format': 'payment_format',
+        'is_laundering': 'is_laundering'
+    }
+    _ANALYSIS_PROJECTION = dict.fromkeys(_ANALYSIS_COLUMNS, 1)
+    _ANALYSIS_DEFAULTS = {
+        'source': '', 'target': '', 'amount': 0.0, 'currency': 'USD', 'risk_score': 0.0,
+        'from_bank': '', 'to_bank': '', 'payment_format': '', 'is_laundering': 0
+    }
+    
+    def _analysis_frame(self, transactions):
+        """Build the pattern-analysis columns from raw documents in one vectorized pass"""
+        df = pd.DataFrame(transactions, columns=list(self._ANALYSIS_COLUMNS))
+        df = df.rename(columns=self._ANALYSIS_COLUMNS)
+        
+        df['transaction_id'] = df['transaction_id'].astype(str)
+        df = df.fillna(self._ANALYSIS_DEFAULTS)
+        df['amount'] = pd.to_numeric(df['amount'], errors='coerce').fillna(0.0).astype(float)
+        df['risk_score'] = pd.to_numeric(df['risk_score'], errors='coerce').fillna(0.0).astype(float)
+        df['is_laundering'] = pd.to_numeric(df['is_laundering'], errors='coerce').fillna(0).astype(int)
+        # Parse ISO strings (including a 'Z' suffix) into naive UTC datetimes; invalid
+        # timestamps become NaT and are dropped by the pattern analyzer, missing ones
+        # default to the current UTC time (not local wall-clock time tagged as UTC)
+        missing_timestamp = df['timestamp'].isna()
+        timestamps = pd.to_datetime(df['timestamp'], errors='coerce', utc=True, format='mixed')
+        df['timestamp'] = timestamps.mask(missing_timestamp, pd.Timestamp.now(tz='UTC')).dt.tz_localize(None)
+        
+        return df
+    
+    def get_transactions_for_analysis(self, filters, as_frame=False):
+        """Get transactions formatted for pattern analysis, as dicts or a columnar DataFrame"""
         try:
             query = {}
             
@@ -421,47 +638,104 @@ class DataProcessor:
             print(f"Analysis query: {query}")
             
             # Get transactions from database
-            transactions_cursor = self.transactions.find(query).limit(limit).sort('timestamp', -1)
+            transactions_cursor = (self.transactions.find(query, self._ANALYSIS_PROJECTION)
+                                   .sort('timestamp', -1).limit(limit).batch_size(ANALYSIS_FETCH_BATCH_SIZE))
             transactions = list(transactions_cursor)
             
             print(f"Found {len(transactions)} transactions for analysis")
             
-            # Transform data for pattern analyzer
-            formatted_transactions = []
+            frame = self._analysis_frame(transactions)
+            if as_frame:
+                return frame
             
-            for txn in transactions:
-                try:
-                    # Create standardized transaction format
-                    formatted_txn = {
-                        'transaction_id': str(txn.get('_id', '')),
-                        'source': txn.get('from_account', ''),
-                        'target': txn.get('to_account', ''),
-                        'amount': float(txn.get('amount_received', 0)),
-                        'currency': txn.get('receiving_currency', 'USD'),
-                        'timestamp': txn.get('timestamp', datetime.now()),
-                        'risk_score': float(txn.get('risk_score', 0)),
-                        'from_bank': txn.get('from_bank', ''),
-                        'to_bank': txn.get('to_bank', ''),
-                        'payment_format': txn.get('payment_format', ''),
-                        'is_laundering': txn.get('is_laundering', 0)
-                    }
-                    
-                    # Ensure timestamp is datetime object
-                    if isinstance(formatted_txn['timestamp'], str):
-                        formatted_txn['timestamp'] = datetime.fromisoformat(formatted_txn['timestamp'].replace('Z', '+00:00'))
-                    
-                    formatted_transactions.append(formatted_txn)
-                    
-                except Exception as e:
-                    print(f"Error formatting transaction {txn.get('_id', 'unknown')}: {e}")
-                    continue
+            # Same vectorized columns, handed to the pattern analyzer as records
+            formatted_transactions = frame.to_dict(orient='records')
             
             print(f"Successfully formatted {len(formatted_transactions)} transactions for analysis")
             return formatted_transactions
             
         except Exception as e:
             print(f"Error getting transactions for analysis: {e}")
-            return []
+            return pd.DataFrame(columns=list(self._ANALYSIS_DEFAULTS)) if as_frame else []
+    
+    # Filter-independent stages of the cash-flow overview pipelines; only $match varies per call
+    _BASIC_STATS_STAGES = (
+        {
+            '$group': {
+                '_id': None,
+                'total_transactions': {'$sum': 1},
+                'total_amount': {'$sum': '$amount_received'},
+                'avg_amount': {'$avg': '$amount_received'},
+                'max_amount': {'$max': '$amount_received'},
+                'min_amount': {'$min': '$amount_received'},
+                'avg_risk_score': {'$avg': '$risk_score'},
+                'high_risk_count': {
+                    '$sum': {
+                        '$cond': [{'$gte': ['$risk_score', 0.7]}, 1, 0]
+                    }
+                }
+            }
+        },
+    )
+    
+    _CURRENCY_BREAKDOWN_STAGES = (
+        {
+            '$group': {
+                '_id': {'$ifNull': ['$currency_type', '$receiving_currency']},
+                'amount': {'$sum': '$amount_received'},
+                'count': {'$sum': 1}
+            }
+        },
+        {'$sort': {'amount': -1}}
+    )
+    
+    _TRENDS_STAGES = (
+        {
+            '$group': {
+                '_id': {
+                    '$dateToString': {
+                        'format': '%Y-%m-%d',
+                        'date': '$timestamp'
+                    }
+                },
+                'amount': {'$sum': '$amount_received'},
+                'count': {'$sum': 1}
+            }
+        },
+        {'$sort': {'_id': 1}}
+    )
+    
+    # Bucketed by lower boundary; unscored transactions count as low
+    _RISK_ANALYSIS_STAGES = (
+        {
+            '$bucket': {
+                'groupBy': '$risk_score',
+                'boundaries': [float('-inf'), 0.4, 0.7, float('inf')],
+                'default': 'low',
+                'output': {
+                    'count': {'$sum': 1},
+                    'amount': {'$sum': '$amount_received'}
+                }
+            }
+        },
+    )
+    
+    _RISK_ANALYSIS_LEVELS = {float('-inf'): 'low', 0.4: 'medium', 0.7: 'high', 'low': 'low'}
+    
+    _TOP_FLOWS_STAGES = (
+        {
+            '$group': {
+                '_id': {
+                    'from_bank': '$from_bank',
+                    'to_bank': '$to_bank'
+                },
+                'total_amount': {'$sum': '$amount_received'},
+                'count': {'$sum': 1},
+                'avg_risk': {'$avg': '$risk_score'}
+            }
+        },
+        {'$sort': {'total_amount': -1}}
+    )
     
     def get_cash_flow_overview(self, currency='all', date_range='30d'):
         """Get cash flow overview statistics with detailed breakdown"""
@@ -478,20 +752,24 @@ class DataProcessor:
             
             print(f"Getting cash flow overview with filters: currency={currency}, date_range={date_range}")
             
+            # All five breakdowns share the $match, so run them as facets of one pass
+            pipeline = [{'$match': match_conditions}, {'$facet': self._overview_facets()}]
+            facets = next(self.transactions.aggregate(pipeline), {})
+            
             # Get basic statistics
-            basic_stats = self._get_basic_stats(match_conditions)
+            basic_stats = self._format_basic_stats(facets.get('basic', []))
             
             # Get currency breakdown
-            currency_breakdown = self._get_currency_breakdown(match_conditions)
+            currency_breakdown = self._format_currency_breakdown(facets.get('currency', []))
             
             # Get trends data
-            trends = self._get_trends_data(match_conditions, days)
+            trends = self._format_trends_data(facets.get('trends', []))
             
             # Get risk analysis
-            risk_analysis = self._get_risk_analysis(match_conditions)
+            risk_analysis = self._format_risk_analysis(facets.get('risk', []))
             
             # Get top flows
-            top_flows = self._get_top_flows(match_conditions)
+            top_flows = self._format_top_flows(facets.get('top_flows', []))
             
             return {
                 **basic_stats,
@@ -503,35 +781,23 @@ class DataProcessor:
                 
         except Exception as e:
             print(f"Error getting cash flow overview: {e}")
-            return {}
+            raise
     
-    def _get_basic_stats(self, match_conditions):
+    def _overview_facets(self, top_flows_limit=5):
+        """Build the $facet sub-pipelines for the cash-flow overview"""
+        return {
+            'basic': list(self._BASIC_STATS_STAGES),
+            'currency': list(self._CURRENCY_BREAKDOWN_STAGES),
+            'trends': list(self._TRENDS_STAGES),
+            'risk': list(self._RISK_ANALYSIS_STAGES),
+            'top_flows': [*self._TOP_FLOWS_STAGES, {'$limit': top_flows_limit}]
+        }
+    
+    def _format_basic_stats(self, results):
         """Get basic transaction statistics"""
         try:
-            pipeline = [
-                {'$match': match_conditions},
-                {
-                    '$group': {
-                        '_id': None,
-                        'total_transactions': {'$sum': 1},
-                        'total_amount': {'$sum': '$amount_received'},
-                        'avg_amount': {'$avg': '$amount_received'},
-                        'max_amount': {'$max': '$amount_received'},
-                        'min_amount': {'$min': '$amount_received'},
-                        'avg_risk_score': {'$avg': '$risk_score'},
-                        'high_risk_count': {
-                            '$sum': {
-                                '$cond': [{'$gte': ['$risk_score', 0.7]}, 1, 0]
-                            }
-                        }
-                    }
-                }
-            ]
-            
-            results = list(self.transactions.aggregate(pipeline))
-            
             if results:
-                stats = results[0]
+                stats = dict(results[0])
                 del stats['_id']
                 return stats
             else:
@@ -548,23 +814,9 @@ class DataProcessor:
             print(f"Error getting basic stats: {e}")
             return {}
     
-    def _get_currency_breakdown(self, match_conditions):
+    def _format_currency_breakdown(self, results):
         """Get currency breakdown for pie chart"""
         try:
-            pipeline = [
-                {'$match': match_conditions},
-                {
-                    '$group': {
-                        '_id': {'$ifNull': ['$currency_type', '$receiving_currency']},
-                        'amount': {'$sum': '$amount_received'},
-                        'count': {'$sum': 1}
-                    }
-                },
-                {'$sort': {'amount': -1}}
-            ]
-            
-            results = list(self.transactions.aggregate(pipeline))
-            
             return [{
                 'currency': result['_id'] or 'Unknown',
                 'amount': result['amount'],
@@ -575,28 +827,9 @@ class DataProcessor:
             print(f"Error getting currency breakdown: {e}")
             return []
     
-    def _get_trends_data(self, match_conditions, days):
+    def _format_trends_data(self, results):
         """Get trends data for line chart"""
         try:
-            pipeline = [
-                {'$match': match_conditions},
-                {
-                    '$group': {
-                        '_id': {
-                            '$dateToString': {
-                                'format': '%Y-%m-%d',
-                                'date': '$timestamp'
-                            }
-                        },
-                        'amount': {'$sum': '$amount_received'},
-                        'count': {'$sum': 1}
-                    }
-                },
-                {'$sort': {'_id': 1}}
-            ]
-            
-            results = list(self.transactions.aggregate(pipeline))
-            
             return [{
                 'date': result['_id'],
                 'amount': result['amount'],
@@ -607,35 +840,19 @@ class DataProcessor:
             print(f"Error getting trends data: {e}")
             return []
     
-    def _get_risk_analysis(self, match_conditions):
+    def _format_risk_analysis(self, results):
         """Get risk analysis breakdown"""
         try:
-            pipeline = [
-                {'$match': match_conditions},
-                {
-                    '$group': {
-                        '_id': {
-                            '$switch': {
-                                'branches': [
-                                    {'case': {'$gte': ['$risk_score', 0.7]}, 'then': 'high'},
-                                    {'case': {'$gte': ['$risk_score', 0.4]}, 'then': 'medium'}
-                                ],
-                                'default': 'low'
-                            }
-                        },
-                        'count': {'$sum': 1},
-                        'amount': {'$sum': '$amount_received'}
-                    }
-                }
-            ]
-            
-            results = list(self.transactions.aggregate(pipeline))
-            
             risk_data = {'low': 0, 'medium': 0, 'high': 0}
             for result in results:
-                risk_data[result['_id']] = {
-                    'count': result['count'],
-                    'amount': result['amount']
+                level = self._RISK_ANALYSIS_LEVELS.get(result['_id'])
+                if level is None:
+                    continue
+                # The -inf bucket and unscored default both land in 'low'
+                previous = risk_data[level] or {'count': 0, 'amount': 0}
+                risk_data[level] = {
+                    'count': previous['count'] + result['count'],
+                    'amount': previous['amount'] + result['amount']
                 }
             
             return risk_data
@@ -644,28 +861,9 @@ class DataProcessor:
             print(f"Error getting risk analysis: {e}")
             return {}
     
-    def _get_top_flows(self, match_conditions, limit=5):
+    def _format_top_flows(self, results):
         """Get top cash flows"""
         try:
-            pipeline = [
-                {'$match': match_conditions},
-                {
-                    '$group': {
-                        '_id': {
-                            'from_bank': '$from_bank',
-                            'to_bank': '$to_bank'
-                        },
-                        'total_amount': {'$sum': '$amount_received'},
-                        'count': {'$sum': 1},
-                        'avg_risk': {'$avg': '$risk_score'}
-                    }
-                },
-                {'$sort': {'total_amount': -1}},
-                {'$limit': limit}
-            ]
-            
-            results = list(self.transactions.aggregate(pipeline))
-            
             return [{
                 'from_bank': result['_id']['from_bank'],
                 'to_bank': result['_id']['to_bank'],
@@ -678,6 +876,27 @@ class DataProcessor:
             print(f"Error getting top flows: {e}")
             return []
     
+    # Bank-pair aggregation for the map; only $match varies per call
+    _GEOGRAPHIC_FLOW_GROUP = {
+        '$group': {
+            '_id': {
+                'from_bank': '$from_bank',
+                'to_bank': '$to_bank'
+            },
+            'total_amount': {'$sum': '$amount_received'},
+            'transaction_count': {'$sum': 1},
+            'avg_risk_score': {'$avg': '$risk_score'},
+            'max_risk_score': {'$max': '$risk_score'}
+        }
+    }
+    
+    # risk_level filter values shared by the map and account search
+    _RISK_SCORE_RANGES = {
+        'high': {'$gte': 0.7},
+        'medium': {'$gte': 0.4, '$lt': 0.7},
+        'low': {'$lt': 0.4}
+    }
+    
     def get_geographic_flow_data(self, currency='USD', time_period='30d', min_amount=0, risk_level='all'):
         """Get geographic cash flow data for map visualization with enhanced filtering"""
         try:
@@ -706,13 +925,8 @@ class DataProcessor:
                 print(f"Added minimum amount filter: {min_amount}")
             
             # Add risk level filter
-            if risk_level != 'all':
-                if risk_level == 'high':
-                    match_conditions['risk_score'] = {'$gte': 0.7}
-                elif risk_level == 'medium':
-                    match_conditions['risk_score'] = {'$gte': 0.4, '$lt': 0.7}
-                elif risk_level == 'low':
-                    match_conditions['risk_score'] = {'$lt': 0.4}
+            if risk_level in self._RISK_SCORE_RANGES:
+                match_conditions['risk_score'] = self._RISK_SCORE_RANGES[risk_level]
                 print(f"Added risk level filter: {risk_level}")
             
             # Handle currency filter
@@ -724,21 +938,7 @@ class DataProcessor:
             print(f"Match conditions: {match_conditions}")
             
             # Aggregate transactions by country pairs
-            pipeline = [
-                {'$match': match_conditions},
-                {
-                    '$group': {
-                        '_id': {
-                            'from_bank': '$from_bank',
-                            'to_bank': '$to_bank'
-                        },
-                        'total_amount': {'$sum': '$amount_received'},
-                        'transaction_count': {'$sum': 1},
-                        'avg_risk_score': {'$avg': '$risk_score'},
-                        'max_risk_score': {'$max': '$risk_score'}
-                    }
-                }
-            ]
+            pipeline = [{'$match': match_conditions}, self._GEOGRAPHIC_FLOW_GROUP]
             
             flows_data = list(self.transactions.aggregate(pipeline))
             print(f"Found {len(flows_data)} flow aggregations")
@@ -747,6 +947,14 @@ class DataProcessor:
             if flows_data:
                 print(f"Sample flow data: {flows_data[0]}")
             
+            # Resolve every new country up front instead of one request per flow
+            self.prefetch_countries({
+                self._bank_country_code(bank)
+                for flow in flows_data
+                for bank in (flow['_id']['from_bank'], flow['_id']['to_bank'])
+                if bank not in self._bank_country_cache
+            })
+            
             # Group by countries
             country_volumes = {}
             country_flows = []
@@ -870,16 +1078,8 @@ class DataProcessor:
             print(f"Error getting geographic flow data: {e}")
             import traceback
             traceback.print_exc()
-            # Return empty data structure on error - no hardcoded fallback
-            return {
-                'nodes': [],
-                'flows': [],
-                'currency': currency if 'currency' in locals() else 'USD',
-                'time_period': time_period if 'time_period' in locals() else '30d',
-                'total_volume': 0,
-                'total_flows': 0,
-                'error': str(e)
-            }
+            # Let the view answer with an (uncached) 500 instead of an empty map
+            raise
     
     def get_multi_currency_flow(self, account_id=None):
         """Get multi-currency cash flow data"""
@@ -920,22 +1120,49 @@ class DataProcessor:
         
         except Exception as e:
             print(f"Error getting multi-currency flow: {e}")
-            return {}
+            raise
     
-    def get_alerts(self, status='active', priority=None):
+    def build_alert_query(self, status=None, priority=None, alert_type=None, search=None, date=None):
+        """Build the MongoDB query for the alert list filters"""
+        query = {}
+        if status and status != 'all':
+            query['status'] = status
+        if priority and priority != 'all':
+            query['priority'] = priority
+        if alert_type and alert_type != 'all':
+            query['type'] = alert_type
+        
+        if search:
+            # Substring match (partial account ids and words), with metacharacters escaped;
+            # $text would only match whole words/stems
+            pattern = {'$regex': re.escape(search), '$options': 'i'}
+            query['$or'] = [
+                {'description': pattern},
+                {'title': pattern},
+                {'account_id': pattern},
+                {'type': pattern}
+            ]
+        
+        if date:
+            try:
+                year, month, day = DATE_FILTER_RE.fullmatch(date).groups()
+                filter_date = datetime(int(year), int(month), int(day))
+                query['created_at'] = {'$gte': filter_date, '$lt': filter_date + timedelta(days=1)}
+            except (AttributeError, ValueError, TypeError):
+                pass  # Invalid date format, skip filtering
+        
+        return query
+    
+    def get_alerts(self, status='active', priority=None, alert_type=None, search=None, date=None,
+                   offset=0, limit=100):
         """Get alerts with filters based on real analysis"""
         try:
             # Always ensure we have up-to-date alerts based on latest analysis
             self.update_alerts_from_analysis()
             
-            # Build query for filtering
-            query = {}
-            if status and status != 'all':
-                query['status'] = status
-            if priority and priority != 'all':
-                query['priority'] = priority
+            query = self.build_alert_query(status, priority, alert_type, search, date)
             
-            alerts = list(self.alerts.find(query).sort('created_at', -1).limit(100))
+            alerts = list(self.alerts.find(query).sort('created_at', -1).skip(offset).limit(limit))
             
             # Convert ObjectId and datetime to strings
             for alert in alerts:
@@ -951,6 +1178,47 @@ class DataProcessor:
             print(f"Error getting alerts: {e}")
             return []
     
+    def get_alerts_page(self, status=None, priority=None, alert_type=None, search=None, date=None,
+                        offset=0, limit=20):
+        """Get one page of filtered alerts and the total match count in a single round-trip"""
+        try:
+            # Always ensure we have up-to-date alerts based on latest analysis
+            self.update_alerts_from_analysis()
+            
+            query = self.build_alert_query(status, priority, alert_type, search, date)
+            
+            pipeline = [
+                {'$match': query},
+                {'$facet': {
+                    'alerts': [
+                        {'$sort': {'created_at': -1}},
+                        {'$skip': max(offset, 0)},
+                        {'$limit': max(limit, 1)}
+                    ],
+                    'total': [{'$count': 'count'}]
+                }}
+            ]
+            
+            result = next(self.alerts.aggregate(pipeline), {'alerts': [], 'total': []})
+            alerts = result['alerts']
+            
+            # Convert ObjectId and datetime to strings
+            for alert in alerts:
+                alert['_id'] = str(alert['_id'])
+                if 'created_at' in alert:
+                    alert['created_at'] = alert['created_at'].isoformat()
+                if 'updated_at' in alert:
+                    alert['updated_at'] = alert['updated_at'].isoformat()
+            
+            return {
+                'alerts': alerts,
+                'total': result['total'][0]['count'] if result['total'] else 0
+            }
+        
+        except Exception as e:
+            print(f"Error getting alerts page: {e}")
+            return {'alerts': [], 'total': 0}
+    
     def get_alert_by_id(self, alert_id):
         """Get a single alert by ID"""
         try:
@@ -993,8 +1261,8 @@ class DataProcessor:
                     # Get country information from bank location
                     from_bank = transaction.get('from_bank', '').strip().upper()
                     to_bank = transaction.get('to_bank', '').strip().upper()
-                    from_country = self._country_code_mappings.get(from_bank, 'Unknown')
-                    to_country = self._country_code_mappings.get(to_bank, 'Unknown')
+                    from_country = COUNTRY_CODE_MAPPINGS.get(from_bank, 'Unknown')
+                    to_country = COUNTRY_CODE_MAPPINGS.get(to_bank, 'Unknown')
                     
                     # Determine priority based on risk score and amount
                     if transaction['risk_score'] >= 0.9 or transaction.get('amount_received', 0) >= 500000:
@@ -1090,7 +1358,7 @@ class DataProcessor:
                     countries = []
                     for bank in account_data['banks']:
                         bank_upper = bank.strip().upper() if bank else ''
-                        country = self._country_code_mappings.get(bank_upper, 'Unknown')
+                        country = COUNTRY_CODE_MAPPINGS.get(bank_upper, 'Unknown')
                         if country != 'Unknown':
                             countries.append(country)
                     
@@ -1356,34 +1624,42 @@ class DataProcessor:
             today = datetime.now()
             today_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
             
-            # Count active alerts
-            active_alerts = self.alerts.count_documents({'status': 'active'})
-            
-            # Count high priority alerts
-            high_priority = self.alerts.count_documents({
-                'status': 'active',
-                'priority': 'high'
-            })
-            
-            # Count resolved today
-            resolved_today = self.alerts.count_documents({
-                'status': 'resolved',
-                'updated_at': {'$gte': today_start}
-            })
-            
-            # Calculate average response time (simplified)
-            resolved_alerts = list(self.alerts.find({
-                'status': 'resolved',
-                'resolved_at': {'$exists': True}
-            }).limit(100))
-            
-            response_times = []
-            for alert in resolved_alerts:
-                if 'resolved_at' in alert and 'created_at' in alert:
-                    response_time = (alert['resolved_at'] - alert['created_at']).total_seconds() / 3600  # hours
-                    response_times.append(response_time)
+            # Active, high-priority and resolved-today counts in one round trip; the leading
+            # $match only admits active alerts and today's resolutions, both served by the
+            # (status, updated_at) index, so historical resolved alerts are never streamed
+            pipeline = [{'$match': {'$or': [
+                {'status': 'active'},
+                {'status': 'resolved', 'updated_at': {'$gte': today_start}}
+            ]}}, {
+                '$facet': {
+                    'active_alerts': [{'$match': {'status': 'active'}}, {'$count': 'n'}],
+                    'high_priority': [{'$match': {'status': 'active', 'priority': 'high'}}, {'$count': 'n'}],
+                    'resolved_today': [
+                        {'$match': {'status': 'resolved', 'updated_at': {'$gte': today_start}}},
+                        {'$count': 'n'}
+                    ]
+                }
+            }]
+            
+            # Average response time (simplified) over up to 100 resolved alerts, in hours; these
+            # may predate today, so it runs as its own limited pipeline alongside the counts.
+            # Alerts without created_at subtract to null and are skipped by $avg
+            response_time_future = self._submit(lambda: list(self.alerts.aggregate([
+                {'$match': {'status': 'resolved', 'resolved_at': {'$exists': True}}},
+                {'$limit': 100},
+                {'$group': {
+                    '_id': None,
+                    'n': {'$avg': {'$divide': [{'$subtract': ['$resolved_at', '$created_at']}, 3600000]}}
+                }}
+            ])))
             
-            avg_response_time = sum(response_times) / len(response_times) if response_times else 0
+            facets = next(self.alerts.aggregate(pipeline), {})
+            facets['avg_response_time'] = response_time_future.result()
+            values = {name: result[0]['n'] if result else 0 for name, result in facets.items()}
+            active_alerts = values.get('active_alerts', 0)
+            high_priority = values.get('high_priority', 0)
+            resolved_today = values.get('resolved_today', 0)
+            avg_response_time = values.get('avg_response_time') or 0
             
             return {
                 'active_alerts': active_alerts,
@@ -1505,133 +1781,235 @@ class DataProcessor:
         try:
             # Read file based on extension
             if filepath.endswith('.csv'):
-                try:
-                    df = pd.read_csv(filepath, encoding='utf-8')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(filepath, encoding='latin-1')
+                chunks = self._read_csv_chunks(filepath)
             elif filepath.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(filepath)
+                chunks = self._read_excel_chunks(filepath)
             else:
                 return {
                     'success': False,
                     'error': 'Unsupported file format. Please upload CSV, XLSX, or XLS files.'
                 }
             
-            # Check if dataframe is empty
-            if df.empty:
+            return self._process_upload_chunks(chunks)
+        
+        except Exception as e:
+            print(f"Error processing file: {e}")
+            return {
+                'success': False,
+                'error': f'File processing failed: {str(e)}',
+                'details': []
+            }
+    
+    def process_uploaded_stream(self, stream, filename):
+        """Process an uploaded transaction file straight from its request stream"""
+        try:
+            filename = filename.lower()
+            if filename.endswith('.csv'):
+                chunks = self._read_csv_chunks(stream)
+            elif filename.endswith(('.xlsx', '.xls')):
+                # Excel readers need a seekable buffer
+                chunks = self._read_excel_chunks(io.BytesIO(stream.read()))
+            else:
                 return {
                     'success': False,
-                    'error': 'The uploaded file is empty or contains no data.'
+                    'error': 'Unsupported file format. Please upload CSV, XLSX, or XLS files.'
                 }
             
-            print(f"Loaded file with {len(df)} rows and columns: {list(df.columns)}")
-            
-            # Define required columns with flexible matching (supporting both old and new formats)
-            # Note: amount_paid is optional for new format as it uses single Amount column
-            required_columns_map = {
-                'timestamp': ['Timestamp', 'Date', 'Transaction Date', 'Time', 'DateTime'],
-                'from_bank': ['From Bank', 'Sender Bank', 'Source Bank', 'Originating Bank', 'Sender_bank_location'],
-                'from_account': ['From Account', 'Sender Account', 'Source Account', 'From Acc', 'Sender_account'],
-                'to_bank': ['To Bank', 'Receiver Bank', 'Destination Bank', 'Receiving Bank', 'Receiver_bank_location'],
-                'to_account': ['To Account', 'Receiver Account', 'Destination Account', 'To Acc', 'Receiver_account'],
-                'amount_received': ['Amount Received', 'Amount', 'Transaction Amount', 'Received Amount'],
-                'receiving_currency': ['Receiving Currency', 'Currency', 'Curr', 'CCY', 'Received_currency'],
-                'payment_currency': ['Payment Currency', 'Pay Currency', 'Send Currency', 'Payment_currency'],
-                'payment_format': ['Payment Format', 'Payment Type', 'Transaction Type', 'Method', 'Payment_type']
-            }
-            
-            # Optional columns (not required for new format)
-            optional_columns_map = {
-                'amount_paid': ['Amount Paid', 'Paid Amount', 'Amount Sent', 'Send Amount']
+            return self._process_upload_chunks(chunks)
+        
+        except Exception as e:
+            print(f"Error processing upload stream: {e}")
+            return {
+                'success': False,
+                'error': f'File processing failed: {str(e)}',
+                'details': []
             }
-            
-            # Map required columns
-            column_mapping = {}
-            missing_fields = []
-            
-            for field, possible_names in required_columns_map.items():
-                found = False
-                for col_name in df.columns:
-                    if col_name in possible_names:
-                        column_mapping[field] = col_name
-                        found = True
-                        break
-                
-                if not found:
-                    # Try case-insensitive partial matching
-                    for col_name in df.columns:
-                        for possible in possible_names:
-                            if possible.lower() in col_name.lower() or col_name.lower() in possible.lower():
-                                column_mapping[field] = col_name
-                                found = True
-                                break
-                        if found:
+    
+    def _csv_encoding(self, source):
+        """utf-8 if the whole upload decodes as UTF-8, otherwise latin-1; rewinds stream sources"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        handle = open(source, 'rb') if isinstance(source, str) else source
+        try:
+            while True:
+                block = handle.read(CSV_ENCODING_CHECK_BLOCK)
+                if not block:
+                    decoder.decode(b'', final=True)
+                    return 'utf-8'
+                decoder.decode(block)
+        except UnicodeDecodeError:
+            return 'latin-1'
+        finally:
+            if handle is source:
+                source.seek(0)
+            else:
+                handle.close()
+    
+    def _read_csv_chunks(self, source):
+        """Read a CSV upload in fixed-size chunks, falling back to latin-1"""
+        if isinstance(source, tempfile.SpooledTemporaryFile):
+            source = io.BufferedReader(_SpooledUploadReader(source))
+        if not isinstance(source, str) and not source.seekable():
+            source = io.BytesIO(source.read())
+        
+        # Settle the encoding for the whole file before the first chunk is inserted;
+        # a late non-UTF-8 byte must not fail the upload after earlier chunks were written
+        encoding = self._csv_encoding(source)
+        yield from pd.read_csv(source, encoding=encoding, chunksize=UPLOAD_BATCH_SIZE)
+    
+    def _read_excel_chunks(self, source):
+        """Read an Excel upload and hand it out in fixed-size chunks"""
+        df = pd.read_excel(source)
+        for start in range(0, max(len(df), 1), UPLOAD_BATCH_SIZE):
+            yield df.iloc[start:start + UPLOAD_BATCH_SIZE]
+    
+    def _map_upload_columns(self, columns):
+        """Match uploaded column names to transaction fields"""
+        # Define required columns with flexible matching (supporting both old and new formats)
+        # Note: amount_paid is optional for new format as it uses single Amount column
+        required_columns_map = {
+            'timestamp': ['Timestamp', 'Date', 'Transaction Date', 'Time', 'DateTime'],
+            'from_bank': ['From Bank', 'Sender Bank', 'Source Bank', 'Originating Bank', 'Sender_bank_location'],
+            'from_account': ['From Account', 'Sender Account', 'Source Account', 'From Acc', 'Sender_account'],
+            'to_bank': ['To Bank', 'Receiver Bank', 'Destination Bank', 'Receiving Bank', 'Receiver_bank_location'],
+            'to_account': ['To Account', 'Receiver Account', 'Destination Account', 'To Acc', 'Receiver_account'],
+            'amount_received': ['Amount Received', 'Amount', 'Transaction Amount', 'Received Amount'],
+            'receiving_currency': ['Receiving Currency', 'Currency', 'Curr', 'CCY', 'Received_currency'],
+            'payment_currency': ['Payment Currency', 'Pay Currency', 'Send Currency', 'Payment_currency'],
+            'payment_format': ['Payment Format', 'Payment Type', 'Transaction Type', 'Method', 'Payment_type']
+        }
+        
+        # Optional columns (not required for new format)
+        optional_columns_map = {
+            'amount_paid': ['Amount Paid', 'Paid Amount', 'Amount Sent', 'Send Amount']
+        }
+        
+        # Map required columns
+        column_mapping = {}
+        missing_fields = []
+        
+        for field, possible_names in required_columns_map.items():
+            found = False
+            for col_name in columns:
+                if col_name in possible_names:
+                    column_mapping[field] = col_name
+                    found = True
+                    break
+            
+            if not found:
+                # Try case-insensitive partial matching
+                for col_name in columns:
+                    for possible in possible_names:
+                        if possible.lower() in col_name.lower() or col_name.lower() in possible.lower():
+                            column_mapping[field] = col_name
+                            found = True
                             break
-                
-                if not found:
-                    missing_fields.append(field)
-
-            # Map optional columns
-            for field, possible_names in optional_columns_map.items():
-                found = False
-                for col_name in df.columns:
-                    if col_name in possible_names:
-                        column_mapping[field] = col_name
-                        found = True
+                    if found:
                         break
-                
-                if not found:
-                    # Try case-insensitive partial matching
-                    for col_name in df.columns:
-                        for possible in possible_names:
-                            if possible.lower() in col_name.lower() or col_name.lower() in possible.lower():
-                                column_mapping[field] = col_name
-                                found = True
-                                break
-                        if found:
-                            break
             
-            if missing_fields:
-                return {
-                    'success': False,
-                    'error': f'Missing required columns for fields: {missing_fields}',
-                    'details': f'Available columns: {list(df.columns)}',
-                    'required_fields': required_columns_map
-                }
-            
-            print(f"Column mapping: {column_mapping}")
-            
-            # Process and validate data
-            transaction_ids = []
-            processed_records = 0
-            errors = []
-            total_volume = 0
-            currencies_found = set()
-            risk_scores = []
+            if not found:
+                missing_fields.append(field)
+
+        # Map optional columns
+        for field, possible_names in optional_columns_map.items():
+            found = False
+            for col_name in columns:
+                if col_name in possible_names:
+                    column_mapping[field] = col_name
+                    found = True
+                    break
+            
+            if not found:
+                # Try case-insensitive partial matching
+                for col_name in columns:
+                    for possible in possible_names:
+                        if possible.lower() in col_name.lower() or col_name.lower() in possible.lower():
+                            column_mapping[field] = col_name
+                            found = True
+                            break
+                    if found:
+                        break
+        
+        return column_mapping, missing_fields, required_columns_map
+    
+    def _parse_upload_timestamps(self, chunk, column_mapping):
+        """Parse a chunk's timestamps in one pass, returning (timestamps, invalid mask)"""
+        # Check if we have separate Date and Time columns
+        if 'Date' in chunk.columns and 'Time' in chunk.columns:
+            raw = chunk['Date'].astype(str).str.strip() + ' ' + chunk['Time'].astype(str).str.strip()
+        else:
+            raw = chunk[column_mapping['timestamp']]
+        
+        timestamps = pd.to_datetime(raw, errors='coerce')
+        
+        # Rows that don't follow the inferred format are retried individually
+        retry = timestamps.isna() & raw.notna()
+        if retry.any():
+            timestamps[retry] = pd.to_datetime(raw[retry], errors='coerce', format='mixed')
+        
+        invalid = timestamps.isna() & raw.notna()
+        return timestamps, invalid
+    
+    def _insert_transaction_batch(self, documents):
+        """Insert a batch of transactions, returning {batch index: error} for failed rows"""
+        if not documents:
+            return {}
+        try:
+            self.transactions.insert_many(documents, ordered=False)
+            return {}
+        except BulkWriteError as e:
+            return {err['index']: err.get('errmsg', 'Insert failed')
+                    for err in e.details.get('writeErrors', [])}
+    
+    def _process_upload_chunks(self, chunks):
+        """Validate, score and bulk-insert uploaded transaction chunks"""
+        first_chunk = next(chunks, None)
+        
+        # Check if dataframe is empty
+        if first_chunk is None or first_chunk.empty:
+            return {
+                'success': False,
+                'error': 'The uploaded file is empty or contains no data.'
+            }
+        
+        print(f"Loaded file with columns: {list(first_chunk.columns)}")
+        
+        column_mapping, missing_fields, required_columns_map = self._map_upload_columns(first_chunk.columns)
+        
+        if missing_fields:
+            return {
+                'success': False,
+                'error': f'Missing required columns for fields: {missing_fields}',
+                'details': f'Available columns: {list(first_chunk.columns)}',
+                'required_fields': required_columns_map
+            }
+        
+        print(f"Column mapping: {column_mapping}")
+        
+        # Process and validate data
+        transaction_ids = []
+        processed_records = 0
+        errors = []
+        total_volume = 0
+        currencies_found = set()
+        risk_scores = []
+        
+        for chunk in chain([first_chunk], chunks):
+            timestamps, invalid_timestamps = self._parse_upload_timestamps(chunk, column_mapping)
+            documents = []
+            row_stats = []
             
-            for index, row in df.iterrows():
+            for index, row in chunk.iterrows():
                 try:
-                    # Parse timestamp - handle both single timestamp and separate Date/Time columns
-                    try:
-                        # Check if we have separate Date and Time columns
-                        if 'Date' in df.columns and 'Time' in df.columns:
-                            date_str = str(row['Date']).strip()
-                            time_str = str(row['Time']).strip()
-                            datetime_str = f"{date_str} {time_str}"
-                            timestamp = pd.to_datetime(datetime_str)
-                        else:
-                            timestamp = pd.to_datetime(row[column_mapping['timestamp']])
-                        
-                        if pd.isna(timestamp):
-                            timestamp = datetime.now()
-                    except:
+                    timestamp = timestamps.at[index]
+                    if pd.isna(timestamp):
                         timestamp = datetime.now()
-                        errors.append(f"Row {index + 1}: Invalid timestamp, using current time")
+                        if invalid_timestamps.at[index]:
+                            errors.append(f"Row {index + 1}: Invalid timestamp, using current time")
                     
                     # Parse amounts - handle both single Amount column and separate received/paid amounts
                     try:
                         # Check if we have a single Amount column (new format)
-                        if 'Amount' in df.columns:
+                        if 'Amount' in chunk.columns:
                             amount_received = float(str(row['Amount']).replace(',', '').replace('$', ''))
                             amount_paid = amount_received  # Same amount for both
                         else:
@@ -1646,14 +2024,14 @@ class DataProcessor:
                         continue
                     
                     # Handle amount_paid if not set above
-                    if 'Amount' not in df.columns and 'amount_paid' in column_mapping:
+                    if 'Amount' not in chunk.columns and 'amount_paid' in column_mapping:
                         try:
                             amount_paid = float(str(row[column_mapping['amount_paid']]).replace(',', '').replace('$', ''))
                             if amount_paid <= 0:
                                 amount_paid = amount_received  # Default to received amount
                         except:
                             amount_paid = amount_received
-                    elif 'Amount' not in df.columns:
+                    elif 'Amount' not in chunk.columns:
                         # If no amount_paid column, use received amount
                         amount_paid = amount_received
                     
@@ -1696,45 +2074,44 @@ class DataProcessor:
                         'updated_at': datetime.now()
                     }
                     
-                    # Insert into database
-                    result = self.transactions.insert_one(transaction)
-                    transaction_ids.append(str(result.inserted_id))
-                    processed_records += 1
-                    total_volume += amount_received
-                    risk_scores.append(risk_score)
+                    documents.append(transaction)
+                    row_stats.append((index + 1, amount_received, risk_score))
                     
                 except Exception as row_error:
                     errors.append(f"Row {index + 1}: {str(row_error)}")
             
-            if processed_records == 0:
-                return {
-                    'success': False,
-                    'error': 'No valid transactions could be processed from the file',
-                    'details': errors
-                }
-            
-            # Calculate statistics
-            average_risk = sum(risk_scores) / len(risk_scores) if risk_scores else 0
-            
-            return {
-                'success': True,
-                'processed_records': processed_records,
-                'transaction_ids': transaction_ids,
-                'errors': errors,
-                'total_volume': round(total_volume, 2),
-                'average_risk': round(average_risk, 3),
-                'currencies_found': list(currencies_found),
-                'high_risk_count': len([r for r in risk_scores if r >= 0.7]),
-                'column_mapping': column_mapping
-            }
+            # Insert the whole chunk in one round-trip
+            failed = self._insert_transaction_batch(documents)
+            for i, (transaction, (row_number, amount_received, risk_score)) in enumerate(zip(documents, row_stats)):
+                if i in failed:
+                    errors.append(f"Row {row_number}: {failed[i]}")
+                    continue
+                transaction_ids.append(str(transaction['_id']))
+                processed_records += 1
+                total_volume += amount_received
+                risk_scores.append(risk_score)
         
-        except Exception as e:
-            print(f"Error processing file: {e}")
+        if processed_records == 0:
             return {
                 'success': False,
-                'error': f'File processing failed: {str(e)}',
-                'details': []
+                'error': 'No valid transactions could be processed from the file',
+                'details': errors
             }
+        
+        # Calculate statistics
+        average_risk = sum(risk_scores) / len(risk_scores) if risk_scores else 0
+        
+        return {
+            'success': True,
+            'processed_records': processed_records,
+            'transaction_ids': transaction_ids,
+            'errors': errors,
+            'total_volume': round(total_volume, 2),
+            'average_risk': round(average_risk, 3),
+            'currencies_found': list(currencies_found),
+            'high_risk_count': len([r for r in risk_scores if r >= 0.7]),
+            'column_mapping': column_mapping
+        }
     
     def _calculate_basic_risk_score(self, amount, receiving_currency, payment_currency, payment_format, timestamp):
         """Calculate a basic risk score for uploaded transactions"""
@@ -1894,12 +2271,7 @@ class DataProcessor:
             
         except Exception as e:
             print(f"Error getting transaction volume trends: {e}")
-            return {
-                'success': False,
-                'error': str(e),
-                'data': [],
-                'period': period
-            }
+            raise
     
     def get_recent_transaction_ids(self, days=7):
         """Get recent transaction IDs for analysis"""
@@ -1952,7 +2324,7 @@ class DataProcessor:
                         for bank in account['to_banks']:
                             if bank:
                                 bank_upper = bank.strip().upper() if bank else ''
-                                detected_country = self._country_code_mappings.get(bank_upper, 'Unknown')
+                                detected_country = COUNTRY_CODE_MAPPINGS.get(bank_upper, 'Unknown')
                                 if detected_country != 'Unknown':
                                     country = detected_country
                                     break
@@ -1975,7 +2347,66 @@ class DataProcessor:
             
         except Exception as e:
             print(f"Error getting recent high-risk accounts: {e}")
-            return []
+            raise
+    
+    # Per-account summary built from the account's sent transactions
+    _ACCOUNT_SUMMARY_GROUP = {
+        '_id': '$from_account',
+        'risk_score': {'$avg': '$risk_score'},
+        'total_sent': {'$sum': '$amount_received'},
+        'transaction_count': {'$sum': 1},
+        'last_transaction': {'$max': '$timestamp'},
+        'currencies': {'$addToSet': '$receiving_currency'},
+        'banks': {'$addToSet': '$from_bank'},
+        'countries': {'$addToSet': '$from_country'}
+    }
+    
+    def _format_account_summary(self, account):
+        """Format an aggregated account summary for the API"""
+        # Better country detection
+        country = 'Unknown'
+        if account['countries'] and account['countries'][0]:
+            country = account['countries'][0]
+        elif account['banks']:
+            # Try to detect from bank names
+            for bank in account['banks']:
+                if bank:
+                    bank_upper = bank.strip().upper() if bank else ''
+                    detected_country = COUNTRY_CODE_MAPPINGS.get(bank_upper, 'Unknown')
+                    if detected_country != 'Unknown':
+                        country = detected_country
+                        break
+        
+        return {
+            'account_id': account['_id'],
+            'risk_score': round(account['risk_score'], 3),
+            'total_sent': account['total_sent'],
+            'total_amount': account['total_sent'],  # Add for compatibility
+            'transaction_count': account['transaction_count'],
+            'last_transaction': account['last_transaction'].isoformat() if account['last_transaction'] else None,
+            'currencies': list(account['currencies']),
+            'banks': list(account['banks']),
+            'countries': list(account['countries']),
+            'account_type': 'Individual',  # Default type
+            'country': country
+        }
+    
+    def get_account(self, account_id):
+        """Get a single account summary by exact account ID"""
+        try:
+            # Equality match on from_account is served by the {from_account, timestamp} index
+            start_date = datetime.now() - timedelta(days=30)
+            pipeline = [
+                {'$match': {'from_account': account_id, 'timestamp': {'$gte': start_date}}},
+                {'$group': self._ACCOUNT_SUMMARY_GROUP}
+            ]
+            
+            account = next(self.transactions.aggregate(pipeline), None)
+            return self._format_account_summary(account) if account else None
+        
+        except Exception as e:
+            print(f"Error getting account {account_id}: {e}")
+            return None
     
     def search_accounts(self, filters):
         """Search accounts based on filters"""
@@ -1996,27 +2427,13 @@ class DataProcessor:
                 ]
             
             # Risk level filter
-            if filters.get('risk_level') and filters['risk_level'] != 'all':
-                if filters['risk_level'] == 'high':
-                    match_query['risk_score'] = {'$gte': 0.7}
-                elif filters['risk_level'] == 'medium':
-                    match_query['risk_score'] = {'$gte': 0.4, '$lt': 0.7}
-                elif filters['risk_level'] == 'low':
-                    match_query['risk_score'] = {'$lt': 0.4}
+            if filters.get('risk_level') in self._RISK_SCORE_RANGES:
+                match_query['risk_score'] = self._RISK_SCORE_RANGES[filters['risk_level']]
             
             # Build aggregation pipeline
             pipeline = [
                 {'$match': match_query},
-                {'$group': {
-                    '_id': '$from_account',
-                    'risk_score': {'$avg': '$risk_score'},
-                    'total_sent': {'$sum': '$amount_received'},
-                    'transaction_count': {'$sum': 1},
-                    'last_transaction': {'$max': '$timestamp'},
-                    'currencies': {'$addToSet': '$receiving_currency'},
-                    'banks': {'$addToSet': '$from_bank'},
-                    'countries': {'$addToSet': '$from_country'}
-                }},
+                {'$group': self._ACCOUNT_SUMMARY_GROUP},
                 {'$match': {
                     '_id': {'$ne': None, '$exists': True}  # Filter out null accounts
                 }},
@@ -2026,39 +2443,7 @@ class DataProcessor:
             
             accounts = list(self.transactions.aggregate(pipeline))
             
-            # Format results
-            formatted_accounts = []
-            for account in accounts:
-                # Better country detection
-                country = 'Unknown'
-                if account['countries'] and account['countries'][0]:
-                    country = account['countries'][0]
-                elif account['banks']:
-                    # Try to detect from bank names
-                    for bank in account['banks']:
-                        if bank:
-                            bank_upper = bank.strip().upper() if bank else ''
-                            detected_country = self._country_code_mappings.get(bank_upper, 'Unknown')
-                            if detected_country != 'Unknown':
-                                country = detected_country
-                                break
-                
-                formatted_account = {
-                    'account_id': account['_id'],
-                    'risk_score': round(account['risk_score'], 3),
-                    'total_sent': account['total_sent'],
-                    'total_amount': account['total_sent'],  # Add for compatibility
-                    'transaction_count': account['transaction_count'],
-                    'last_transaction': account['last_transaction'].isoformat() if account['last_transaction'] else None,
-                    'currencies': list(account['currencies']),
-                    'banks': list(account['banks']),
-                    'countries': list(account['countries']),
-                    'account_type': 'Individual',  # Default type
-                    'country': country
-                }
-                formatted_accounts.append(formatted_account)
-            
-            return formatted_accounts
+            return [self._format_account_summary(account) for account in accounts]
             
         except Exception as e:
             print(f"Error searching accounts: {e}")
@@ -2243,12 +2628,7 @@ class DataProcessor:
             
         except Exception as e:
             print(f"Error getting accounts summary: {e}")
-            return {
-                'total_accounts': 0,
-                'high_risk_accounts': 0,
-                'flagged_accounts': 0,
-                'period': '30 days'
-            }
+            raise
     
     def generate_account_report(self, account_id):
         """Generate comprehensive report for an account"""
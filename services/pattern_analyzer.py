@@ -7,7 +7,7 @@ using modern machine learning and statistical techniques.
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Optional, Union
 from dataclasses import dataclass
 from enum import Enum
 import logging
@@ -108,12 +108,12 @@ class AdvancedPatternAnalyzer:
             'density_anomaly_threshold': 3.0   # Network density standard deviations
         }
     
-    def analyze_patterns(self, transactions: List[Dict], accounts: List[Dict] = None) -> List[PatternResult]:
+    def analyze_patterns(self, transactions: Union[List[Dict], pd.DataFrame], accounts: List[Dict] = None) -> List[PatternResult]:
         """
         Main method to analyze all patterns in the transaction data
         
         Args:
-            transactions: List of transaction dictionaries
+            transactions: List of transaction dictionaries or a columnar DataFrame
             accounts: Optional list of account information
             
         Returns:
@@ -122,7 +122,10 @@ class AdvancedPatternAnalyzer:
         logger.info(f"Starting pattern analysis on {len(transactions)} transactions")
         
         # Convert to DataFrame for easier manipulation
-        df = pd.DataFrame(transactions)
+        if isinstance(transactions, pd.DataFrame):
+            df = transactions.copy()
+        else:
+            df = pd.DataFrame(transactions)
         
         if df.empty:
             logger.warning("No transactions provided for analysis")
@@ -213,51 +216,75 @@ class AdvancedPatternAnalyzer:
         logger.info(f"Pattern analysis completed. Found {len(results)} suspicious patterns")
         return results
     
+    def _account_groups(self, accounts: pd.Series, mask: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[int, np.ndarray]]:
+        """
+        Factorize account ids into dense integer codes (structure-of-arrays form)
+        
+        Returns:
+            Tuple of (account values, per-row codes, per-account counts,
+            code -> row positions), counts and positions restricted to rows where mask is True
+        """
+        codes, uniques = pd.factorize(accounts, sort=False)
+        positions = np.arange(len(codes)) if mask is None else np.flatnonzero(mask)
+        masked_codes = codes[positions]
+        counts = np.bincount(masked_codes[masked_codes >= 0], minlength=len(uniques))
+        
+        # Group row positions by account code in one stable sort
+        order = np.argsort(masked_codes, kind='stable')
+        sorted_codes = masked_codes[order]
+        boundaries = np.flatnonzero(np.diff(sorted_codes)) + 1
+        groups = {
+            int(group_codes[0]): positions[order_slice]
+            for group_codes, order_slice in zip(np.split(sorted_codes, boundaries), np.split(order, boundaries))
+            if len(group_codes) and group_codes[0] >= 0
+        }
+        return np.asarray(uniques), codes, counts, groups
+    
     def _detect_structuring(self, df: pd.DataFrame) -> List[PatternResult]:
         """Detect structuring patterns (breaking large amounts into smaller ones)"""
         patterns = []
         threshold = self.thresholds['structuring_amount']
         frequency = self.thresholds['structuring_frequency']
         
-        # Group by account and look for multiple transactions just below threshold
-        for account in df['source'].unique():
-            account_txns = df[df['source'] == account].copy()
+        # Transactions just below the threshold (between 70-100% of it)
+        amounts = df['amount'].to_numpy(dtype=float)
+        below_mask = (amounts < threshold) & (amounts > threshold * 0.7)
+        
+        # Count per account in one pass and only inspect accounts with enough hits
+        accounts, _, counts, groups = self._account_groups(df['source'], below_mask)
+        
+        for code in np.flatnonzero(counts >= frequency):
+            account = accounts[code]
+            below_threshold = df.iloc[groups[code]]
             
-            # Look for transactions just below the threshold within short time windows
-            below_threshold = account_txns[
-                (account_txns['amount'] < threshold) & 
-                (account_txns['amount'] > threshold * 0.7)  # Between 70-100% of threshold
-            ]
+            # Check if these transactions occurred within a short time window
+            time_groups = []
+            for _, group in below_threshold.groupby(pd.Grouper(key='timestamp', freq='D')):
+                if len(group) >= 3:  # 3 or more transactions in a day
+                    time_groups.append(group)
             
-            if len(below_threshold) >= frequency:
-                # Check if these transactions occurred within a short time window
-                time_groups = []
-                for _, group in below_threshold.groupby(pd.Grouper(key='timestamp', freq='D')):
-                    if len(group) >= 3:  # 3 or more transactions in a day
-                        time_groups.append(group)
+            if time_groups:
+                total_amount = sum(group['amount'].sum() for group in time_groups)
+                confidence = min(0.95, len(below_threshold) / 10 * 0.8)
                 
-                if time_groups:
-                    total_amount = sum(group['amount'].sum() for group in time_groups)
-                    confidence = min(0.95, len(below_threshold) / 10 * 0.8)
-                    
-                    risk_level = RiskLevel.HIGH if confidence > 0.8 else RiskLevel.MEDIUM
-                    
-                    patterns.append(PatternResult(
-                        pattern_type=PatternType.STRUCTURING,
-                        risk_level=risk_level,
-                        confidence=confidence,
-                        description=f"Account {account} conducted {len(below_threshold)} transactions just below ${threshold:,.2f} threshold, totaling ${total_amount:,.2f}",
-                        affected_accounts=[account],
-                        transaction_ids=below_threshold['transaction_id'].tolist() if 'transaction_id' in below_threshold.columns else [],
-                        evidence={
-                            'transaction_count': len(below_threshold),
-                            'total_amount': total_amount,
-                            'average_amount': below_threshold['amount'].mean(),
-                            'time_span_days': (below_threshold['timestamp'].max() - below_threshold['timestamp'].min()).days
-                        },
-                        recommendation="Investigate for potential structuring to avoid reporting requirements",
-                        timestamp=datetime.now()
-                    ))
+                risk_level = RiskLevel.HIGH if confidence > 0.8 else RiskLevel.MEDIUM
+                
+                patterns.append(PatternResult(
+                    pattern_type=PatternType.STRUCTURING,
+                    risk_level=risk_level,
+                    confidence=confidence,
+                    description=f"Account {account} conducted {len(below_threshold)} transactions just below ${threshold:,.2f} threshold, totaling ${total_amount:,.2f}",
+                    affected_accounts=[account],
+                    transaction_ids=below_threshold['transaction_id'].tolist() if 'transaction_id' in below_threshold.columns else [],
+                    evidence={
+                        'transaction_count': len(below_threshold),
+                        'total_amount': total_amount,
+                        'average_amount': below_threshold['amount'].mean(),
+                        'time_span_days': (below_threshold['timestamp'].max() - below_threshold['timestamp'].min()).days
+                    },
+                    recommendation="Investigate for potential structuring to avoid reporting requirements",
+                    timestamp=datetime.now()
+                ))
         
         return patterns
     
@@ -425,49 +452,57 @@ class AdvancedPatternAnalyzer:
         """Detect unusual transaction velocity patterns"""
         patterns = []
         
-        # Calculate transaction velocity for each account
-        account_velocities = {}
+        # Each transaction counts once for its source and once for its target
+        # (self-transfers only once), so per-account totals come from one bincount
+        sources = df['source'].to_numpy()
+        targets = df['target'].to_numpy()
+        rows = np.arange(len(df))
+        distinct_target = sources != targets
+        participants = pd.Series(np.concatenate([sources, targets[distinct_target]]))
+        participant_rows = np.concatenate([rows, rows[distinct_target]])
+        
+        accounts, _, counts, groups = self._account_groups(participants)
+        days = df['timestamp'].dt.date.to_numpy()
         
-        for account in set(df['source']).union(set(df['target'])):
-            account_txns = df[(df['source'] == account) | (df['target'] == account)]
+        for code in np.flatnonzero(counts >= 5):  # Need sufficient data
+            account = accounts[code]
+            
+            # Calculate daily transaction counts
+            daily_counts = pd.Series(days[participant_rows[groups[code]]]).value_counts(sort=False).sort_index()
             
-            if len(account_txns) >= 5:  # Need sufficient data
-                # Calculate daily transaction counts
-                daily_counts = account_txns.groupby(account_txns['timestamp'].dt.date).size()
+            if len(daily_counts) >= 3:  # Need at least 3 days of data
+                mean_velocity = daily_counts.mean()
+                std_velocity = daily_counts.std()
                 
-                if len(daily_counts) >= 3:  # Need at least 3 days of data
-                    mean_velocity = daily_counts.mean()
-                    std_velocity = daily_counts.std()
+                if std_velocity > 0:
+                    # Find anomalous days
+                    anomalous_days = daily_counts[
+                        daily_counts > mean_velocity + self.thresholds['velocity_multiplier'] * std_velocity
+                    ]
                     
-                    if std_velocity > 0:
-                        # Find anomalous days
-                        anomalous_days = daily_counts[
-                            daily_counts > mean_velocity + self.thresholds['velocity_multiplier'] * std_velocity
-                        ]
+                    if len(anomalous_days) > 0:
+                        max_velocity_day = anomalous_days.idxmax()
+                        max_velocity = anomalous_days.max()
                         
-                        if len(anomalous_days) > 0:
-                            max_velocity_day = anomalous_days.idxmax()
-                            max_velocity = anomalous_days.max()
-                            
-                            confidence = min(0.9, (max_velocity - mean_velocity) / mean_velocity * 0.5)
-                            risk_level = RiskLevel.HIGH if max_velocity > mean_velocity * 5 else RiskLevel.MEDIUM
-                            
-                            patterns.append(PatternResult(
-                                pattern_type=PatternType.VELOCITY_ANOMALY,
-                                risk_level=risk_level,
-                                confidence=confidence,
-                                description=f"Account {account} showed unusual transaction velocity: {max_velocity} transactions on {max_velocity_day} (normal: {mean_velocity:.1f})",
-                                affected_accounts=[account],
-                                transaction_ids=[],
-                                evidence={
-                                    'normal_velocity': mean_velocity,
-                                    'anomalous_velocity': max_velocity,
-                                    'anomalous_date': str(max_velocity_day),
-                                    'velocity_ratio': max_velocity / mean_velocity
-                                },
-                                recommendation="Investigate unusual transaction velocity pattern",
-                                timestamp=datetime.now()
-                            ))
+                        confidence = min(0.9, (max_velocity - mean_velocity) / mean_velocity * 0.5)
+                        risk_level = RiskLevel.HIGH if max_velocity > mean_velocity * 5 else RiskLevel.MEDIUM
+                        
+                        patterns.append(PatternResult(
+                            pattern_type=PatternType.VELOCITY_ANOMALY,
+                            risk_level=risk_level,
+                            confidence=confidence,
+                            description=f"Account {account} showed unusual transaction velocity: {max_velocity} transactions on {max_velocity_day} (normal: {mean_velocity:.1f})",
+                            affected_accounts=[account],
+                            transaction_ids=[],
+                            evidence={
+                                'normal_velocity': mean_velocity,
+                                'anomalous_velocity': max_velocity,
+                                'anomalous_date': str(max_velocity_day),
+                                'velocity_ratio': max_velocity / mean_velocity
+                            },
+                            recommendation="Investigate unusual transaction velocity pattern",
+                            timestamp=datetime.now()
+                        ))
         
         return patterns
     
@@ -476,37 +511,45 @@ class AdvancedPatternAnalyzer:
         patterns = []
         
         # Define round amounts (ending in multiple zeros)
-        df['is_round'] = df['amount'].apply(lambda x: x % 1000 == 0 and x >= 1000)
+        amounts = df['amount'].to_numpy(dtype=float)
+        is_round = (amounts % 1000 == 0) & (amounts >= 1000)
+        df['is_round'] = is_round
+        
+        accounts, codes, totals, groups = self._account_groups(df['source'])
+        round_counts = np.bincount(codes[is_round & (codes >= 0)], minlength=len(accounts))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            round_ratios = round_counts / totals
+        
+        # Need sufficient transactions and a high share of round amounts
+        candidates = np.flatnonzero((totals >= 5) & (round_ratios >= self.thresholds['round_amount_threshold']))
         
-        for account in df['source'].unique():
-            account_txns = df[df['source'] == account]
+        for code in candidates:
+            account = accounts[code]
+            account_txns = df.iloc[groups[code]]
+            round_ratio = round_ratios[code]
+            round_txns = account_txns[account_txns['is_round']]
+            total_round_amount = round_txns['amount'].sum()
             
-            if len(account_txns) >= 5:  # Need sufficient transactions
-                round_ratio = account_txns['is_round'].mean()
-                
-                if round_ratio >= self.thresholds['round_amount_threshold']:
-                    round_txns = account_txns[account_txns['is_round']]
-                    total_round_amount = round_txns['amount'].sum()
-                    
-                    confidence = min(0.85, round_ratio * 0.9)
-                    risk_level = RiskLevel.MEDIUM if round_ratio >= 0.9 else RiskLevel.LOW
-                    
-                    patterns.append(PatternResult(
-                        pattern_type=PatternType.ROUND_AMOUNT,
-                        risk_level=risk_level,
-                        confidence=confidence,
-                        description=f"Account {account} has {round_ratio*100:.1f}% round amount transactions (${total_round_amount:,.2f} total)",
-                        affected_accounts=[account],
-                        transaction_ids=round_txns['transaction_id'].tolist() if 'transaction_id' in round_txns.columns else [],
-                        evidence={
-                            'round_ratio': round_ratio,
-                            'round_transaction_count': len(round_txns),
-                            'total_round_amount': total_round_amount,
-                            'total_transactions': len(account_txns)
-                        },
-                        recommendation="Investigate high frequency of round amount transactions",
-                        timestamp=datetime.now()
-                    ))
+            confidence = min(0.85, round_ratio * 0.9)
+            risk_level = RiskLevel.MEDIUM if round_ratio >= 0.9 else RiskLevel.LOW
+            
+            patterns.append(PatternResult(
+                pattern_type=PatternType.ROUND_AMOUNT,
+                risk_level=risk_level,
+                confidence=confidence,
+                description=f"Account {account} has {round_ratio*100:.1f}% round amount transactions (${total_round_amount:,.2f} total)",
+                affected_accounts=[account],
+                transaction_ids=round_txns['transaction_id'].tolist() if 'transaction_id' in round_txns.columns else [],
+                evidence={
+                    'round_ratio': round_ratio,
+                    'round_transaction_count': len(round_txns),
+                    'total_round_amount': total_round_amount,
+                    'total_transactions': len(account_txns)
+                },
+                recommendation="Investigate high frequency of round amount transactions",
+                timestamp=datetime.now()
+            ))
         
         return patterns
     
@@ -564,37 +607,41 @@ class AdvancedPatternAnalyzer:
         unusual_hours = set(range(self.thresholds['time_anomaly_hours'][0], 24)).union(
             set(range(0, self.thresholds['time_anomaly_hours'][1] + 1))
         )
+        is_unusual = np.isin(df['hour'].to_numpy(), list(unusual_hours))
+        
+        accounts, codes, totals, groups = self._account_groups(df['source'])
+        unusual_counts = np.bincount(codes[is_unusual & (codes >= 0)], minlength=len(accounts))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            unusual_ratios = unusual_counts / totals
         
-        # Find accounts with high proportion of unusual hour transactions
-        for account in df['source'].unique():
-            account_txns = df[df['source'] == account]
+        # Accounts with enough transactions and 30% or more at unusual hours
+        for code in np.flatnonzero((totals >= 10) & (unusual_ratios >= 0.3)):
+            account = accounts[code]
+            account_txns = df.iloc[groups[code]]
+            unusual_txns = account_txns[is_unusual[groups[code]]]
+            unusual_ratio = len(unusual_txns) / len(account_txns)
+            total_unusual_amount = unusual_txns['amount'].sum()
             
-            if len(account_txns) >= 10:  # Need sufficient transactions
-                unusual_txns = account_txns[account_txns['hour'].isin(unusual_hours)]
-                unusual_ratio = len(unusual_txns) / len(account_txns)
-                
-                if unusual_ratio >= 0.3:  # 30% or more transactions at unusual hours
-                    total_unusual_amount = unusual_txns['amount'].sum()
-                    
-                    confidence = min(0.8, unusual_ratio * 0.9)
-                    risk_level = RiskLevel.MEDIUM if unusual_ratio >= 0.5 else RiskLevel.LOW
-                    
-                    patterns.append(PatternResult(
-                        pattern_type=PatternType.TIME_ANOMALY,
-                        risk_level=risk_level,
-                        confidence=confidence,
-                        description=f"Account {account} conducts {unusual_ratio*100:.1f}% of transactions during unusual hours (${total_unusual_amount:,.2f})",
-                        affected_accounts=[account],
-                        transaction_ids=unusual_txns['transaction_id'].tolist() if 'transaction_id' in unusual_txns.columns else [],
-                        evidence={
-                            'unusual_ratio': unusual_ratio,
-                            'unusual_transaction_count': len(unusual_txns),
-                            'total_unusual_amount': total_unusual_amount,
-                            'most_common_hour': unusual_txns['hour'].mode().iloc[0] if len(unusual_txns) > 0 else None
-                        },
-                        recommendation="Investigate transactions occurring at unusual hours",
-                        timestamp=datetime.now()
-                    ))
+            confidence = min(0.8, unusual_ratio * 0.9)
+            risk_level = RiskLevel.MEDIUM if unusual_ratio >= 0.5 else RiskLevel.LOW
+            
+            patterns.append(PatternResult(
+                pattern_type=PatternType.TIME_ANOMALY,
+                risk_level=risk_level,
+                confidence=confidence,
+                description=f"Account {account} conducts {unusual_ratio*100:.1f}% of transactions during unusual hours (${total_unusual_amount:,.2f})",
+                affected_accounts=[account],
+                transaction_ids=unusual_txns['transaction_id'].tolist() if 'transaction_id' in unusual_txns.columns else [],
+                evidence={
+                    'unusual_ratio': unusual_ratio,
+                    'unusual_transaction_count': len(unusual_txns),
+                    'total_unusual_amount': total_unusual_amount,
+                    'most_common_hour': unusual_txns['hour'].mode().iloc[0] if len(unusual_txns) > 0 else None
+                },
+                recommendation="Investigate transactions occurring at unusual hours",
+                timestamp=datetime.now()
+            ))
         
         return patterns
     
@@ -6,6 +6,18 @@ import math
 class RiskCalculator:
     """Calculate risk scores for transactions and accounts"""
     
+    PAYMENT_METHOD_RISK = {
+        'cash': 0.8,
+        'cryptocurrency': 0.9,
+        'wire': 0.4,
+        'ach': 0.2,
+        'check': 0.3,
+        'credit_card': 0.1,
+        'debit_card': 0.1,
+        'electronic': 0.2,
+        'online': 0.3
+    }
+    
     def __init__(self):
         self.risk_weights = {
             'amount': 0.25,
@@ -64,10 +76,116 @@ class RiskCalculator:
             print(f"Error calculating transaction risk: {e}")
             return 0.0
     
+    def calculate_transaction_risk_batch(self, df):
+        """Calculate risk scores for a DataFrame of transactions in one vectorized pass"""
+        n = len(df)
+        if n == 0:
+            return np.zeros(0)
+        
+        def column(name, default):
+            # Missing fields fall back to the same defaults as the scalar path
+            if name not in df.columns:
+                return pd.Series([default] * n, index=df.index, dtype=object)
+            return df[name].where(df[name].notna(), default)
+        
+        # Amount-based risk (unparseable amounts contribute nothing)
+        raw_amounts = column('amount_received', 0)
+        amount = pd.to_numeric(raw_amounts, errors='coerce').to_numpy(dtype=float)
+        amount_valid = ~np.isnan(amount)
+        amount_risk = np.select(
+            [amount >= 1000000, amount >= 100000, amount >= 50000, amount >= 10000, amount >= 9500, amount < 100],
+            [0.9, 0.7, 0.5, 0.3, 0.8, 0.4],
+            default=0.1
+        )
+        amount_risk[~amount_valid] = 0.0
+        
+        # Currency risk
+        receiving = column('receiving_currency', 'USD')
+        payment = column('payment_currency', 'USD')
+        receiving_risk = receiving.map(self.currency_risk_scores).fillna(0.5).to_numpy(dtype=float)
+        payment_risk = payment.map(self.currency_risk_scores).fillna(0.5).to_numpy(dtype=float)
+        currency_risk = np.maximum(receiving_risk, payment_risk) + np.where(
+            (receiving != payment).to_numpy(), 0.2, 0.0)
+        
+        # Geography risk from bank code distance
+        from_codes, from_digits, from_empty = self._bank_code_values(df, 'from_bank')
+        to_codes, to_digits, to_empty = self._bank_code_values(df, 'to_bank')
+        bank_distance = np.where(from_digits & to_digits, np.abs(from_codes - to_codes), 0)
+        geography_risk = np.select([bank_distance > 1000, bank_distance > 100], [0.6, 0.3], default=0.1)
+        geography_risk[from_empty | to_empty] = 0.2
+        
+        # Timing risk (missing or unparseable timestamps contribute nothing)
+        timestamps = pd.to_datetime(column('timestamp', None), errors='coerce', format='mixed')
+        weekday = timestamps.dt.weekday.to_numpy(dtype=float)
+        hour = timestamps.dt.hour.to_numpy(dtype=float)
+        timing_risk = np.where(weekday >= 5, 0.3, 0.0) + np.where((hour < 6) | (hour > 22), 0.2, 0.0)
+        
+        # Payment method risk, first matching method wins
+        payment_format = column('payment_format', '')
+        is_text = payment_format.map(type).eq(str).to_numpy()
+        payment_format = payment_format.where(is_text, '').str.lower()
+        payment_method_risk = np.select(
+            [payment_format.str.contains(method, regex=False).to_numpy(dtype=bool)
+             for method in self.PAYMENT_METHOD_RISK],
+            list(self.PAYMENT_METHOD_RISK.values()),
+            default=0.2
+        )
+        payment_method_risk[~is_text] = 0.0
+        
+        total_risk = (
+            amount_risk * self.risk_weights.get('amount', 0.1) +
+            currency_risk * self.risk_weights.get('currency', 0.1) +
+            geography_risk * self.risk_weights.get('geography', 0.1) +
+            timing_risk * self.risk_weights.get('timing', 0.1) +
+            payment_method_risk * self.risk_weights.get('payment_method', 0.1)
+        )
+        
+        # Additional risk factors (skipped for rows whose amounts don't parse)
+        amount_paid = pd.to_numeric(column('amount_paid', 0), errors='coerce').to_numpy(dtype=float)
+        factors_valid = amount_valid & ~np.isnan(amount_paid)
+        additional_risk = np.where((amount > 0) & (amount % 1000 == 0), 0.1, 0.0)
+        additional_risk += np.where(np.abs(amount - amount_paid) < 0.01, 0.1, 0.0)
+        
+        # Only the few amounts with sub-cent digits need their decimal places counted
+        for i in np.flatnonzero((amount > 100) & ((amount * 100) % 1 != 0)):
+            text = str(float(amount[i]))
+            if '.' in text and len(text.split('.')[-1]) > 2:
+                additional_risk[i] += 0.05
+        
+        total_risk = np.where(factors_valid, np.minimum(total_risk + additional_risk, 1.0), total_risk)
+        
+        return np.clip(total_risk, 0.0, 1.0)
+    
+    def _bank_code_values(self, df, name):
+        """Return (numeric codes, all-digit mask, empty mask) for a bank code column"""
+        n = len(df)
+        if name not in df.columns:
+            return np.zeros(n), np.zeros(n, dtype=bool), np.ones(n, dtype=bool)
+        
+        values = df[name]
+        empty = values.isna().to_numpy(copy=True)
+        if pd.api.types.is_numeric_dtype(values):
+            codes = values.to_numpy(dtype=float)
+            digits = ~empty & (codes >= 0) & (codes % 1 == 0)
+        else:
+            text = values.astype(str)
+            empty |= (text == '').to_numpy()
+            digits = text.str.isdigit().to_numpy(dtype=bool) & ~empty
+            codes = pd.to_numeric(text.where(digits, '0'), errors='coerce').to_numpy(dtype=float)
+        
+        return np.nan_to_num(codes), digits, empty
+    
+    def _field(self, transaction, name, default):
+        """Read a transaction field, treating None/NaN like a missing key (as the batch path does)"""
+        value = transaction.get(name, default)
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return default
+        return value
+    
     def _calculate_amount_risk(self, transaction):
         """Calculate risk based on transaction amount"""
         try:
-            amount = float(transaction.get('amount_received', 0))
+            amount = float(self._field(transaction, 'amount_received', 0))
             
             # Risk thresholds
             if amount >= 1000000:  # 1M+
@@ -91,8 +209,8 @@ class RiskCalculator:
     def _calculate_currency_risk(self, transaction):
         """Calculate risk based on currency type"""
         try:
-            receiving_currency = transaction.get('receiving_currency', 'USD')
-            payment_currency = transaction.get('payment_currency', 'USD')
+            receiving_currency = self._field(transaction, 'receiving_currency', 'USD')
+            payment_currency = self._field(transaction, 'payment_currency', 'USD')
             
             receiving_risk = self.currency_risk_scores.get(receiving_currency, 0.5)
             payment_risk = self.currency_risk_scores.get(payment_currency, 0.5)
@@ -114,8 +232,8 @@ class RiskCalculator:
             # This would typically use bank location data
             # For now, we'll use a simplified approach based on bank codes
             
-            from_bank = str(transaction.get('from_bank', ''))
-            to_bank = str(transaction.get('to_bank', ''))
+            from_bank = str(self._field(transaction, 'from_bank', ''))
+            to_bank = str(self._field(transaction, 'to_bank', ''))
             
             # If banks are very different (potentially different countries)
             if from_bank and to_bank:
@@ -168,21 +286,9 @@ class RiskCalculator:
     def _calculate_payment_method_risk(self, transaction):
         """Calculate risk based on payment method"""
         try:
-            payment_format = transaction.get('payment_format', '').lower()
+            payment_format = self._field(transaction, 'payment_format', '').lower()
             
-            risk_scores = {
-                'cash': 0.8,
-                'cryptocurrency': 0.9,
-                'wire': 0.4,
-                'ach': 0.2,
-                'check': 0.3,
-                'credit_card': 0.1,
-                'debit_card': 0.1,
-                'electronic': 0.2,
-                'online': 0.3
-            }
-            
-            for method, risk in risk_scores.items():
+            for method, risk in self.PAYMENT_METHOD_RISK.items():
                 if method in payment_format:
                     return risk
             
@@ -197,12 +303,12 @@ class RiskCalculator:
             additional_risk = 0
             
             # Round number detection
-            amount = float(transaction.get('amount_received', 0))
+            amount = float(self._field(transaction, 'amount_received', 0))
             if amount > 0 and amount % 1000 == 0:
                 additional_risk += 0.1
             
             # Exact amount matching (potential structuring)
-            amount_paid = float(transaction.get('amount_paid', 0))
+            amount_paid = float(self._field(transaction, 'amount_paid', 0))
             if abs(amount - amount_paid) < 0.01:  # Exactly matching amounts
                 additional_risk += 0.1
             
@@ -245,10 +351,7 @@ class RiskCalculator:
             }
             
             # Average transaction risk
-            transaction_risks = []
-            for t in transactions:
-                t_risk = self.calculate_transaction_risk(t)
-                transaction_risks.append(t_risk)
+            transaction_risks = self.calculate_batch_risk_scores(transactions)
             
             risk_factors['transaction_risk'] = np.mean(transaction_risks) if transaction_risks else 0
             
@@ -390,17 +493,14 @@ class RiskCalculator:
     def calculate_batch_risk_scores(self, transactions):
         """Calculate risk scores for a batch of transactions"""
         try:
-            risk_scores = []
-            
-            for transaction in transactions:
-                risk_score = self.calculate_transaction_risk(transaction)
-                risk_scores.append(risk_score)
+            if not transactions:
+                return []
             
-            return risk_scores
+            return self.calculate_transaction_risk_batch(pd.DataFrame(transactions)).tolist()
         
         except Exception as e:
             print(f"Error calculating batch risk scores: {e}")
-            return [0.0] * len(transactions)
+            return [self.calculate_transaction_risk(t) for t in transactions]
     
     def get_risk_explanation(self, transaction, risk_score):
         """Generate human-readable explanation for risk score"""
@@ -8,9 +8,15 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from services.risk_calculator import RiskCalculator
-from services.ai_analyzer import AIAnalyzer
+from services.ai_analyzer import AIAnalyzer, MAX_ESTIMATORS, WARM_START_ESTIMATORS
+from services.data_processor import DataProcessor, UPLOAD_BATCH_SIZE
+import io
+import re
+import tempfile
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
 
 class TestRiskCalculator(unittest.TestCase):
     
@@ -97,6 +103,48 @@ class TestRiskCalculator(unittest.TestCase):
         risk = self.risk_calculator.calculate_transaction_risk(low_risk_transaction)
         self.assertLess(risk, 0.4)
         self.assertGreaterEqual(risk, 0.0)
+    
+    def test_batch_risk_matches_single(self):
+        """Test vectorized batch scoring matches per-transaction scoring"""
+        transactions = [
+            {
+                'amount_received': 1000000,
+                'amount_paid': 1000000,
+                'receiving_currency': 'BTC',
+                'payment_currency': 'USD',
+                'timestamp': datetime(2024, 1, 6, 23, 30),
+                'payment_format': 'cash',
+                'from_bank': '12345',
+                'to_bank': '99999'
+            },
+            {
+                'amount_received': 9600.125,
+                'receiving_currency': 'EUR',
+                'timestamp': '2024-01-08T14:30:00',
+                'payment_format': 'Wire',
+                'from_bank': 'abc'
+            },
+            {'amount_received': 50},
+            {
+                'amount_received': None,
+                'amount_paid': None,
+                'receiving_currency': None,
+                'payment_currency': 'EUR',
+                'timestamp': None,
+                'payment_format': None,
+                'from_bank': None,
+                'to_bank': '100'
+            },
+            {'amount_received': 12000, 'payment_format': None, 'payment_currency': None},
+            {'amount_received': 20000, 'receiving_currency': ['USD']},
+            {}
+        ]
+        
+        batch_risks = self.risk_calculator.calculate_batch_risk_scores(transactions)
+        
+        self.assertEqual(len(batch_risks), len(transactions))
+        for transaction, batch_risk in zip(transactions, batch_risks):
+            self.assertAlmostEqual(batch_risk, self.risk_calculator.calculate_transaction_risk(transaction))
 
 class TestAIAnalyzer(unittest.TestCase):
     
@@ -136,6 +184,114 @@ class TestAIAnalyzer(unittest.TestCase):
             if col in self.ai_analyzer.feature_columns:
                 self.assertIn(col, features.columns)
     
+    def _training_batch(self, seed):
+        rng = np.random.default_rng(seed)
+        return [
+            {
+                'timestamp': datetime(2024, 1, 1 + i % 28, i % 24, 0),
+                'amount_received': float(amount),
+                'amount_paid': float(amount * rng.uniform(0.8, 1.2)),
+                'receiving_currency': ['USD', 'EUR', 'BTC'][i % 3],
+                'from_bank': str(10000 + i),
+                'to_bank': str(20000 + i * 7)
+            }
+            for i, amount in enumerate(rng.uniform(100, 50000, size=60))
+        ]
+    
+    def test_retraining_grows_forest_until_cap(self):
+        """Test later training batches add warm-start trees to the fitted forest"""
+        self.assertTrue(self.ai_analyzer.train_model(self._training_batch(0)))
+        initial_trees = len(self.ai_analyzer.isolation_forest.estimators_)
+        
+        self.assertTrue(self.ai_analyzer.train_model(self._training_batch(1)))
+        
+        self.assertEqual(len(self.ai_analyzer.isolation_forest.estimators_), initial_trees + WARM_START_ESTIMATORS)
+    
+    def test_retraining_at_cap_refits_fresh_forest(self):
+        """Test a batch arriving at the tree cap refits a fresh forest instead of being skipped"""
+        self.assertTrue(self.ai_analyzer.train_model(self._training_batch(0)))
+        initial_trees = len(self.ai_analyzer.isolation_forest.estimators_)
+        capped_forest = self.ai_analyzer.isolation_forest
+        capped_forest.n_estimators = MAX_ESTIMATORS
+        
+        batch = self._training_batch(2)
+        self.assertTrue(self.ai_analyzer.train_model(batch))
+        
+        self.assertIsNot(self.ai_analyzer.isolation_forest, capped_forest)
+        self.assertEqual(len(self.ai_analyzer.isolation_forest.estimators_), initial_trees)
+        features, _ = self.ai_analyzer.extract_features(batch)
+        np.testing.assert_allclose(self.ai_analyzer.scaler.mean_, features.to_numpy(dtype=np.float32).mean(axis=0), rtol=1e-4)
+    
+    def test_column_path_matches_dataframe_path(self):
+        """Test scoring per-field columns matches scoring row dicts, including None and missing fields"""
+        self.assertTrue(self.ai_analyzer.train_model(self._training_batch(0)))
+        transactions = [
+            {
+                'timestamp': datetime(2024, 1, 6, 23, 30),
+                'amount_received': 9000.0,
+                'amount_paid': 9000.0,
+                'receiving_currency': 'BTC',
+                'from_bank': '12345',
+                'to_bank': '99999'
+            },
+            {
+                'timestamp': datetime(2024, 1, 8, 14, 0),
+                'amount_received': None,
+                'amount_paid': 250.0,
+                'receiving_currency': None,
+                'from_bank': None,
+                'to_bank': '100'
+            },
+            {'timestamp': None, 'amount_received': 120000.0, 'amount_paid': 60000.0, 'to_bank': 'abc'},
+            {'timestamp': datetime(2024, 1, 9, 3, 15), 'amount_received': 42.5, 'amount_paid': None}
+        ]
+        fields = ('timestamp', 'amount_received', 'amount_paid', 'receiving_currency', 'from_bank', 'to_bank')
+        columns = {field: [transaction.get(field) for transaction in transactions] for field in fields}
+        
+        frame_scores = self.ai_analyzer.predict_anomalies(transactions)
+        column_scores = self.ai_analyzer._predict_from_columns(columns)
+        
+        self.assertEqual(len(frame_scores), len(transactions))
+        np.testing.assert_allclose(column_scores, frame_scores)
+    
+    def test_pattern_detection_fixture(self):
+        """Test the pattern detectors against a fixed set of transactions"""
+        start = datetime(2024, 1, 8, 9, 0)
+        transactions = [
+            # Six transfers a minute apart: rapid fire
+            {'from_account': 'A', 'to_account': 'X', 'amount_received': 500.0,
+             'timestamp': start + timedelta(minutes=i)}
+            for i in range(6)
+        ] + [
+            # B and C pay each other: circular
+            {'from_account': 'B', 'to_account': 'C', 'amount_received': 1500.0, 'timestamp': start},
+            {'from_account': 'C', 'to_account': 'B', 'amount_received': 1400.0, 'timestamp': start + timedelta(hours=1)}
+        ] + [
+            # Three amounts just below the reporting threshold: structuring
+            {'from_account': 'D', 'to_account': 'Y', 'amount_received': amount,
+             'timestamp': (start + timedelta(days=i)).isoformat()}
+            for i, amount in enumerate([9500.0, 9800.0, 9900.0])
+        ] + [
+            # Two near-threshold amounts stay under the structuring count
+            {'from_account': 'E', 'to_account': 'Z', 'amount_received': 9100.0, 'timestamp': start},
+            {'from_account': 'E', 'to_account': 'Z', 'amount_received': 9200.0, 'timestamp': start + timedelta(days=2)}
+        ]
+        
+        patterns = self.ai_analyzer.detect_transaction_patterns(transactions)
+        
+        self.assertEqual(
+            [(pattern['type'], pattern['account'], pattern['risk_level']) for pattern in patterns],
+            [
+                ('rapid_fire', 'A', 'high'),
+                ('circular', 'B', 'medium'),
+                ('circular', 'C', 'medium'),
+                ('structuring', 'D', 'high')
+            ]
+        )
+        self.assertEqual(patterns[0]['description'], "Account made 5 transactions within 5 minutes")
+        self.assertEqual(patterns[1]['description'], "Circular transactions detected with 1 accounts")
+        self.assertEqual(patterns[3]['description'], "Potential structuring: 3 transactions near threshold")
+    
     def test_rule_based_risk_application(self):
         """Test rule-based risk factor application"""
         df = pd.DataFrame([
@@ -154,6 +310,23 @@ class TestAIAnalyzer(unittest.TestCase):
         # Risk should be higher due to round number, night time, and high currency risk
         self.assertGreater(adjusted_risk[0], base_risk[0])
         self.assertLessEqual(adjusted_risk[0], 1.0)
+    
+    def test_rule_based_risk_is_repeatable(self):
+        """Test re-scoring a batch gives the same result and leaves the running amount threshold alone"""
+        df = pd.DataFrame({'amount_received': [100.0, 200.0, 300.0, 50000.0]})
+        base_risk = np.full(4, 0.3)
+        
+        first = self.ai_analyzer.apply_rule_based_risk(df, base_risk)
+        second = self.ai_analyzer.apply_rule_based_risk(df, base_risk)
+        
+        np.testing.assert_allclose(first, second)
+        self.assertIsNone(self.ai_analyzer._amount_p95)
+        # Only the largest amount is above the batch's own 95th percentile
+        np.testing.assert_allclose(first, [0.3, 0.3, 0.3, 0.5])
+        # An explicit threshold replaces the batch percentile
+        np.testing.assert_allclose(
+            self.ai_analyzer.apply_rule_based_risk(df, base_risk, amount_threshold=150.0), [0.3, 0.5, 0.5, 0.5]
+        )
 
 class TestDataValidation(unittest.TestCase):
     
@@ -175,5 +348,112 @@ class TestDataValidation(unittest.TestCase):
         missing_columns = [col for col in required_columns if col not in invalid_data.columns]
         self.assertGreater(len(missing_columns), 0)
 
+class _FakeDatabase:
+    """Stand-in database: DataProcessor only stores collection handles on init"""
+    
+    def __getattr__(self, name):
+        return None
+
+class _FakeCollection:
+    """Stand-in collection that records inserted documents"""
+    
+    def __init__(self):
+        self.documents = []
+    
+    def insert_many(self, documents, ordered=True):
+        for document in documents:
+            document['_id'] = ObjectId()
+        self.documents.extend(documents)
+
+class TestAlertQuery(unittest.TestCase):
+    
+    def setUp(self):
+        self.data_processor = DataProcessor(_FakeDatabase())
+    
+    def test_search_matches_substrings_literally(self):
+        """Test alert search matches part of an account id and escapes regex metacharacters"""
+        query = self.data_processor.build_alert_query(search='0a1.')
+        
+        self.assertNotIn('$text', query)
+        fields = {field for condition in query['$or'] for field in condition}
+        self.assertEqual(fields, {'description', 'title', 'account_id', 'type'})
+        pattern = query['$or'][0]['description']
+        self.assertEqual(pattern['$options'], 'i')
+        self.assertTrue(re.search(pattern['$regex'], 'ACC-80A1.ZZ', re.IGNORECASE))
+        self.assertFalse(re.search(pattern['$regex'], 'ACC-80A1XZZ', re.IGNORECASE))
+
+class TestUploadParsing(unittest.TestCase):
+    
+    def setUp(self):
+        self.data_processor = DataProcessor(_FakeDatabase())
+    
+    def test_late_latin1_byte_reads_whole_file_as_latin1(self):
+        """Test a non-UTF-8 byte past the first chunk switches the whole file to latin-1"""
+        rows = ['Bank,Amount'] + ['Plain,1'] * (UPLOAD_BATCH_SIZE + 5) + ['Caf\xe9,2']
+        stream = io.BytesIO('\n'.join(rows).encode('latin-1'))
+        
+        chunks = list(self.data_processor._read_csv_chunks(stream))
+        
+        self.assertGreater(len(chunks), 1)
+        df = pd.concat(chunks)
+        self.assertEqual(len(df), UPLOAD_BATCH_SIZE + 6)
+        self.assertEqual(df['Bank'].iloc[-1], 'Caf\xe9')
+    
+    def test_utf8_upload_keeps_utf8(self):
+        """Test a valid UTF-8 upload is decoded as UTF-8"""
+        stream = io.BytesIO('Bank,Amount\nZ\u00fcrich,1\n'.encode('utf-8'))
+        
+        df = pd.concat(self.data_processor._read_csv_chunks(stream))
+        
+        self.assertEqual(df['Bank'].tolist(), ['Z\u00fcrich'])
+    
+    def test_spooled_upload_stream_is_processed(self):
+        """Test an upload spooled to a SpooledTemporaryFile (as the request class does) is inserted"""
+        self.data_processor.transactions = _FakeCollection()
+        rows = [
+            'Timestamp,From Bank,From Account,To Bank,To Account,Amount Received,'
+            'Receiving Currency,Amount Paid,Payment Currency,Payment Format',
+            '2024-01-08 14:30,Caf\xe9 Bank,A1,200,B1,1500.00,USD,1500.00,USD,Wire',
+            '2024-01-09 09:15,100,A2,300,B2,250.50,EUR,250.50,EUR,Cash'
+        ]
+        
+        # max_size below the payload so the spool rolls over to a real file
+        stream = tempfile.SpooledTemporaryFile(max_size=64, mode='rb+')
+        stream.write('\n'.join(rows).encode('latin-1'))
+        stream.seek(0)
+        
+        result = self.data_processor.process_uploaded_stream(stream, 'upload.csv')
+        
+        self.assertTrue(result['success'], result)
+        self.assertEqual(result['processed_records'], 2)
+        self.assertEqual(self.data_processor.transactions.documents[0]['from_bank'], 'Caf\xe9 Bank')
+
+class TestAnalysisFrame(unittest.TestCase):
+    
+    def setUp(self):
+        self.data_processor = DataProcessor(_FakeDatabase())
+    
+    def test_string_timestamps_are_parsed(self):
+        """Test string timestamps become datetimes and invalid ones become NaT"""
+        transactions = [
+            {'_id': 'a', 'timestamp': '2024-01-05T10:00:00Z', 'amount_received': '250'},
+            {'_id': 'b', 'timestamp': datetime(2024, 1, 6, 3, 0)},
+            {'_id': 'c', 'timestamp': 'not a date'}
+        ]
+        
+        records = self.data_processor._analysis_frame(transactions).to_dict(orient='records')
+        
+        self.assertEqual(records[0]['timestamp'], datetime(2024, 1, 5, 10, 0))
+        self.assertEqual(records[0]['amount'], 250.0)
+        self.assertEqual(records[1]['timestamp'], datetime(2024, 1, 6, 3, 0))
+        self.assertTrue(pd.isna(records[2]['timestamp']))
+    
+    def test_missing_timestamp_defaults_to_utc_now(self):
+        """Test a transaction without a timestamp gets the current UTC time"""
+        records = self.data_processor._analysis_frame([{'_id': 'a'}]).to_dict(orient='records')
+        
+        utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+        self.assertLess(abs(records[0]['timestamp'] - utc_now), timedelta(minutes=1))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file